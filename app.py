@@ -1,13 +1,22 @@
 # app.py - Production API
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from ml_pipeline.orchestrator import chatbot_pipeline
-from ml_pipeline.response_resolver import ResponseResolver
+from ml_pipeline.batch_scheduler import batch_scheduler, BATCHING_ENABLED
+from ml_pipeline.embedding_cache import embedding_cache
+from ml_pipeline.model_registry import model_registry, check_models, WARMUP_ON_START
+from ml_pipeline.shadow import shadow_scorer
+from ml_pipeline.result_cache import result_cache
+from rule_engine.rule_watcher import RULES_WATCH_ENABLED
+from session.session_manager import HISTORY_PAGE_SIZE
 from utils.preprocess import preprocess_text
-import joblib
-from sentence_transformers import SentenceTransformer
+from utils.query_context import QueryContext
 from datetime import datetime
+from functools import wraps
+import hmac
+import json
 import logging
+import os
 import uuid
 
 # -------------------- Setup --------------------
@@ -16,12 +25,25 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Model files may only be loaded from these directories
+MODEL_DIRS = ("model", "semantic_model")
+
 # -------------------- Load Models Once --------------------
-semantic_model = SentenceTransformer("semantic_model/")
-classifier = joblib.load("model/svc_classifier.joblib")
-resolver = ResponseResolver("responses/intent_responses.yml")
+# Shared, lazily-loaded resources; warmup() loads them up front so the
+# first request does not pay for it (MODEL_WARMUP=0 to defer)
+if WARMUP_ON_START:
+    model_registry.warmup()
+    logger.info("✓ Models loaded successfully")
+
+if BATCHING_ENABLED:
+    batch_scheduler.start()
+    logger.info("✓ ML micro-batching enabled")
 
-logger.info("✓ Models loaded successfully")
+if RULES_WATCH_ENABLED:
+    model_registry.rule_watcher.start()
+    logger.info("✓ Rule hot-reload enabled")
 
 # -------------------- Health --------------------
 @app.route("/health", methods=["GET"])
@@ -31,6 +53,52 @@ def health():
         "timestamp": datetime.now().isoformat()
     }), 200
 
+# -------------------- ML Stats --------------------
+@app.route("/api/ml/batch-stats", methods=["GET"])
+def batch_stats():
+    return jsonify(batch_scheduler.stats()), 200
+
+
+@app.route("/api/ml/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify(embedding_cache.stats()), 200
+
+
+@app.route("/api/ml/result-cache-stats", methods=["GET"])
+def result_cache_stats():
+    return jsonify(result_cache.stats()), 200
+
+
+@app.route("/api/ml/load-stats", methods=["GET"])
+def load_stats():
+    return jsonify(model_registry.timings()), 200
+
+
+@app.route("/api/ml/cascade-stats", methods=["GET"])
+def cascade_stats():
+    classifier = model_registry.classifier
+    if not hasattr(classifier, "stats"):
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **classifier.stats()}), 200
+
+@app.route("/api/sessions/stats", methods=["GET"])
+def session_stats():
+    return jsonify(model_registry.session_manager.stats()), 200
+
+
+@app.route("/api/rules/version", methods=["GET"])
+def rules_version():
+    return jsonify(model_registry.rule_pipeline.describe()), 200
+
+@app.route("/api/rules/stats", methods=["GET"])
+def rules_stats():
+    rule_pipeline = model_registry.rule_pipeline
+    top = request.args.get("top", type=int)
+    return jsonify({
+        "rules": rule_pipeline.describe(),
+        "stats": rule_pipeline.engine.rule_stats(top)
+    }), 200
+
 # -------------------- Chat Endpoint --------------------
 @app.route("/api/chat", methods=["POST"])
 def chat():
@@ -48,13 +116,16 @@ def chat():
         #  Stable session_id
         session_id = user_id or data.get("session_id") or str(uuid.uuid4())
 
+        # One snapshot per request: a concurrent model swap cannot mix models
+        models = model_registry.models
+
         #  SINGLE ENTRY POINT
         bot_response = chatbot_pipeline(
-            query=query,
-            classifier=classifier,
-            semantic_model=semantic_model,
+            query=QueryContext(query, preprocess_text),
+            classifier=models.classifier,
+            semantic_model=models.semantic_model,
             preprocess_fn=preprocess_text,
-            response_resolver=resolver,
+            response_resolver=model_registry.response_resolver,
             session_id=session_id
         )
 
@@ -71,6 +142,116 @@ def chat():
         logger.exception("Chat error")
         return jsonify({"success": False, "error": str(e)}), 500
 
+# -------------------- Admin: Models --------------------
+def require_admin(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = request.headers.get("X-Admin-Token", "")
+        if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+            return jsonify({"success": False, "error": "Forbidden"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def model_path(path):
+    """Returns `path` if it points inside MODEL_DIRS, otherwise raises ValueError."""
+    if path is None:
+        return None
+
+    resolved = os.path.realpath(path)
+    for directory in MODEL_DIRS:
+        root = os.path.realpath(directory)
+        if resolved == root or resolved.startswith(root + os.sep):
+            if not os.path.exists(resolved):
+                raise ValueError(f"Model path not found: {path}")
+            return path
+    raise ValueError(f"Model path must be inside {MODEL_DIRS}: {path}")
+
+
+@app.route("/api/admin/models", methods=["GET"])
+@require_admin
+def get_models():
+    return jsonify({"success": True, "models": model_registry.describe()}), 200
+
+
+@app.route("/api/admin/models", methods=["POST"])
+@require_admin
+def swap_models():
+    data = request.get_json() or {}
+    try:
+        model_registry.swap_models(
+            classifier_path=model_path(data.get("classifier_path")),
+            semantic_model_path=model_path(data.get("semantic_model_path")),
+            backend=data.get("backend")
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Model swap failed")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    return jsonify({"success": True, "models": model_registry.describe()}), 200
+
+
+@app.route("/api/admin/rules/reload", methods=["POST"])
+@require_admin
+def reload_rules():
+    rule_pipeline = model_registry.rule_pipeline
+    swapped = rule_pipeline.reload(force=True)
+    status = 200 if swapped else 400
+    return jsonify({"success": swapped, "rules": rule_pipeline.describe()}), status
+
+
+@app.route("/api/admin/shadow", methods=["GET"])
+@require_admin
+def get_shadow():
+    return jsonify({"success": True, "shadow": shadow_scorer.stats()}), 200
+
+
+@app.route("/api/admin/shadow", methods=["POST"])
+@require_admin
+def start_shadow():
+    data = request.get_json() or {}
+    try:
+        classifier_path = model_path(data.get("classifier_path"))
+        semantic_model_path = model_path(data.get("semantic_model_path"))
+        if not classifier_path and not semantic_model_path:
+            raise ValueError("Missing 'classifier_path' or 'semantic_model_path'")
+
+        models = model_registry.models
+        classifier = models.classifier
+        if classifier_path:
+            classifier = model_registry.load_classifier(classifier_path, name="shadow_classifier")
+
+        semantic_model = None
+        if semantic_model_path:
+            semantic_model = model_registry.load_semantic_model(
+                semantic_model_path,
+                data.get("backend") or models.backend,
+                clear_cache=False,
+                name="shadow_semantic_model"
+            )
+
+        check_models(semantic_model or models.semantic_model, classifier)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    shadow_scorer.set_candidate(
+        classifier,
+        semantic_model=semantic_model,
+        name=" + ".join(p for p in (semantic_model_path, classifier_path) if p),
+        sample_rate=data.get("sample_rate")
+    )
+    return jsonify({"success": True, "shadow": shadow_scorer.stats()}), 200
+
+
+@app.route("/api/admin/shadow", methods=["DELETE"])
+@require_admin
+def stop_shadow():
+    stats = shadow_scorer.stats()
+    shadow_scorer.clear_candidate()
+    return jsonify({"success": True, "shadow": stats}), 200
+
 # -------------------- Flow APIs --------------------
 @app.route("/api/flow/respond", methods=["POST"])
 def respond_flow():
@@ -79,7 +260,7 @@ def respond_flow():
         return jsonify({"success": False, "error": "Missing fields"}), 400
 
     return jsonify(
-        flow_handler.handle_response(
+        model_registry.flow_handler.handle_response(
             data["session_id"],
             data["response"]
         )
@@ -88,12 +269,34 @@ def respond_flow():
 
 @app.route("/api/flow/cancel/<session_id>", methods=["POST"])
 def cancel_flow(session_id):
-    return jsonify(flow_handler.cancel_flow(session_id)), 200
+    return jsonify(model_registry.flow_handler.cancel_flow(session_id)), 200
 
 
 @app.route("/api/flow/session/<session_id>", methods=["GET"])
 def get_flow_session(session_id):
-    return jsonify(flow_handler.get_session_data(session_id)), 200
+    response = model_registry.flow_handler.get_session_data(session_id)
+    return jsonify(response), 200 if response["success"] else 404
+
+
+# -------------------- History --------------------
+@app.route("/api/history/<session_id>", methods=["GET"])
+def get_history(session_id):
+    try:
+        limit = int(request.args.get("limit", HISTORY_PAGE_SIZE))
+        before = request.args.get("before")
+        before = float(before) if before else None
+    except ValueError:
+        return jsonify({"success": False, "error": "'limit' must be an integer and 'before' a timestamp"}), 400
+
+    page = model_registry.session_manager.get_history_page(session_id, limit, before)
+    return jsonify({"success": True, "session_id": session_id, **page}), 200
+
+
+@app.route("/api/history/<session_id>/export", methods=["GET"])
+def export_history(session_id):
+    # NDJSON, one message per line, serialized as it is sent
+    lines = (json.dumps(msg) + "\n" for msg in model_registry.session_manager.iter_history(session_id))
+    return Response(lines, mimetype="application/x-ndjson")
 
 
 # -------------------- Run --------------------
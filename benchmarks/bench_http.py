@@ -0,0 +1,111 @@
+# benchmarks/bench_http.py - End-to-end HTTP throughput of a running server
+#
+#   python app.py                                             # then:
+#   python -m benchmarks.bench_http --url http://127.0.0.1:5000
+#
+#   python sharded_server.py --workers 4 --port 5000          # then:
+#   python -m benchmarks.bench_http --url http://127.0.0.1:5000 --processes 4 --clients 16
+#
+# Every client holds a keep-alive connection and posts /api/chat turns for
+# its own sessions (--turns per session, queries from the synthetic corpus),
+# so the same run works against app.py, prefork_server.py and
+# sharded_server.py. The clients are spread over --processes processes so
+# the load generator is not limited by a single interpreter. Reports
+# requests/s, latency percentiles and non-2xx responses.
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.bench_pipeline import _percentile, synthetic_corpus
+
+
+def _client(host: str, port: int, session_ids: list, turns: int, corpus: list, results: list):
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    latencies = []
+    errors = 0
+    i = 0
+    for _ in range(turns):
+        for session_id in session_ids:
+            body = json.dumps({"query": corpus[i % len(corpus)], "session_id": session_id}).encode("utf-8")
+            i += 1
+            started = time.perf_counter()
+            try:
+                conn.request("POST", "/api/chat", body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 300:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+            latencies.append((time.perf_counter() - started) * 1000.0)
+    conn.close()
+    results.append((latencies, errors))
+
+
+def _process(args: tuple) -> tuple:
+    url, process, clients, sessions, turns, seed = args
+    parts = urlsplit(url)
+    corpus = synthetic_corpus(1000, seed=seed + process)
+
+    results = []
+    threads = []
+    for client in range(clients):
+        session_ids = [f"bench-{process}-{client}-{i}" for i in range(sessions)]
+        threads.append(threading.Thread(
+            target=_client,
+            args=(parts.hostname, parts.port or 80, session_ids, turns, corpus, results)
+        ))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = [ms for client_latencies, _ in results for ms in client_latencies]
+    return latencies, sum(errors for _, errors in results)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=8, help="connections per process")
+    parser.add_argument("--sessions", type=int, default=4, help="sessions per client")
+    parser.add_argument("--turns", type=int, default=25, help="turns per session")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    jobs = [(args.url, p, args.clients, args.sessions, args.turns, args.seed) for p in range(args.processes)]
+    print(
+        f"{args.url}: {args.processes} × {args.clients} clients, "
+        f"{args.sessions} sessions each, {args.turns} turns per session\n"
+    )
+
+    started = time.perf_counter()
+    with multiprocessing.Pool(args.processes) as pool:
+        outcomes = pool.map(_process, jobs)
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(ms for process_latencies, _ in outcomes for ms in process_latencies)
+    errors = sum(process_errors for _, process_errors in outcomes)
+    if not latencies:
+        print("✗ No requests completed")
+        return 1
+
+    print(f"{'requests':>9} {'req/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'errors':>7}")
+    print(
+        f"{len(latencies):>9} {len(latencies) / elapsed:>8.0f} {_percentile(latencies, 50):>7.1f} "
+        f"{_percentile(latencies, 95):>7.1f} {_percentile(latencies, 99):>7.1f} {errors:>7}"
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+# benchmarks/bench_pipeline.py - Per-stage micro-benchmarks for the chat pipeline
+#
+#   python -m benchmarks.bench_pipeline                              # synthetic corpus
+#   python -m benchmarks.bench_pipeline --corpus logs/queries.jsonl  # recorded corpus
+#   python -m benchmarks.bench_pipeline --save-baseline benchmarks/baseline.json
+#   python -m benchmarks.bench_pipeline --baseline benchmarks/baseline.json --threshold 0.25
+#
+# Every stage is timed on its own (p50/p95/p99 per call) and then re-run
+# under tracemalloc to report peak and retained allocations per call.
+# With --baseline the run fails (exit 1) when a stage's p50 or p95 regresses
+# past the threshold.
+
+import argparse
+import array
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+
+# -------------------- CORPUS --------------------
+_SHORT = ["hi", "hello", "pricing", "demo", "thanks", "bye", "help", "menu", "support", "careers", "uptime", "sla"]
+_SUBJECTS = ["pricing", "a demo", "a free trial", "the enterprise plan", "an internship", "job openings",
+             "your office", "integrations", "gdpr compliance", "business hours", "support", "case studies"]
+_TEMPLATES = [
+    "what is {s}",
+    "can you tell me about {s}",
+    "i want to know more about {s} for my team of {n}",
+    "how do i get {s}",
+    "not happy with {s}",
+    "my name is alex and i need {s}, email alex{n}@example.com",
+    "we are a company with {n} employees looking at {s} and would like to understand the options available",
+]
+
+
+def synthetic_corpus(size: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        if rng.random() < 0.3:
+            corpus.append(rng.choice(_SHORT))
+        else:
+            corpus.append(rng.choice(_TEMPLATES).format(s=rng.choice(_SUBJECTS), n=rng.randint(2, 500)))
+    return corpus
+
+
+def recorded_corpus(path: str, field: str = "query", limit: int | None = None) -> list:
+    corpus = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            text = record.get(field) if isinstance(record, dict) else None
+            if isinstance(text, str) and text.strip():
+                corpus.append(text.strip())
+            if limit and len(corpus) >= limit:
+                break
+    return corpus
+
+
+# -------------------- STAGES --------------------
+class Stage:
+    """
+    A benchmarked pipeline stage.
+
+    `prepare(query, i)` runs untimed before every call and returns the
+    argument handed to the timed `run(arg)`.
+    """
+
+    def __init__(self, name, run, prepare=None):
+        self.name = name
+        self.run = run
+        self.prepare = prepare or (lambda query, i: query)
+
+
+def build_stages(load_models: bool = True) -> list:
+    from utils.preprocess import preprocess_text
+    from rule_engine.rule_pipeline import RulePipeline, DEFAULT_RULE_FILES
+    from ml_pipeline.response_resolver import ResponseResolver
+    from session.session_manager import SessionManager
+    from flow_pipeline.flow_handler import FlowHandler
+
+    rule_pipeline = RulePipeline(rule_files=DEFAULT_RULE_FILES)
+    resolver = ResponseResolver("responses/intent_responses.yml")
+    intents = list(resolver.responses)
+
+    stages = [
+        Stage("preprocess_text", preprocess_text),
+        Stage("rule_pipeline.run", rule_pipeline.run),
+        Stage(
+            "response_resolver.resolve",
+            resolver.resolve,
+            prepare=lambda query, i: intents[i % len(intents)]
+        ),
+    ]
+
+    # Session operations over a rotating pool of session ids
+    session_manager = SessionManager(session_timeout=600)
+
+    def session_turn(args):
+        session_id, query = args
+        session_manager.get_or_create_session(session_id)
+        session_manager.update_intent(session_id, "pricing_inquiry")
+        session_manager.add_message(session_id, "user", query)
+        session_manager.add_message(session_id, "bot", "ok", "ML")
+        session_manager.get_session_snapshot(session_id)
+
+    stages.append(Stage(
+        "session_manager.turn",
+        session_turn,
+        prepare=lambda query, i: (f"bench-{i % 1000}", query)
+    ))
+
+    # Flow step handling (first step of the demo flow, valid answer)
+    flow_sessions = SessionManager(session_timeout=600)
+    flow_handler = FlowHandler(flow_sessions)
+
+    def prepare_flow(query, i):
+        session_id = f"flow-{i % 1000}"
+        flow_handler.start_flow("demo_request", session_id)
+        return session_id
+
+    stages.append(Stage(
+        "flow_handler.handle_response",
+        lambda session_id: flow_handler.handle_response(session_id, "Alex Morgan"),
+        prepare=prepare_flow
+    ))
+
+    stages.extend(_request_stages(rule_pipeline, preprocess_text))
+
+    if load_models:
+        stages.extend(_model_stages(preprocess_text))
+
+    return stages
+
+
+def _request_stages(rule_pipeline, preprocess_text) -> list:
+    """
+    The query handling of one /api/chat request outside the models, run on
+    raw strings (every layer normalizes again) and on one shared QueryContext.
+    """
+    from session.context_extractor import extract_context
+    from session.memory_resolver import resolve_memory_question
+    from ml_pipeline.result_cache import cache_key
+    from utils.query_context import QueryContext
+
+    session = {"slots": {}}
+
+    def with_strings(query):
+        query.strip().lower()  # /history check
+        extract_context(query)
+        resolve_memory_question(query, session)
+        cache_key(query)
+        rule_pipeline.run(query)
+        preprocess_text(query)
+
+    def with_context(query):
+        context = QueryContext(query, preprocess_text)
+        context.normalized
+        extract_context(context)
+        resolve_memory_question(context, session)
+        cache_key(context)
+        rule_pipeline.run(context)
+        context.preprocessed
+
+    return [
+        Stage("request.raw_strings", with_strings),
+        Stage("request.query_context", with_context),
+    ]
+
+
+def _model_stages(preprocess_text) -> list:
+    from ml_pipeline.model_loader import load_semantic_model, load_classifier
+
+    try:
+        semantic_model = load_semantic_model()
+        classifier = load_classifier()
+    except Exception as e:
+        print(f"⚠️ Skipping model stages: {e}", file=sys.stderr)
+        return []
+
+    def encode(text):
+        return semantic_model.encode([text], normalize_embeddings=True, convert_to_numpy=True)
+
+    stages = [Stage("semantic_model.encode", encode, prepare=lambda query, i: preprocess_text(query))]
+
+    embed = lambda query, i: encode(preprocess_text(query))
+    stages.append(Stage("classifier.predict", classifier.predict, prepare=embed))
+
+    if hasattr(classifier, "predict_proba"):
+        stages.append(Stage("classifier.predict_proba", classifier.predict_proba, prepare=embed))
+
+    return stages
+
+
+# -------------------- MEASUREMENT --------------------
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def measure_stage(stage: Stage, corpus: list, iterations: int, warmup: int = 50) -> dict:
+    for i in range(min(warmup, iterations)):
+        stage.run(stage.prepare(corpus[i % len(corpus)], i))
+
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in range(iterations):
+            arg = stage.prepare(corpus[i % len(corpus)], i)
+            started = time.perf_counter_ns()
+            stage.run(arg)
+            timings.append(time.perf_counter_ns() - started)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    timings.sort()
+    to_us = lambda ns: round(ns / 1000.0, 3)
+
+    result = {
+        "calls": iterations,
+        "mean_us": to_us(sum(timings) / len(timings)),
+        "p50_us": to_us(_percentile(timings, 50)),
+        "p95_us": to_us(_percentile(timings, 95)),
+        "p99_us": to_us(_percentile(timings, 99)),
+    }
+    result.update(_measure_allocations(stage, corpus, min(iterations, 200)))
+    return result
+
+
+def _measure_allocations(stage: Stage, corpus: list, calls: int) -> dict:
+    """Peak transient bytes, retained bytes and retained blocks per call."""
+    args = [stage.prepare(corpus[i % len(corpus)], i) for i in range(calls)]
+
+    tracemalloc.start()
+    try:
+        # Preallocated so recording a peak does not itself allocate
+        peaks = array.array("q", bytes(8 * calls))
+        before = tracemalloc.take_snapshot()
+        start_current, _ = tracemalloc.get_traced_memory()
+
+        for idx, arg in enumerate(args):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            stage.run(arg)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks[idx] = peak - current
+
+        end_current, _ = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    retained_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    peaks = sorted(peaks)
+
+    return {
+        "alloc_peak_bytes_p50": _percentile(peaks, 50),
+        "alloc_retained_bytes_per_call": round((end_current - start_current) / calls, 1),
+        "alloc_retained_blocks_per_call": round(retained_blocks / calls, 3),
+    }
+
+
+# -------------------- BASELINE --------------------
+def compare_to_baseline(results: dict, baseline: dict, threshold: float, min_delta_us: float) -> list:
+    """
+    Returns a list of regression messages. A stage regresses when its p50
+    or p95 grows by more than `threshold` (relative) AND `min_delta_us`
+    (absolute, to ignore noise on sub-microsecond stages).
+    """
+    regressions = []
+    for corpus_name, stages in results.items():
+        for stage_name, current in stages.items():
+            previous = baseline.get(corpus_name, {}).get(stage_name)
+            if not previous:
+                continue
+            for metric in ("p50_us", "p95_us"):
+                old, new = previous[metric], current[metric]
+                if new > old * (1.0 + threshold) and new - old > min_delta_us:
+                    regressions.append(
+                        f"{corpus_name}/{stage_name} {metric}: {old:.1f} → {new:.1f} µs "
+                        f"(+{(new / old - 1.0) * 100.0:.0f}%)"
+                    )
+    return regressions
+
+
+def print_report(results: dict):
+    header = f"{'stage':32} {'p50 µs':>10} {'p95 µs':>10} {'p99 µs':>10} {'peak B':>10} {'kept blk':>9}"
+    for corpus_name, stages in results.items():
+        print(f"\n=== {corpus_name} ===")
+        print(header)
+        for stage_name, r in stages.items():
+            print(
+                f"{stage_name:32} {r['p50_us']:>10.1f} {r['p95_us']:>10.1f} {r['p99_us']:>10.1f} "
+                f"{r['alloc_peak_bytes_p50']:>10} {r['alloc_retained_blocks_per_call']:>9.2f}"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage chat pipeline benchmarks")
+    parser.add_argument("--corpus", help="Recorded JSONL corpus (in addition to the synthetic one)")
+    parser.add_argument("--field", default="query", help="JSON field holding the query text")
+    parser.add_argument("--synthetic-size", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--stage", action="append", help="Only run stages whose name contains this (repeatable)")
+    parser.add_argument("--skip-models", action="store_true", help="Skip encoder / classifier stages")
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%)")
+    parser.add_argument("--min-delta-us", type=float, default=2.0, help="Ignore regressions smaller than this")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args(argv)
+
+    corpora = {"synthetic": synthetic_corpus(args.synthetic_size)}
+    if args.corpus:
+        corpora["recorded"] = recorded_corpus(args.corpus, args.field)
+
+    stages = build_stages(load_models=not args.skip_models)
+    if args.stage:
+        stages = [s for s in stages if any(f in s.name for f in args.stage)]
+
+    results = {}
+    for corpus_name, corpus in corpora.items():
+        if not corpus:
+            print(f"⚠️ Corpus '{corpus_name}' is empty, skipping", file=sys.stderr)
+            continue
+        results[corpus_name] = {
+            stage.name: measure_stage(stage, corpus, args.iterations) for stage in stages
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Baseline saved → {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold, args.min_delta_us)
+        if regressions:
+            print("\n✗ Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\n✓ No regressions against baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# benchmarks/bench_rules.py - Rule engine scaling benchmark
+#
+#   python -m benchmarks.bench_rules
+#   python -m benchmarks.bench_rules --sizes 10,100,1000,5000 --queries 2000
+#
+# Generates synthetic rule sets shaped like the ones in rules/ (anchored
+# single-token alternations, phrases, word-boundary patterns), runs the same
+# queries through RuleEngine.process (exact index + bucketed combined matchers) and
+# RuleEngine.process_linear (rule-by-rule) and reports µs per query.
+# Every query (plus case/whitespace/newline/non-ASCII variants) is also
+# checked for identical results in both modes, on the synthetic rule sets and
+# on the shipped rule files. The query analyzer's keyword features are
+# checked against the plain-substring analyzer they replaced.
+
+import argparse
+import random
+import sys
+import time
+
+from benchmarks.bench_pipeline import synthetic_corpus, _percentile
+from rule_engine.rule_loader import prepare_rule
+
+
+_WORDS = [
+    "pricing", "price", "cost", "demo", "trial", "support", "help", "menu", "sales", "partner",
+    "career", "intern", "office", "address", "hours", "uptime", "sla", "security", "gdpr", "api",
+    "integration", "refund", "invoice", "billing", "account", "login", "password", "upgrade", "plan",
+    "enterprise", "team", "contract", "renewal", "discount", "feature", "roadmap", "status", "outage",
+]
+
+
+def synthetic_rules(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    rules = []
+
+    for i in range(count):
+        kind = i % 3
+        words = rng.sample(_WORDS, 3)
+        suffix = f"{i}" if i >= len(_WORDS) else ""
+
+        if kind == 0:
+            patterns = [f"^({'|'.join(w + suffix for w in words)})$"]
+        elif kind == 1:
+            patterns = [f"{words[0]}{suffix} {words[1]}", f"{words[1]} {words[2]}{suffix}"]
+        else:
+            patterns = [rf"\b{words[0]}{suffix}\b"]
+
+        rule = {
+            "intent": f"synthetic_{i}",
+            "priority": rng.randint(1, 200),
+            "confidence": 1.0,
+            "allow_ml_fallback": bool(rng.random() < 0.5),
+            "match": {"regex": patterns},
+            "response": {"messages": [f"response {i}"]},
+        }
+        if kind != 2:
+            rule["max_tokens"] = rng.choice([1, 2, 4, 6, 12])
+        if rng.random() < 0.1:
+            rule["negative_keywords"] = [rng.choice(_WORDS)]
+        rules.append(rule)
+
+    # Same preparation as rule_loader.load_rules
+    for rule in rules:
+        prepare_rule(rule)
+    rules.sort(key=lambda r: r.get("priority", 100))
+    return rules
+
+
+def _time_per_query(fn, queries, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter_ns()
+            fn(query)
+            timings.append(time.perf_counter_ns() - started)
+    timings.sort()
+    return {
+        "p50_us": _percentile(timings, 50) / 1000.0,
+        "p95_us": _percentile(timings, 95) / 1000.0,
+    }
+
+
+def _edge_variants(queries) -> list:
+    """Case, whitespace, trailing newline and non-ASCII variants of each query."""
+    variants = []
+    for query in queries:
+        variants += [query, query.upper(), f" {query}", f"{query} ", f"{query}\n", f"{query}\u212a", query.replace("s", "\u017f")]
+    return variants
+
+
+# Queries the analyzer check always includes: topic keywords in inflected
+# forms, and answer words inside longer words
+_ANALYZER_QUERIES = [
+    "what are your prices", "any demos available?", "i have issues logging in",
+    "what do the costs look like", "can I get trials", "I know the pricing already",
+    "no thanks", "nope", "yes please", "ok", "okay sure", "not now",
+    "call me by phone", "look at my book", "my eyes hurt", "measure the uptime",
+]
+
+
+def _substring_features(query: str) -> dict:
+    """Keyword features as the analyzer computed them before the scanner: plain substrings."""
+    from rule_engine.query_analyzer import FEATURE_KEYWORDS
+    text = query.lower()
+    return {flag: any(keyword in text for keyword in keywords) for flag, keywords in FEATURE_KEYWORDS.items()}
+
+
+def check_analyzer_parity(queries) -> dict:
+    """
+    Topic flags and the intent category must equal the substring analyzer's.
+    Affirmation/negation may only differ where every old hit was a
+    WHOLE_WORD_KEYWORDS word inside a longer word ("no" in "know").
+    """
+    from rule_engine.query_analyzer import (
+        FEATURE_KEYWORDS,
+        WHOLE_WORD_KEYWORDS,
+        analyze_query_characteristics,
+        get_query_intent_category,
+    )
+
+    mismatches = 0
+    boundary_fixes = 0
+    for query in queries:
+        analysis = analyze_query_characteristics(query)
+        reference = _substring_features(query)
+        text = query.lower()
+
+        for flag, keywords in FEATURE_KEYWORDS.items():
+            if analysis[flag] == reference[flag]:
+                continue
+            substring_keywords = [k for k in keywords if k not in WHOLE_WORD_KEYWORDS]
+            if reference[flag] and not any(k in text for k in substring_keywords):
+                boundary_fixes += 1
+            else:
+                mismatches += 1
+
+        if get_query_intent_category(analysis) != get_query_intent_category(reference):
+            mismatches += 1
+
+    return {"queries": len(queries), "mismatches": mismatches, "boundary_fixes": boundary_fixes}
+
+
+def main(argv=None):
+    from rule_engine.rule_engine import RuleEngine, check_parity
+    from rule_engine.rule_pipeline import DEFAULT_RULE_FILES
+    from rule_engine.rule_loader import load_rules
+
+    parser = argparse.ArgumentParser(description="Rule engine scaling benchmark")
+    parser.add_argument("--sizes", default="10,30,100,300,1000,3000")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    queries = synthetic_corpus(args.queries, seed=1)
+    rng = random.Random(2)
+    # Mix in queries that hit the synthetic rules
+    queries += [rng.choice(_WORDS) for _ in range(args.queries // 2)]
+    queries += [f"{rng.choice(_WORDS)} {rng.choice(_WORDS)}" for _ in range(args.queries // 2)]
+
+    print(f"{'rules':>6} {'build ms':>9} {'linear p50':>11} {'combined p50':>13} {'linear p95':>11} {'combined p95':>13} {'speedup':>8}")
+
+    mismatches = 0
+    parity_queries = _edge_variants(queries[: args.queries])
+    for size in [int(s) for s in args.sizes.split(",")]:
+        rules = synthetic_rules(size)
+
+        started = time.perf_counter()
+        engine = RuleEngine(rules)
+        build_ms = (time.perf_counter() - started) * 1000.0
+
+        mismatches += check_parity(engine, parity_queries)["mismatches"]
+
+        linear = _time_per_query(engine.process_linear, queries, args.repeat)
+        combined = _time_per_query(engine.process, queries, args.repeat)
+
+        print(
+            f"{size:>6} {build_ms:>9.1f} {linear['p50_us']:>11.1f} {combined['p50_us']:>13.1f} "
+            f"{linear['p95_us']:>11.1f} {combined['p95_us']:>13.1f} "
+            f"{linear['p50_us'] / max(combined['p50_us'], 1e-9):>7.1f}x"
+        )
+
+    # Differential check on the shipped rule files, fed every literal they contain
+    shipped = RuleEngine(load_rules(DEFAULT_RULE_FILES))
+    literals = sorted(shipped.exact_index) + [r.pattern.strip("^$\\b") for rule in shipped.rules for r in rule["_residual_regex"]]
+    report = check_parity(shipped, _edge_variants(literals + [f"{a} {b}" for a in literals for b in literals[:20]] + queries))
+    print(f"\nshipped rules: {len(shipped.rules)}, exact literals: {len(shipped.exact_index)}, "
+          f"differential queries: {report['queries']}, mismatches: {report['mismatches']}")
+    mismatches += report["mismatches"]
+
+    analyzer = check_analyzer_parity(_edge_variants(_ANALYZER_QUERIES + queries))
+    print(f"query analyzer vs substring analyzer: {analyzer['queries']} queries, "
+          f"mismatches: {analyzer['mismatches']}, whole-word fixes: {analyzer['boundary_fixes']}")
+
+    if mismatches:
+        print(f"\n✗ {mismatches} queries differ between combined and linear matching")
+        return 1
+    if analyzer["mismatches"]:
+        print(f"\n✗ {analyzer['mismatches']} query analyzer features differ from the substring analyzer")
+        return 1
+
+    print("\n✓ Combined and linear matching agree on every query")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
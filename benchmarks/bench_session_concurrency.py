@@ -0,0 +1,184 @@
+# benchmarks/bench_session_concurrency.py - SessionManager thread-safety stress run
+#
+#   python -m benchmarks.bench_session_concurrency
+#   python -m benchmarks.bench_session_concurrency --threads 1,2,4,8,16 --turns 2000 --hold-us 500
+#
+# Every thread runs read-modify-write turns (current_step += 1, a slot
+# counter += 1, one history message) on random sessions from a small hot
+# set, so the same session is hit by several threads at once. Afterwards
+# every session must show exactly as many steps as turns were run on it;
+# any difference is a lost update.
+#
+# Modes:
+#   unlocked  get_or_create_session + in-place change (the old pattern)
+#   global    session() turns with a single lock stripe
+#   striped   session() turns with the default stripe count
+#
+# --hold-us keeps the lock for that long inside each turn (a blocking call,
+# like a store round-trip), which is where a global lock stops scaling.
+#
+# --shared-turns N also runs the two-worker check: two managers on one SQLite
+# store, worker A writing current_step = i in session() turns while worker B
+# only reads the same session. After the write-backs every step must be in
+# the store (a read must never write a stale copy back over a newer one).
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from session.session_manager import SessionManager, SESSION_LOCK_STRIPES
+from session.session_store import SQLiteSessionStore
+
+
+def _turn(manager: SessionManager, session_id: str, locked: bool, hold_s: float):
+    if locked:
+        with manager.session(session_id) as session:
+            session["current_step"] += 1
+            session["slots"]["turns"] = session["slots"].get("turns", 0) + 1
+            if hold_s:
+                time.sleep(hold_s)
+            manager.add_message(session_id, "user", "ping")
+        return
+
+    session = manager.get_or_create_session(session_id)
+    step = session["current_step"]
+    turns = session["slots"].get("turns", 0)
+    if hold_s:
+        time.sleep(hold_s)
+    session["current_step"] = step + 1
+    session["slots"]["turns"] = turns + 1
+    manager.add_message(session_id, "user", "ping")
+
+
+def run(mode: str, threads: int, turns: int, sessions: int, hold_us: float) -> dict:
+    stripes = 1 if mode == "global" else SESSION_LOCK_STRIPES
+    manager = SessionManager(session_timeout=3600, stripes=stripes)
+    ids = [f"session-{i:04d}" for i in range(sessions)]
+    expected = {session_id: 0 for session_id in ids}
+    expected_lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        picks = [rng.choice(ids) for _ in range(turns)]
+        counts = {}
+        barrier.wait()
+        for session_id in picks:
+            _turn(manager, session_id, mode != "unlocked", hold_us / 1e6)
+            counts[session_id] = counts.get(session_id, 0) + 1
+        with expected_lock:
+            for session_id, count in counts.items():
+                expected[session_id] += count
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    lost_steps = 0
+    lost_slots = 0
+    for session_id, count in expected.items():
+        snapshot = manager.get_session_snapshot(session_id) or {"current_step": 0, "slots": {}}
+        lost_steps += count - snapshot["current_step"]
+        lost_slots += count - snapshot["slots"].get("turns", 0)
+
+    return {
+        "mode": mode,
+        "threads": threads,
+        "turns_per_s": threads * turns / elapsed,
+        "lost_steps": lost_steps,
+        "lost_slots": lost_slots,
+    }
+
+
+def run_shared(turns: int, flush_ms: float = 5.0) -> dict:
+    directory = tempfile.mkdtemp(prefix="session-store-")
+    path = os.path.join(directory, "sessions.db")
+    writer = SessionManager(session_timeout=3600, store=SQLiteSessionStore(path), flush_interval=flush_ms / 1000.0)
+    reader = SessionManager(session_timeout=3600, store=SQLiteSessionStore(path), flush_interval=flush_ms / 1000.0)
+    session_id = "shared-session"
+    rng = random.Random(0)
+
+    lost = 0
+    for i in range(1, turns + 1):
+        with writer.session(session_id) as session:
+            session["current_step"] = i
+        reader.get_or_create_session(session_id)
+        # Land anywhere relative to the 5 ms write-behind of either worker
+        time.sleep(rng.uniform(0, 2 * flush_ms / 1000.0))
+        writer.flush()
+        reader.flush()
+        if (writer.get_session_snapshot(session_id) or {}).get("current_step") != i:
+            lost += 1
+
+    writer.close()
+    reader.close()
+    stored = SessionManager(session_timeout=3600, store=SQLiteSessionStore(path)).get_session_snapshot(session_id)
+    shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "turns": turns,
+        "lost": lost,
+        "final_step": (stored or {}).get("current_step"),
+        "reader_conflicts": reader.write_conflicts,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", default="1,2,4,8")
+    parser.add_argument("--turns", type=int, default=2000, help="turns per thread")
+    parser.add_argument("--sessions", type=int, default=32, help="size of the hot session set")
+    parser.add_argument("--hold-us", type=float, default=200.0)
+    parser.add_argument("--modes", default="unlocked,global,striped")
+    parser.add_argument("--shared-turns", type=int, default=200, help="two-worker SQLite check (0 = off)")
+    args = parser.parse_args(argv)
+
+    # Switch threads as often as possible to provoke interleavings
+    sys.setswitchinterval(1e-6)
+
+    print(
+        f"{args.sessions} hot sessions, {args.turns} turns per thread, "
+        f"lock held {args.hold_us:.0f} µs per turn, {SESSION_LOCK_STRIPES} stripes\n"
+    )
+    print(f"{'mode':>9} {'threads':>8} {'turns/s':>9} {'lost steps':>11} {'lost slots':>11}")
+
+    failures = 0
+    for mode in args.modes.split(","):
+        for threads in [int(t) for t in args.threads.split(",")]:
+            result = run(mode, threads, args.turns, args.sessions, args.hold_us)
+            print(
+                f"{result['mode']:>9} {result['threads']:>8} {result['turns_per_s']:>9.0f} "
+                f"{result['lost_steps']:>11} {result['lost_slots']:>11}"
+            )
+            if mode != "unlocked" and (result["lost_steps"] or result["lost_slots"]):
+                failures += 1
+
+    if args.shared_turns:
+        shared = run_shared(args.shared_turns)
+        print(
+            f"\ntwo workers on one SQLite store: {shared['turns']} writer turns, "
+            f"{shared['lost']} lost, final step {shared['final_step']}, "
+            f"{shared['reader_conflicts']} reader write-backs"
+        )
+        if shared["lost"] or shared["final_step"] != args.shared_turns or shared["reader_conflicts"]:
+            failures += 1
+
+    if failures:
+        print(f"\n✗ Lost updates with session() turns in {failures} runs")
+        return 1
+
+    print("\n✓ No lost updates with session() turns")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
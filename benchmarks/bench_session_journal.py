@@ -0,0 +1,142 @@
+# benchmarks/bench_session_journal.py - Session journal overhead and recovery benchmark
+#
+#   python -m benchmarks.bench_session_journal
+#   python -m benchmarks.bench_session_journal --sessions 100000 --turns 2 --dir /tmp/session-journal
+#
+# Runs the same chat turns (locked step + slot update, user and bot message)
+# over --sessions sessions without and with the journal and reports µs per
+# turn. Then measures restart recovery: from the journal alone, and from a
+# compacted snapshot plus a journal tail of --tail-turns turns. Every
+# recovery is checked against the live sessions it replaces.
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_pipeline import _percentile
+from session.session_journal import SessionJournal
+from session.session_manager import SessionManager
+
+
+def _turn(manager: SessionManager, session_id: str, i: int):
+    with manager.session(session_id) as session:
+        session["active_flow"] = "demo_request"
+        session["current_step"] += 1
+        session["slots"]["email"] = f"{session_id}@example.com"
+    manager.add_message(session_id, "user", f"my answer number {i}")
+    manager.add_message(session_id, "bot", f"Thanks, question {i + 1}?", source="FLOW")
+
+
+def run_turns(manager: SessionManager, session_ids: list, turns: int) -> dict:
+    timings = []
+    started = time.perf_counter()
+    for t in range(turns):
+        for session_id in session_ids:
+            turn_started = time.perf_counter()
+            _turn(manager, session_id, t)
+            timings.append((time.perf_counter() - turn_started) * 1e6)
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        "turns": len(timings),
+        "mean_us": elapsed * 1e6 / len(timings),
+        "p50_us": _percentile(timings, 50),
+        "p99_us": _percentile(timings, 99),
+    }
+
+
+def _manager(directory: str | None) -> SessionManager:
+    journal = SessionJournal(directory, snapshot_records=10 ** 12) if directory else None
+    return SessionManager(session_timeout=3600, journal=journal)
+
+
+def _check(recovered: SessionManager, original: SessionManager, session_ids: list) -> int:
+    mismatches = 0
+    for session_id in session_ids[::97]:
+        if recovered.get_session_snapshot(session_id) != original.get_session_snapshot(session_id):
+            mismatches += 1
+        elif recovered.get_history(session_id) != original.get_history(session_id):
+            mismatches += 1
+    return mismatches
+
+
+def _recover(directory: str, original: SessionManager, session_ids: list) -> dict:
+    manager = _manager(directory)
+    started = time.perf_counter()
+    stats = manager.recover()
+    stats["wall_ms"] = (time.perf_counter() - started) * 1000.0
+    stats["mismatches"] = _check(manager, original, session_ids)
+    manager.journal.close()
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--turns", type=int, default=2, help="turns per session")
+    parser.add_argument("--tail-turns", type=int, default=20000, help="turns after the snapshot")
+    parser.add_argument("--dir", default=None, help="journal directory (default: a temp dir)")
+    args = parser.parse_args(argv)
+
+    directory = args.dir or tempfile.mkdtemp(prefix="session-journal-")
+    shutil.rmtree(directory, ignore_errors=True)
+    session_ids = [f"session-{i:08d}" for i in range(args.sessions)]
+
+    print(f"{args.sessions} sessions, {args.turns} turns each, journal in {directory}\n")
+    print(f"{'journal':>8} {'turns':>8} {'mean µs':>8} {'p50 µs':>7} {'p99 µs':>7}")
+
+    plain = run_turns(_manager(None), session_ids, args.turns)
+    print(f"{'off':>8} {plain['turns']:>8} {plain['mean_us']:>8.1f} {plain['p50_us']:>7.1f} {plain['p99_us']:>7.1f}")
+
+    manager = _manager(directory)
+    journaled = run_turns(manager, session_ids, args.turns)
+    manager.journal.commit()
+    print(f"{'on':>8} {journaled['turns']:>8} {journaled['mean_us']:>8.1f} {journaled['p50_us']:>7.1f} {journaled['p99_us']:>7.1f}")
+
+    journal = manager.journal.describe()
+    print(
+        f"\njournal: {journal['records_written']} records, {journal['bytes_written'] / 1e6:.1f} MB, "
+        f"{journal['commits']} group commits (fsyncs), "
+        f"{journaled['turns'] / max(journal['commits'], 1):.0f} turns per fsync"
+    )
+
+    failures = 0
+    print(f"\n{'recovery':>16} {'sessions':>9} {'snapshot':>9} {'records':>9} {'ms':>8} {'mismatches':>11}")
+
+    report = _recover(directory, manager, session_ids)
+    failures += report["mismatches"]
+    print(
+        f"{'journal only':>16} {report['sessions']:>9} {report['from_snapshot']:>9} "
+        f"{report['replayed_records']:>9} {report['wall_ms']:>8.0f} {report['mismatches']:>11}"
+    )
+
+    snapshot = manager.journal.snapshot()
+    print(f"\nsnapshot: {snapshot['sessions']} sessions in {snapshot['ms']:.0f} ms")
+    tail_ids = session_ids[:args.tail_turns]
+    run_turns(manager, tail_ids, 1)
+    manager.journal.commit()
+
+    report = _recover(directory, manager, session_ids)
+    failures += report["mismatches"]
+    print(
+        f"{'snapshot + tail':>16} {report['sessions']:>9} {report['from_snapshot']:>9} "
+        f"{report['replayed_records']:>9} {report['wall_ms']:>8.0f} {report['mismatches']:>11}"
+    )
+
+    manager.close()
+    if not args.dir:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if failures:
+        print("\n✗ Recovered sessions differ from the live ones")
+        return 1
+    print("\n✓ Recovered sessions match the live ones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
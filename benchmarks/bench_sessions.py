@@ -0,0 +1,154 @@
+# benchmarks/bench_sessions.py - Session memory footprint benchmark
+#
+#   python -m benchmarks.bench_sessions
+#   python -m benchmarks.bench_sessions --sessions 100000 --turns 0,4,20
+#   python -m benchmarks.bench_sessions --latency --store sqlite --workers 1,2,4
+#
+# Fills a SessionManager through its public API (get_or_create_session,
+# update_intent, add_message, a slot write) and reports the traced heap
+# bytes per session for each history length. Message texts are distinct
+# strings, as they would be in real traffic, so they are part of the figure.
+#
+# --latency instead runs chat turns (lookup, step update, intent, two
+# messages) from N worker processes over a shared pool of session ids and
+# reports the per-turn store latency and the aggregate turns/s.
+
+import argparse
+import gc
+import multiprocessing
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_pipeline import _percentile
+from session.session_manager import SessionManager
+from session.session_store import build_session_store
+
+
+def fill(manager: SessionManager, sessions: int, turns: int):
+    for i in range(sessions):
+        session_id = f"session-{i:08d}"
+        session = manager.get_or_create_session(session_id)
+        manager.update_intent(session_id, "pricing_query")
+        if i % 4 == 0:
+            session["slots"]["email"] = f"user{i}@example.com"
+
+        for t in range(turns):
+            manager.add_message(session_id, "user", f"how much does plan {t} cost for team {i}?")
+            manager.add_message(session_id, "bot", f"Plan {t} is priced per seat, reply {i}.", source="RULE")
+
+
+def measure(sessions: int, turns: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    started = time.perf_counter()
+    manager = SessionManager(session_timeout=3600)
+    fill(manager, sessions, turns)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    history = manager.get_history(f"session-{sessions - 1:08d}")
+    return {
+        "turns": turns,
+        "messages": len(history),
+        "bytes_per_session": (after - before) / sessions,
+        "fill_s": elapsed,
+    }
+
+
+def _turn(manager: SessionManager, session_id: str, i: int):
+    session = manager.get_or_create_session(session_id)
+    session["current_step"] += 1
+    manager.update_intent(session_id, "pricing_query")
+    manager.add_message(session_id, "user", f"how much does plan {i} cost?")
+    manager.add_message(session_id, "bot", f"Plan {i} is priced per seat.", source="RULE")
+
+
+def _latency_worker(store: str, path: str, pool: int, turns: int, seed: int, results):
+    manager = SessionManager(session_timeout=3600, store=build_session_store(store, path))
+    rng = random.Random(seed)
+    timings = []
+
+    started = time.perf_counter()
+    for i in range(turns):
+        session_id = f"session-{rng.randrange(pool):08d}"
+        turn_started = time.perf_counter()
+        _turn(manager, session_id, i)
+        timings.append((time.perf_counter() - turn_started) * 1e6)
+    manager.close()
+
+    results.put((timings, time.perf_counter() - started))
+
+
+def measure_latency(store: str, path: str, workers: int, turns: int, pool: int) -> dict:
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=_latency_worker, args=(store, path, pool, turns, seed, results))
+        for seed in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    timings = sorted(t for worker_timings, _ in outcomes for t in worker_timings)
+    wall = max(elapsed for _, elapsed in outcomes)
+    return {
+        "workers": workers,
+        "p50_us": _percentile(timings, 50),
+        "p99_us": _percentile(timings, 99),
+        "turns_per_s": len(timings) / wall,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--turns", default="0,4,20", help="user+bot turns per session, comma separated")
+    parser.add_argument("--latency", action="store_true", help="measure per-turn store latency instead of memory")
+    parser.add_argument("--store", default="sqlite", choices=["memory", "sqlite"])
+    parser.add_argument("--store-path", default="/tmp/bench_sessions.db")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--turns-per-worker", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    if args.latency:
+        pool = min(args.sessions, 10000)
+        print(f"store: {args.store}, {args.turns_per_worker} turns per worker over {pool} sessions\n")
+        print(f"{'workers':>8} {'p50 (µs)':>9} {'p99 (µs)':>9} {'turns/s':>9}")
+        for workers in [int(w) for w in args.workers.split(",")]:
+            result = measure_latency(args.store, args.store_path, workers, args.turns_per_worker, pool)
+            print(
+                f"{result['workers']:>8} {result['p50_us']:>9.1f} "
+                f"{result['p99_us']:>9.1f} {result['turns_per_s']:>9.0f}"
+            )
+        return 0
+
+    print(f"{args.sessions} sessions\n")
+    print(f"{'turns':>6} {'messages':>9} {'bytes/session':>14} {'fill (s)':>9}")
+
+    for turns in [int(t) for t in args.turns.split(",")]:
+        result = measure(args.sessions, turns)
+        print(
+            f"{result['turns']:>6} {result['messages']:>9} "
+            f"{result['bytes_per_session']:>14.0f} {result['fill_s']:>9.2f}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+# bulk_classify.py - Offline reclassification of JSONL traffic logs
+#
+#   python bulk_classify.py logs/queries.jsonl results.jsonl --workers 4
+#
+# Streams the input, runs the rule engine plus batched ML classification in
+# a process pool, and appends results as they complete. Progress is
+# checkpointed to <output>.ckpt so an interrupted run resumes where it stopped.
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+
+# -------------------- WORKER --------------------
+_worker = {}
+
+
+def _init_worker(classifier_path, backend, threads):
+    if threads:
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    from ml_pipeline.model_loader import load_semantic_model, load_classifier
+    from rule_engine.rule_pipeline import RulePipeline, DEFAULT_RULE_FILES
+    from utils.preprocess import preprocess_text
+
+    _worker["semantic_model"] = load_semantic_model(backend=backend)
+    _worker["classifier"] = load_classifier(classifier_path)
+    _worker["rule_pipeline"] = RulePipeline(rule_files=DEFAULT_RULE_FILES)
+    _worker["preprocess_fn"] = preprocess_text
+
+
+def _classify_chunk(task):
+    """
+    Args:
+        task: ([(line_no, raw JSONL line)], field)
+
+    Returns:
+        list: serialized result lines (bytes), one per input line
+    """
+    from ml_pipeline.ml_engine import ml_predict_batch
+
+    lines, field = task
+    rule_pipeline = _worker["rule_pipeline"]
+
+    records = []
+    ml_queue = []
+
+    for line_no, raw in lines:
+        record = {"line": line_no}
+        records.append(record)
+
+        try:
+            data = json.loads(raw)
+            query = data[field] if isinstance(data, dict) else None
+        except (ValueError, KeyError):
+            query = None
+            data = None
+
+        if not isinstance(query, str) or not query.strip():
+            record["error"] = f"missing or empty '{field}'"
+            continue
+
+        query = query.strip()
+        record["query"] = query
+        if isinstance(data, dict) and "request_id" in data:
+            record["request_id"] = data["request_id"]
+
+        rule = rule_pipeline.run(query)
+        record["rule_reason"] = rule.get("reason")
+
+        if rule.get("matched") and not rule.get("allow_ml_fallback", True):
+            record.update({
+                "source": "RULE",
+                "intent": rule["intent"],
+                "confidence": rule["confidence"],
+            })
+            continue
+
+        ml_queue.append((record, query))
+
+    if ml_queue:
+        results = ml_predict_batch(
+            [query for _, query in ml_queue],
+            _worker["classifier"],
+            _worker["semantic_model"],
+            _worker["preprocess_fn"]
+        )
+        for (record, _), (intent, confidence) in zip(ml_queue, results):
+            record.update({
+                "source": "ML",
+                "intent": str(intent),
+                "confidence": None if confidence is None else round(float(confidence), 6),
+            })
+
+    return [(json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8") for record in records]
+
+
+# -------------------- CHECKPOINT --------------------
+def _checkpoint_path(output_path):
+    return output_path + ".ckpt"
+
+
+def _load_checkpoint(output_path):
+    path = _checkpoint_path(output_path)
+    if not os.path.exists(path):
+        return {"input_offset": 0, "output_offset": 0, "lines": 0}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_checkpoint(output_path, state):
+    path = _checkpoint_path(output_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+# -------------------- INPUT --------------------
+def _read_chunks(input_file, start_line, chunk_size):
+    """
+    Yields (lines, end_offset, next_line_no) chunks, `lines` being
+    (line_no, text) pairs of the non-blank lines. `end_offset` is the byte
+    position right after the chunk, used as the resume point.
+    """
+    line_no = start_line
+    lines = []
+
+    for raw in iter(input_file.readline, b""):
+        if raw.strip():
+            lines.append((line_no, raw.decode("utf-8", errors="replace")))
+        line_no += 1
+
+        if len(lines) >= chunk_size:
+            yield lines, input_file.tell(), line_no
+            lines = []
+
+    if lines:
+        yield lines, input_file.tell(), line_no
+
+
+# -------------------- MAIN --------------------
+def run(args):
+    state = _load_checkpoint(args.output) if args.resume else {"input_offset": 0, "output_offset": 0, "lines": 0}
+
+    if args.resume and state["output_offset"]:
+        # Seeking past the end of a missing or shorter output would pad it with NUL bytes
+        size = os.path.getsize(args.output) if os.path.exists(args.output) else None
+        if size is None or size < state["output_offset"]:
+            found = "missing" if size is None else f"only {size} bytes"
+            print(
+                f"✗ {_checkpoint_path(args.output)} expects {state['output_offset']} bytes of results in "
+                f"{args.output}, which is {found}; delete the checkpoint to start over",
+                file=sys.stderr
+            )
+            return 1
+
+    if args.resume and state["lines"]:
+        print(f"↻ Resuming at line {state['lines']} (byte {state['input_offset']})", file=sys.stderr)
+
+    init_args = (args.classifier, args.backend, args.threads_per_worker)
+    pool = None
+    if args.workers > 0:
+        pool = Pool(processes=args.workers, initializer=_init_worker, initargs=init_args)
+    else:
+        _init_worker(*init_args)
+
+    max_in_flight = max(1, args.workers) * args.prefetch
+    started = time.perf_counter()
+    last_report = started
+    processed = 0
+
+    output_mode = "r+b" if args.resume and os.path.exists(args.output) else "wb"
+
+    with open(args.input, "rb") as input_file, open(args.output, output_mode) as output_file:
+        # Drop anything written after the last checkpoint
+        output_file.seek(state["output_offset"])
+        output_file.truncate()
+        input_file.seek(state["input_offset"])
+
+        pending = deque()
+        chunks = _read_chunks(input_file, state["lines"], args.chunk_size)
+
+        def submit(chunk):
+            lines, end_offset, next_line = chunk
+            task = (lines, args.field)
+            result = pool.apply_async(_classify_chunk, (task,)) if pool else _classify_chunk(task)
+            pending.append((result, len(lines), end_offset, next_line))
+
+        def collect():
+            nonlocal processed
+            result, count, end_offset, next_line = pending.popleft()
+            lines = result.get() if pool else result
+
+            output_file.writelines(lines)
+            output_file.flush()
+
+            state.update({
+                "input_offset": end_offset,
+                "output_offset": output_file.tell(),
+                "lines": next_line,
+            })
+            _save_checkpoint(args.output, state)
+            processed += count
+
+        try:
+            for chunk in chunks:
+                submit(chunk)
+                while len(pending) >= max_in_flight:
+                    collect()
+
+                now = time.perf_counter()
+                if now - last_report >= args.progress_every:
+                    _report(processed, now - started)
+                    last_report = now
+
+            while pending:
+                collect()
+        finally:
+            if pool:
+                pool.terminate()
+                pool.join()
+
+    elapsed = time.perf_counter() - started
+    _report(processed, elapsed, final=True)
+    return 0
+
+
+def _report(processed, elapsed, final=False):
+    qps = processed / elapsed if elapsed > 0 else 0.0
+    prefix = "✓ Done:" if final else "…"
+    print(f"{prefix} {processed} queries in {elapsed:.1f}s ({qps:.1f} queries/sec)", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reclassify JSONL query logs offline")
+    parser.add_argument("input", help="JSONL file with one query object per line")
+    parser.add_argument("output", help="JSONL results file")
+    parser.add_argument("--field", default="query", help="JSON field holding the query text")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (0 = classify in this process)")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=256, help="Lines per batch sent to a worker")
+    parser.add_argument("--prefetch", type=int, default=2, help="Chunks in flight per worker")
+    parser.add_argument("--classifier", default="model/svc_classifier.joblib")
+    parser.add_argument("--backend", default=None, help="Semantic backend: torch or onnx")
+    parser.add_argument("--resume", action="store_true", help="Continue from <output>.ckpt")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="Seconds between throughput reports")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,16 @@
 # flow_pipeline/app.py - Flask Web API for Semantic Intent Classification
 
 from flask import Flask, request, jsonify
-from flow_pipeline.flow_handler import flow_handler
 from flow_pipeline.flow_registry import flow_registry
 from ml_pipeline.orchestrator import chatbot_pipeline
-from ml_pipeline.response_resolver import ResponseResolver
+from ml_pipeline.batch_scheduler import batch_scheduler, BATCHING_ENABLED
+from ml_pipeline.model_registry import model_registry, WARMUP_ON_START
 from utils.preprocess import preprocess_text
+from utils.query_context import QueryContext
 from rule_engine.query_analyzer import analyze_query_characteristics, get_query_intent_category
-import joblib
-from sentence_transformers import SentenceTransformer
+from rule_engine.rule_watcher import RULES_WATCH_ENABLED
 import logging
+import uuid
 from datetime import datetime
 
 # Setup logging
@@ -18,15 +19,24 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Load models once
-try:
-    semantic_model = SentenceTransformer("semantic_model/")
-    classifier = joblib.load("model/svc_classifier.joblib")
-    resolver = ResponseResolver("responses/intent_responses.yml")
-    logger.info("✓ Models loaded successfully")
-except Exception as e:
-    logger.error(f"✗ Error loading models: {e}")
-    raise
+# Load models once (shared registry; MODEL_WARMUP=0 defers to first use)
+if WARMUP_ON_START:
+    try:
+        model_registry.warmup()
+        logger.info("✓ Models loaded successfully")
+    except Exception as e:
+        logger.error(f"✗ Error loading models: {e}")
+        raise
+
+flow_handler = model_registry.flow_handler
+
+if BATCHING_ENABLED:
+    batch_scheduler.start()
+    logger.info("✓ ML micro-batching enabled")
+
+if RULES_WATCH_ENABLED:
+    model_registry.rule_watcher.start()
+    logger.info("✓ Rule hot-reload enabled")
 
 
 # ==================== API ENDPOINTS ====================
@@ -63,12 +73,14 @@ def chat():
         if not query:
             return jsonify({"success": False, "error": "Query cannot be empty"}), 400
         
+        models = model_registry.models
         ml_response = chatbot_pipeline(
-            query=query,
-            classifier=classifier,
-            semantic_model=semantic_model,
+            query=QueryContext(query, preprocess_text),
+            classifier=models.classifier,
+            semantic_model=models.semantic_model,
             preprocess_fn=preprocess_text,
-            response_resolver=resolver
+            response_resolver=model_registry.response_resolver,
+            session_id=user_id or str(uuid.uuid4())
         )
         
         intent = ml_response.get("intent")
@@ -228,6 +240,18 @@ def analyze_query():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route('/api/ml/batch-stats', methods=['GET'])
+def get_batch_stats():
+    """Returns micro-batching scheduler statistics."""
+    return jsonify({"success": True, "stats": batch_scheduler.stats()}), 200
+
+
+@app.route('/api/ml/load-stats', methods=['GET'])
+def get_load_stats():
+    """Returns import/load timings of the shared models."""
+    return jsonify({"success": True, "stats": model_registry.timings()}), 200
+
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -21,12 +21,11 @@ class FlowHandler:
         if not valid:
             return {"success": False, "error": error}
 
-        session = self.session_manager.get_or_create_session(user_id)
-
-        session["active_flow"] = intent
-        session["current_step"] = 0
-        session.setdefault("slots", {})   #  KEEP existing memory
-        session["last_active"] = time.time()
+        with self.session_manager.session(user_id) as session:
+            session["active_flow"] = intent
+            session["current_step"] = 0
+            session.setdefault("slots", {})   #  KEEP existing memory
+            session["last_active"] = time.time()
 
         question = flow_def["steps"][0]["question"]
 
@@ -38,11 +37,27 @@ class FlowHandler:
         }
 
     def handle_response(self, user_id: str, user_response: str) -> dict:
-        session = self.session_manager.get_or_create_session(user_id)
+        # One read-modify-write turn; post-flow actions run after the lock is released
+        with self.session_manager.session(user_id) as session:
+            result, completed_slots = self._advance(session, user_response)
+
+        if completed_slots is not None:
+            #  Send email / webhook / CRM
+            handle_post_flow(result["intent"], completed_slots)
+
+        return result
+
+    def _advance(self, session, user_response: str):
+        """
+        Validates the answer and moves the session's flow forward.
+
+        Returns:
+            tuple: (response dict, slots to hand to post-flow actions or None)
+        """
         intent = session.get("active_flow")
 
         if not intent:
-            return {"success": False, "error": "No active flow"}
+            return {"success": False, "error": "No active flow"}, None
 
         flow_def = flow_registry.get_flow_for_intent(intent)
         steps = flow_def["steps"]
@@ -60,7 +75,7 @@ class FlowHandler:
                 "success": True,
                 "completed": False,
                 "reply": error or step_def["question"]
-            }
+            }, None
 
         if slot:
             session["slots"][slot] = user_response   # ✅ unified memory
@@ -72,9 +87,6 @@ class FlowHandler:
             session["last_completed_flow"] = intent
             session["current_step"] = 0
 
-            #  Send email / webhook / CRM
-            handle_post_flow(intent, session["slots"])
-
             return {
                 "success": True,
                 "completed": True,
@@ -83,20 +95,36 @@ class FlowHandler:
                     "Thank you! We have collected all the information. "
                     "Our team will contact you shortly."
                 )
-            }
+            }, dict(session["slots"])
 
         return {
             "success": True,
             "completed": False,
             "reply": steps[session["current_step"]]["question"]
-        }
+        }, None
 
     def cancel_flow(self, user_id: str):
-        session = self.session_manager.get_or_create_session(user_id)
-
-        session["active_flow"] = None
-        session["pending_flow"] = None
-        session["current_step"] = 0
-        # do NOT clear slots
+        with self.session_manager.session(user_id) as session:
+            session["active_flow"] = None
+            session["pending_flow"] = None
+            session["current_step"] = 0
+            # do NOT clear slots
 
         return {"success": True, "message": "Flow cancelled"}
+
+    def get_session_data(self, user_id: str) -> dict:
+        snapshot = self.session_manager.get_session_snapshot(user_id)
+        if snapshot is None:
+            return {"success": False, "error": "Session not found"}
+
+        question = None
+        flow_def = flow_registry.get_flow_for_intent(snapshot["active_flow"]) if snapshot["active_flow"] else None
+        if flow_def and snapshot["current_step"] < len(flow_def["steps"]):
+            question = flow_def["steps"][snapshot["current_step"]]["question"]
+
+        return {
+            "success": True,
+            "session_id": user_id,
+            "session": snapshot,
+            "current_question": question
+        }
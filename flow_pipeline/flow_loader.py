@@ -1,8 +1,12 @@
 # flow_pipeline/flow_loader.py
 
-import yaml
+import logging
 import os
-from pathlib import Path
+import threading
+
+import yaml
+
+logger = logging.getLogger(__name__)
 
 def load_flow_definitions(directory="flow_pipeline/definitions"):
     """
@@ -14,7 +18,7 @@ def load_flow_definitions(directory="flow_pipeline/definitions"):
     flows = {}
     
     if not os.path.exists(directory):
-        print(f"Warning: Flow definitions directory '{directory}' not found")
+        logger.warning(f"Flow definitions directory '{directory}' not found")
         return flows
     
     for filename in os.listdir(directory):
@@ -27,9 +31,9 @@ def load_flow_definitions(directory="flow_pipeline/definitions"):
                         # Extract flow name from file (e.g., demo_booking_flow.yaml → demo_booking_flow)
                         flow_name = filename.rsplit(".", 1)[0]
                         flows[flow_name] = data
-                        print(f"✓ Loaded flow: {flow_name}")
+                        logger.info(f"✓ Loaded flow: {flow_name}")
             except Exception as e:
-                print(f"✗ Error loading {filename}: {e}")
+                logger.error(f"✗ Error loading {filename}: {e}")
     
     return flows
 
@@ -46,7 +50,7 @@ def get_flow_definition(flow_name, flows_cache=None):
         dict: Flow definition or None if not found
     """
     if flows_cache is None:
-        flows_cache = load_flow_definitions()
+        flows_cache = get_flows_cache()
     
     return flows_cache.get(flow_name)
 
@@ -88,5 +92,29 @@ def validate_flow_structure(flow_definition):
     return True, None
 
 
-# Initialize flows on module load
-FLOWS_CACHE = load_flow_definitions()
\ No newline at end of file
+# -------------------- LAZY CACHE --------------------
+_flows_cache = None
+_flows_lock = threading.Lock()
+
+
+def get_flows_cache():
+    """
+    Returns the flow definitions, loading them on first use.
+
+    Returns:
+        dict: A dictionary mapping flow_name to flow_definition
+    """
+    global _flows_cache
+
+    if _flows_cache is None:
+        with _flows_lock:
+            if _flows_cache is None:
+                _flows_cache = load_flow_definitions()
+    return _flows_cache
+
+
+def __getattr__(name):
+    # Backward compatibility: FLOWS_CACHE used to be loaded at import time
+    if name == "FLOWS_CACHE":
+        return get_flows_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
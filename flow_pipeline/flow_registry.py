@@ -1,6 +1,6 @@
 # flow_pipeline/flow_registry.py
 
-from flow_pipeline.flow_loader import FLOWS_CACHE
+from flow_pipeline.flow_loader import get_flows_cache
 
 class FlowRegistry:
     """
@@ -9,9 +9,16 @@ class FlowRegistry:
     """
     
     def __init__(self, flows_cache=None):
-        self.flows_cache = flows_cache or FLOWS_CACHE
+        # None → flow definitions are loaded on first lookup
+        self._flows_cache = flows_cache or None
         # Intent to flow mapping
         self.intent_to_flow = self._build_intent_mapping()
+
+    @property
+    def flows_cache(self):
+        if self._flows_cache is None:
+            self._flows_cache = get_flows_cache()
+        return self._flows_cache
     
     def _build_intent_mapping(self):
         """
@@ -1,10 +1,9 @@
 import uuid
-import joblib
-from sentence_transformers import SentenceTransformer
 
 from ml_pipeline.orchestrator import chatbot_pipeline
-from ml_pipeline.response_resolver import ResponseResolver
+from ml_pipeline.model_registry import model_registry
 from utils.preprocess import preprocess_text
+from utils.query_context import QueryContext
 
 from session.session_manager import SessionManager
 from session.context_extractor import extract_context
@@ -16,9 +15,11 @@ from flow_pipeline.flow_registry import flow_registry
 
 # ================= LOAD MODELS =================
 
-semantic_model = SentenceTransformer("semantic_model/")
-classifier = joblib.load("model/svc_classifier.joblib")
-resolver = ResponseResolver("responses/intent_responses.yml")
+model_registry.warmup()
+
+semantic_model = model_registry.semantic_model
+classifier = model_registry.classifier
+resolver = model_registry.response_resolver
 
 # ================= SESSION & FLOW =================
 
@@ -31,8 +32,9 @@ print("\n🤖 CLI Chatbot running (type 'exit' to quit)\n")
 
 while True:
     user_input = input("You: ").strip()
+    query = QueryContext(user_input, preprocess_text)
 
-    if user_input.lower() in ["exit", "quit"]:
+    if query.lower in ["exit", "quit"]:
         print("Bot: Goodbye!")
         break
 
@@ -42,18 +44,18 @@ while True:
     # ================= DEBUG =================
     if user_input == "/history":
         print("\n--- SESSION HISTORY ---")
-        for msg in session_manager.get_history(session_id):
+        for msg in session_manager.iter_history(session_id):
             print(f"[{msg['role'].upper()}] {msg['text']} ({msg.get('source')})")
         print("-----------------------\n")
         continue
 
     # ================= PASSIVE CONTEXT EXTRACTION =================
-    extracted = extract_context(user_input)
+    extracted = extract_context(query)
     for k, v in extracted.items():
         session["slots"][k] = v
 
     # ================= MEMORY QUESTIONS =================
-    memory_reply = resolve_memory_question(user_input, session)
+    memory_reply = resolve_memory_question(query, session)
     if memory_reply:
         print(f"Bot: {memory_reply}")
         session_manager.add_message(session_id, "bot", memory_reply, "MEMORY")
@@ -74,7 +76,7 @@ while True:
 
     # ================= ORCHESTRATOR =================
     response = chatbot_pipeline(
-        query=user_input,
+        query=query,
         classifier=classifier,
         semantic_model=semantic_model,
         preprocess_fn=preprocess_text,
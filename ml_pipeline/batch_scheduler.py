@@ -0,0 +1,224 @@
+# ml_pipeline/batch_scheduler.py
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from ml_pipeline.ml_engine import ml_predict, ml_predict_batch
+
+
+# -------------------- CONFIG --------------------
+BATCHING_ENABLED = os.getenv("ML_BATCHING", "0") == "1"
+MAX_BATCH_SIZE = int(os.getenv("ML_BATCH_MAX_SIZE", "32"))
+MAX_WAIT_MS = float(os.getenv("ML_BATCH_MAX_WAIT_MS", "5"))
+
+_STOP = object()
+
+
+class _PendingQuery:
+    __slots__ = ("query", "models", "key", "future", "enqueued_at")
+
+    def __init__(self, query, classifier, semantic_model, preprocess_fn):
+        self.query = query
+        self.models = (classifier, semantic_model, preprocess_fn)
+        self.key = (id(classifier), id(semantic_model), id(preprocess_fn))
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchScheduler:
+    """
+    Micro-batching front for ml_predict.
+
+    Concurrent callers are collected for up to `max_wait_ms` (or until
+    `max_batch_size` queries are waiting) and classified together with one
+    encode call and one classifier call. Only queries that share the same
+    classifier, semantic model and preprocess function are batched together.
+
+    When the scheduler is not running, `predict` calls ml_predict directly.
+    """
+
+    def __init__(self, max_batch_size: int = 32, max_wait_ms: float = 5.0, stats_window: int = 1024):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._queries = 0
+        self._largest_batch = 0
+        self._total_wait = 0.0
+        self._recent_sizes = deque(maxlen=stats_window)
+        self._recent_waits = deque(maxlen=stats_window)
+
+    # -------------------- LIFECYCLE --------------------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                name="ml-batch-scheduler",
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            self._thread = None
+
+        # Anything enqueued after the worker exited must still be answered
+        self._drain()
+
+    # -------------------- PUBLIC API --------------------
+    def predict(self, query, classifier, semantic_model, preprocess_fn):
+        """
+        Same contract as ml_predict: returns (intent, confidence).
+        Blocks until the batch containing this query has been classified.
+        """
+        pending = _PendingQuery(query, classifier, semantic_model, preprocess_fn)
+
+        # Checked and enqueued under the lifecycle lock: stop() cannot drain
+        # the queue between the check and the put and strand this query
+        with self._lock:
+            running = self.running
+            if running:
+                self._queue.put(pending)
+
+        if not running:
+            return ml_predict(query, classifier, semantic_model, preprocess_fn)
+        return pending.future.result()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            sizes = sorted(self._recent_sizes)
+            waits = sorted(self._recent_waits)
+            batches = self._batches
+            queries = self._queries
+
+            return {
+                "running": self.running,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": batches,
+                "queries": queries,
+                "avg_batch_size": round(queries / batches, 3) if batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "p50_batch_size": _percentile(sizes, 50),
+                "p95_batch_size": _percentile(sizes, 95),
+                "avg_queue_wait_ms": round(self._total_wait / queries * 1000.0, 3) if queries else 0.0,
+                "p50_queue_wait_ms": round(_percentile(waits, 50) * 1000.0, 3),
+                "p95_queue_wait_ms": round(_percentile(waits, 95) * 1000.0, 3),
+                "p99_queue_wait_ms": round(_percentile(waits, 99) * 1000.0, 3),
+            }
+
+    # -------------------- WORKER --------------------
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait
+            stop_requested = False
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop_requested = True
+                    break
+                batch.append(item)
+
+            self._dispatch(batch, time.perf_counter())
+
+            if stop_requested:
+                return
+
+    def _drain(self):
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+
+        dequeued_at = time.perf_counter()
+        for start in range(0, len(leftovers), self.max_batch_size):
+            self._dispatch(leftovers[start:start + self.max_batch_size], dequeued_at)
+
+    def _dispatch(self, batch, dequeued_at):
+        # Queue wait ends when the batch leaves the queue, so it does not
+        # include the inference time of groups dispatched before this one
+        groups = {}
+        for item in batch:
+            groups.setdefault(item.key, []).append(item)
+
+        for items in groups.values():
+            classifier, semantic_model, preprocess_fn = items[0].models
+
+            try:
+                results = ml_predict_batch(
+                    [item.query for item in items],
+                    classifier,
+                    semantic_model,
+                    preprocess_fn
+                )
+            except Exception as e:
+                for item in items:
+                    item.future.set_exception(e)
+                continue
+
+            self._record(items, dequeued_at)
+
+            for item, result in zip(items, results):
+                item.future.set_result(result)
+
+    def _record(self, items, dequeued_at):
+        with self._stats_lock:
+            self._batches += 1
+            self._queries += len(items)
+            self._largest_batch = max(self._largest_batch, len(items))
+            self._recent_sizes.append(len(items))
+
+            for item in items:
+                wait = dequeued_at - item.enqueued_at
+                self._total_wait += wait
+                self._recent_waits.append(wait)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+# Global scheduler (started by the serving entry points when ML_BATCHING=1)
+batch_scheduler = BatchScheduler(
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_WAIT_MS
+)
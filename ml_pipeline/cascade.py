@@ -0,0 +1,224 @@
+# ml_pipeline/cascade.py
+#
+# Confidence-gated classifier cascade: a cheap model answers when it is sure,
+# the expensive one (SVC) only sees the low-margin queries.
+#
+#   python -m ml_pipeline.cascade evaluate heldout.jsonl --sweep 0.05,0.1,0.2,0.3
+#   python -m ml_pipeline.cascade evaluate --queries logs/queries.jsonl --sweep 0.1,0.2,0.3
+#
+# The threshold is only meaningful when calibrated on data the models were
+# not trained on: held-out labelled examples, or recorded traffic (agreement
+# with the expensive model and escalation rate only, no accuracy).
+#
+# Serve it by pointing INTENT_CLASSIFIER_PATH at a cascade spec (.json):
+#
+#   {"cheap": "model/logistic_regression_classifier.joblib",
+#    "expensive": "model/svc_classifier.joblib",
+#    "min_margin": 0.2, "min_confidence": 0.0}
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+DEFAULT_MIN_MARGIN = 0.2
+DEFAULT_MIN_CONFIDENCE = 0.0
+
+
+def _with_confidence(classifier, X):
+    """(labels, confidences) the same way ml_engine.classify_embeddings gets them."""
+    if hasattr(classifier, "predict_with_confidence"):
+        return classifier.predict_with_confidence(X)
+
+    # SVC labels come from ovo votes, which can differ from the proba argmax
+    return classifier.predict(X), classifier.predict_proba(X).max(axis=1)
+
+
+class CascadeClassifier:
+    """
+    Runs `cheap` on every query and escalates to `expensive` only when the
+    cheap model's top-1 probability is below `min_confidence` or its
+    top-1 / top-2 margin is below `min_margin`.
+
+    The returned confidence comes from whichever model decided, so the
+    orchestrator thresholds keep their meaning for escalated queries.
+    """
+
+    def __init__(self, cheap, expensive, min_margin: float = DEFAULT_MIN_MARGIN, min_confidence: float = DEFAULT_MIN_CONFIDENCE):
+        if not hasattr(cheap, "predict_proba"):
+            raise ValueError("The cheap model must provide predict_proba")
+
+        self.cheap = cheap
+        self.expensive = expensive
+        self.min_margin = min_margin
+        self.min_confidence = min_confidence
+
+        self.classes_ = np.asarray(expensive.classes_)
+
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.escalated = 0
+
+    @property
+    def n_features_in_(self):
+        return getattr(self.cheap, "n_features_in_", None)
+
+    @classmethod
+    def load(cls, spec_path: str) -> "CascadeClassifier":
+        """Builds a cascade from a JSON spec (see module header)."""
+        from ml_pipeline.model_loader import load_classifier
+
+        with open(spec_path, "r") as f:
+            spec = json.load(f)
+
+        return cls(
+            load_classifier(spec["cheap"]),
+            load_classifier(spec["expensive"]),
+            min_margin=spec.get("min_margin", DEFAULT_MIN_MARGIN),
+            min_confidence=spec.get("min_confidence", DEFAULT_MIN_CONFIDENCE),
+        )
+
+    # -------------------- INFERENCE --------------------
+    def escalation_mask(self, cheap_proba):
+        """True for every row the cheap model is not sure about."""
+        top2 = np.partition(cheap_proba, -2, axis=1)[:, -2:]
+        confidence = top2[:, 1]
+        margin = top2[:, 1] - top2[:, 0]
+        return (margin < self.min_margin) | (confidence < self.min_confidence)
+
+    def predict_with_confidence(self, X):
+        X = np.asarray(X)
+        proba = self.cheap.predict_proba(X)
+
+        idx = proba.argmax(axis=1)
+        labels = np.asarray(self.cheap.classes_, dtype=object)[idx]
+        confidences = proba[np.arange(len(proba)), idx]
+
+        escalate = self.escalation_mask(proba)
+        if escalate.any():
+            rows = np.flatnonzero(escalate)
+            expensive_labels, expensive_conf = _with_confidence(self.expensive, X[rows])
+            labels[rows] = expensive_labels
+            confidences[rows] = expensive_conf
+
+        with self._lock:
+            self.queries += len(X)
+            self.escalated += int(escalate.sum())
+
+        return labels, confidences
+
+    def predict(self, X):
+        return self.predict_with_confidence(X)[0]
+
+    # -------------------- STATS --------------------
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "escalated": self.escalated,
+                "escalation_rate": round(self.escalated / self.queries, 4) if self.queries else 0.0,
+                "min_margin": self.min_margin,
+                "min_confidence": self.min_confidence,
+            }
+
+
+# -------------------- EVALUATION --------------------
+def evaluate(cascade: CascadeClassifier, X, y=None) -> dict:
+    """
+    Compares the cascade with always running the expensive model on a
+    held-out embedding set. Without labels (`y` None, recorded queries) the
+    accuracies are None.
+    """
+    X = np.asarray(X)
+    y = None if y is None else np.asarray(y, dtype=object)
+
+    started = time.perf_counter()
+    expensive_labels, _ = _with_confidence(cascade.expensive, X)
+    expensive_ms = (time.perf_counter() - started) * 1000.0
+
+    started = time.perf_counter()
+    cascade_labels, _ = cascade.predict_with_confidence(X)
+    cascade_ms = (time.perf_counter() - started) * 1000.0
+
+    escalated = cascade.escalation_mask(cascade.cheap.predict_proba(X))
+    cheap_labels = np.asarray(cascade.cheap.predict(X), dtype=object)
+    expensive_labels = np.asarray(expensive_labels, dtype=object)
+
+    def accuracy(labels):
+        return None if y is None else round(float(np.mean(labels == y)), 4)
+
+    return {
+        "examples": len(X),
+        "labelled": y is not None,
+        "min_margin": cascade.min_margin,
+        "min_confidence": cascade.min_confidence,
+        "escalation_rate": round(float(escalated.mean()), 4),
+        "accuracy_cheap": accuracy(cheap_labels),
+        "accuracy_expensive": accuracy(expensive_labels),
+        "accuracy_cascade": accuracy(cascade_labels),
+        "agreement_with_expensive": round(float(np.mean(cascade_labels == expensive_labels)), 4),
+        "expensive_ms_per_query": round(expensive_ms / len(X), 4),
+        "cascade_ms_per_query": round(cascade_ms / len(X), 4),
+    }
+
+
+def _evaluation_texts(args):
+    """
+    (texts, labels) of held-out labelled examples, or (texts, None) for the
+    queries of a recorded traffic log.
+    """
+    if args.examples:
+        from ml_pipeline.knn_engine import _read_examples
+        examples = list(_read_examples(args.examples))
+        return [text for text, _ in examples], np.array([i for _, i in examples], dtype=object)
+
+    from rule_engine.regex_profiler import load_corpus
+    return load_corpus(args.queries, field=args.field, limit=args.limit), None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Confidence-gated classifier cascade")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    eval_cmd = sub.add_parser("evaluate", help="Escalation rate and accuracy vs always using the expensive model")
+    eval_cmd.add_argument("examples", nargs="?", help='Held-out JSONL with {"text": ..., "intent": ...} per line')
+    eval_cmd.add_argument("--queries", help="Recorded traffic log (JSONL) to calibrate on instead, without labels")
+    eval_cmd.add_argument("--field", default="query", help="JSON field holding the query text in --queries")
+    eval_cmd.add_argument("--limit", type=int, default=5000, help="Queries read from --queries")
+    eval_cmd.add_argument("--cheap", default="model/logistic_regression_classifier.joblib")
+    eval_cmd.add_argument("--expensive", default="model/svc_classifier.joblib")
+    eval_cmd.add_argument("--min-margin", type=float, default=DEFAULT_MIN_MARGIN)
+    eval_cmd.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE)
+    eval_cmd.add_argument("--sweep", help="Comma-separated min_margin values to compare")
+
+    args = parser.parse_args(argv)
+    if bool(args.examples) == bool(args.queries):
+        # No fallback to training data (or the SVC support vectors): it overstates agreement
+        parser.error("give either a held-out examples file or --queries")
+
+    from ml_pipeline.ml_engine import encode_texts
+    from ml_pipeline.model_loader import load_classifier, load_semantic_model
+    from utils.preprocess import preprocess_text
+
+    texts, y = _evaluation_texts(args)
+    if not texts:
+        print(f"✗ No evaluation queries in {args.examples or args.queries}", file=sys.stderr)
+        return 1
+
+    X = encode_texts(load_semantic_model(), [preprocess_text(text) for text in texts])
+    cheap = load_classifier(args.cheap)
+    expensive = load_classifier(args.expensive)
+
+    margins = [float(m) for m in args.sweep.split(",")] if args.sweep else [args.min_margin]
+    for margin in margins:
+        cascade = CascadeClassifier(cheap, expensive, min_margin=margin, min_confidence=args.min_confidence)
+        print(json.dumps(evaluate(cascade, X, y)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
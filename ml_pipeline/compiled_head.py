@@ -0,0 +1,465 @@
+# ml_pipeline/compiled_head.py
+#
+# Compiles a fitted sklearn SVC / LogisticRegression into a small NumPy
+# artifact (.npz) and runs label + confidence in one vectorized pass.
+#
+#   python -m ml_pipeline.compiled_head model/svc_classifier.joblib model/svc_head.npz --check
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+
+# libsvm clamps pairwise probabilities to [MIN_PROB, 1 - MIN_PROB]
+MIN_PROB = 1e-7
+
+# Pairwise coupling strategies for multi-class SVC probabilities:
+# - "solve":  closed-form solution of the coupling problem (one batched solve)
+# - "libsvm": libsvm's iterative method, bit-for-bit parity with sklearn
+COUPLING_METHODS = ("solve", "libsvm")
+
+
+# -------------------- EXPORT --------------------
+def export_head(classifier, path: str) -> dict:
+    """
+    Converts a fitted classifier into plain arrays and saves them to `path`.
+
+    Supported:
+    - sklearn.svm.SVC (probability=True, any built-in kernel)
+    - sklearn.linear_model.LogisticRegression
+
+    Returns:
+        dict: The exported arrays
+    """
+    name = type(classifier).__name__
+
+    if name == "SVC":
+        arrays = _export_svc(classifier)
+    elif name == "LogisticRegression":
+        arrays = _export_logistic(classifier)
+    else:
+        raise ValueError(f"Cannot compile classifier of type {name}")
+
+    np.savez(path, **arrays)
+    return arrays
+
+
+def _export_classes(classes):
+    classes = np.asarray(classes)
+    if classes.dtype.kind == "O":
+        classes = classes.astype(str)
+    return classes
+
+
+def _export_svc(svc) -> dict:
+    if not getattr(svc, "probability", False):
+        raise ValueError("SVC must be fitted with probability=True to produce confidences")
+
+    classes = _export_classes(svc.classes_)
+    n_class = len(classes)
+    n_support = np.asarray(svc.n_support_)
+    support_vectors = np.asarray(svc.support_vectors_, dtype=np.float64)
+
+    # libsvm's raw (unflipped) one-vs-one coefficients
+    dual_coef = np.asarray(svc._dual_coef_, dtype=np.float64)
+    intercept = np.asarray(svc._intercept_, dtype=np.float64)
+    prob_a = np.asarray(getattr(svc, "probA_", getattr(svc, "_probA", None)), dtype=np.float64)
+    prob_b = np.asarray(getattr(svc, "probB_", getattr(svc, "_probB", None)), dtype=np.float64)
+
+    # Scatter the dual coefficients into one (n_sv, n_pairs) matrix so that
+    # every pairwise decision value becomes a column of K(x, SV) @ pair_coef
+    start = np.concatenate([[0], np.cumsum(n_support)[:-1]])
+    n_pairs = n_class * (n_class - 1) // 2
+    pair_coef = np.zeros((len(support_vectors), n_pairs), dtype=np.float64)
+    pairs = np.zeros((n_pairs, 2), dtype=np.int32)
+
+    p = 0
+    for i in range(n_class):
+        for j in range(i + 1, n_class):
+            si, ci = start[i], n_support[i]
+            sj, cj = start[j], n_support[j]
+            pair_coef[si:si + ci, p] = dual_coef[j - 1, si:si + ci]
+            pair_coef[sj:sj + cj, p] = dual_coef[i, sj:sj + cj]
+            pairs[p] = (i, j)
+            p += 1
+
+    arrays = {
+        "classes": classes,
+        "intercept": intercept,
+        "prob_a": prob_a,
+        "prob_b": prob_b,
+        "pairs": pairs,
+    }
+
+    if svc.kernel == "linear":
+        # K(x, sv) = x . sv, so the support vectors collapse into one weight row per pair
+        arrays["kind"] = np.array("svc_linear")
+        arrays["weights"] = (support_vectors.T @ pair_coef).T
+    else:
+        arrays["kind"] = np.array("svc_kernel")
+        arrays["kernel"] = np.array(svc.kernel)
+        arrays["gamma"] = np.array(float(svc._gamma))
+        arrays["coef0"] = np.array(float(svc.coef0))
+        arrays["degree"] = np.array(int(svc.degree))
+        arrays["support_vectors"] = support_vectors
+        arrays["pair_coef"] = pair_coef
+
+    return arrays
+
+
+def _export_logistic(clf) -> dict:
+    classes = _export_classes(clf.classes_)
+    multi_class = getattr(clf, "multi_class", "auto")
+
+    if len(classes) <= 2:
+        kind = "logistic_binary"
+    elif multi_class in ("ovr", "warn") or (
+        multi_class in ("auto", "deprecated") and clf.solver == "liblinear"
+    ):
+        kind = "logistic_ovr"
+    else:
+        kind = "logistic_multinomial"
+
+    return {
+        "kind": np.array(kind),
+        "classes": classes,
+        "weights": np.asarray(clf.coef_, dtype=np.float64),
+        "intercept": np.asarray(clf.intercept_, dtype=np.float64),
+    }
+
+
+# -------------------- INFERENCE --------------------
+class CompiledHead:
+    """
+    Inference engine for an exported classifier head.
+
+    Exposes the sklearn-style `predict` / `predict_proba` plus
+    `predict_with_confidence`, which ml_predict uses to get the label and
+    confidence from a single pass over the decision values.
+
+    Labels always match sklearn exactly. With coupling="solve" (default)
+    SVC probabilities are the exact optimum of the problem libsvm solves
+    iteratively to a 0.005/k tolerance, so they can differ from sklearn by
+    a few 1e-3.
+    """
+
+    def __init__(self, arrays: dict, coupling: str = "solve"):
+        if coupling not in COUPLING_METHODS:
+            raise ValueError(f"coupling must be one of {COUPLING_METHODS}")
+
+        self.kind = str(arrays["kind"])
+        self.coupling = coupling
+
+        classes = np.asarray(arrays["classes"])
+        if classes.dtype.kind == "U":
+            classes = np.array(classes.tolist(), dtype=object)
+        self.classes_ = classes
+
+        self.intercept = np.asarray(arrays["intercept"], dtype=np.float64)
+        self.weights = arrays.get("weights")
+
+        if self.kind.startswith("svc"):
+            self.prob_a = np.asarray(arrays["prob_a"], dtype=np.float64)
+            self.prob_b = np.asarray(arrays["prob_b"], dtype=np.float64)
+            pairs = np.asarray(arrays["pairs"])
+            n_class = len(self.classes_)
+            # One-hot maps from pair index to the two competing classes
+            self._pair_i = np.eye(n_class)[pairs[:, 0]]
+            self._pair_j = np.eye(n_class)[pairs[:, 1]]
+            self._pairs = pairs
+
+        if self.kind == "svc_kernel":
+            self.kernel = str(arrays["kernel"])
+            self.gamma = float(arrays["gamma"])
+            self.coef0 = float(arrays["coef0"])
+            self.degree = int(arrays["degree"])
+            self.support_vectors = np.asarray(arrays["support_vectors"], dtype=np.float64)
+            self.pair_coef = np.asarray(arrays["pair_coef"], dtype=np.float64)
+            self._sv_sq_norms = np.einsum("ij,ij->i", self.support_vectors, self.support_vectors)
+
+    @classmethod
+    def load(cls, path: str, coupling: str = "solve") -> "CompiledHead":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files}, coupling=coupling)
+
+    # -------------------- PUBLIC API --------------------
+    def predict(self, X):
+        return self.predict_with_confidence(X)[0]
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if self.kind.startswith("svc"):
+            return self._svc_proba(self._svc_decision(X))
+        return self._logistic_proba(self._logistic_decision(X))
+
+    def predict_with_confidence(self, X):
+        """
+        Returns:
+            tuple: (labels, confidences) arrays, one entry per row of X
+        """
+        X = np.asarray(X, dtype=np.float64)
+
+        if self.kind.startswith("svc"):
+            dec = self._svc_decision(X)
+            wins = (dec > 0).astype(np.float64)
+            votes = wins @ self._pair_i + (1.0 - wins) @ self._pair_j
+            label_idx = votes.argmax(axis=1)
+            proba = self._svc_proba(dec)
+        else:
+            dec = self._logistic_decision(X)
+            if self.kind == "logistic_binary":
+                label_idx = (dec[:, 0] > 0).astype(np.intp)
+            else:
+                label_idx = dec.argmax(axis=1)
+            proba = self._logistic_proba(dec)
+
+        return self.classes_[label_idx], proba.max(axis=1)
+
+    # -------------------- SVC --------------------
+    def _svc_decision(self, X):
+        if self.kind == "svc_linear":
+            return X @ self.weights.T + self.intercept
+        return self._kernel(X) @ self.pair_coef + self.intercept
+
+    def _kernel(self, X):
+        dots = X @ self.support_vectors.T
+        if self.kernel == "rbf":
+            sq_dist = np.einsum("ij,ij->i", X, X)[:, None] + self._sv_sq_norms[None, :] - 2.0 * dots
+            return np.exp(-self.gamma * np.maximum(sq_dist, 0.0))
+        if self.kernel == "poly":
+            return (self.gamma * dots + self.coef0) ** self.degree
+        if self.kernel == "sigmoid":
+            return np.tanh(self.gamma * dots + self.coef0)
+        raise ValueError(f"Unsupported kernel: {self.kernel}")
+
+    def _svc_proba(self, dec):
+        # Platt scaling of every pairwise decision value (libsvm sigmoid_predict)
+        f_ab = dec * self.prob_a + self.prob_b
+        pairwise = np.where(
+            f_ab >= 0,
+            np.exp(-np.abs(f_ab)) / (1.0 + np.exp(-np.abs(f_ab))),
+            1.0 / (1.0 + np.exp(-np.abs(f_ab)))
+        )
+        pairwise = np.clip(pairwise, MIN_PROB, 1.0 - MIN_PROB)
+
+        # sklearn's bundled libsvm couples even the two-class case
+        n_class = len(self.classes_)
+        r = np.zeros((len(dec), n_class, n_class))
+        i_idx, j_idx = self._pairs[:, 0], self._pairs[:, 1]
+        r[:, i_idx, j_idx] = pairwise
+        r[:, j_idx, i_idx] = 1.0 - pairwise
+
+        if self.coupling == "libsvm":
+            return _couple_pairwise(r)
+        return _solve_coupling(r)
+
+    # -------------------- LOGISTIC --------------------
+    def _logistic_decision(self, X):
+        return X @ self.weights.T + self.intercept
+
+    def _logistic_proba(self, dec):
+        if self.kind == "logistic_binary":
+            p1 = _sigmoid(dec[:, 0])
+            return np.column_stack([1.0 - p1, p1])
+
+        if self.kind == "logistic_ovr":
+            proba = _sigmoid(dec)
+            return proba / proba.sum(axis=1, keepdims=True)
+
+        shifted = dec - dec.max(axis=1, keepdims=True)
+        exp = np.exp(shifted)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _sigmoid(x):
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def _coupling_matrix(r):
+    """Q[t][t] = sum_j r[j][t]^2 ; Q[t][j] = -r[j][t] * r[t][j]"""
+    k = r.shape[1]
+    Q = -np.transpose(r, (0, 2, 1)) * r
+    Q[:, np.arange(k), np.arange(k)] = np.einsum("njt,njt->nt", r, r)
+    return Q
+
+
+def _solve_coupling(r):
+    """
+    Solves min p'Qp subject to sum(p) = 1 directly via its KKT system
+    [[Q, 1], [1', 0]] [p; b] = [0; 1], for every row of the batch at once.
+    """
+    n, k, _ = r.shape
+
+    kkt = np.zeros((n, k + 1, k + 1))
+    kkt[:, :k, :k] = _coupling_matrix(r)
+    kkt[:, :k, k] = 1.0
+    kkt[:, k, :k] = 1.0
+
+    rhs = np.zeros((n, k + 1, 1))
+    rhs[:, k, 0] = 1.0
+
+    p = np.linalg.solve(kkt, rhs)[:, :k, 0]
+    return np.clip(p, 0.0, None)
+
+
+def _couple_pairwise(r):
+    """
+    Wu, Lin & Weng pairwise coupling, as in libsvm's multiclass_probability,
+    run for every row of the batch at once. Rows stop updating as soon as
+    they converge, so each row follows exactly the per-sample iteration.
+
+    Args:
+        r: (n, k, k) array with r[:, i, j] = P(class i | class i or j)
+    """
+    n, k, _ = r.shape
+    max_iter = max(100, k)
+    eps = 0.005 / k
+
+    Q = _coupling_matrix(r)
+    p = np.full((n, k), 1.0 / k)
+    active = np.arange(n)
+
+    for _ in range(max_iter):
+        Qa = Q[active]
+        pa = p[active]
+
+        Qp = np.einsum("ntj,nj->nt", Qa, pa)
+        pQp = np.einsum("nt,nt->n", pa, Qp)
+
+        max_error = np.abs(Qp - pQp[:, None]).max(axis=1)
+        still_active = max_error >= eps
+        if not still_active.any():
+            break
+
+        active = active[still_active]
+        Qa, pa, Qp, pQp = Qa[still_active], pa[still_active], Qp[still_active], pQp[still_active]
+
+        for t in range(k):
+            q_tt = Qa[:, t, t]
+            diff = (-Qp[:, t] + pQp) / q_tt
+            pa[:, t] += diff
+            scale = 1.0 + diff
+            pQp = (pQp + diff * (diff * q_tt + 2.0 * Qp[:, t])) / scale / scale
+            Qp = (Qp + diff[:, None] * Qa[:, t, :]) / scale[:, None]
+            pa /= scale[:, None]
+
+        p[active] = pa
+
+    return p
+
+
+# -------------------- PARITY & LATENCY --------------------
+def check_parity(classifier, head: CompiledHead, X, atol: float = 1e-6) -> dict:
+    """
+    Compares the compiled head against the original sklearn estimator.
+
+    Returns:
+        dict: label agreement, max absolute probability difference, passed
+    """
+    X = np.asarray(X, dtype=np.float64)
+
+    expected_labels = classifier.predict(X)
+    expected_proba = classifier.predict_proba(X)
+
+    labels, confidences = head.predict_with_confidence(X)
+    proba = head.predict_proba(X)
+
+    label_agreement = float(np.mean(labels == expected_labels))
+    max_proba_diff = float(np.abs(proba - expected_proba).max())
+    max_conf_diff = float(np.abs(confidences - expected_proba.max(axis=1)).max())
+
+    return {
+        "samples": len(X),
+        "label_agreement": label_agreement,
+        "max_proba_diff": max_proba_diff,
+        "max_confidence_diff": max_conf_diff,
+        "passed": label_agreement == 1.0 and max_proba_diff <= atol,
+    }
+
+
+def compare_latency(classifier, head: CompiledHead, X, batch_sizes=(1, 32), repeats: int = 200) -> dict:
+    """
+    Times sklearn predict + predict_proba against the single-pass head.
+
+    Returns:
+        dict: batch_size -> mean milliseconds per call for both paths
+    """
+    X = np.asarray(X, dtype=np.float64)
+    report = {}
+
+    for batch_size in batch_sizes:
+        batch = X[:batch_size]
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            classifier.predict(batch)
+            classifier.predict_proba(batch)
+        sklearn_ms = (time.perf_counter() - started) / repeats * 1000.0
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            head.predict_with_confidence(batch)
+        head_ms = (time.perf_counter() - started) / repeats * 1000.0
+
+        report[batch_size] = {
+            "sklearn_ms": round(sklearn_ms, 4),
+            "compiled_ms": round(head_ms, 4),
+            "speedup": round(sklearn_ms / head_ms, 2) if head_ms else None,
+        }
+
+    return report
+
+
+def _probe_inputs(classifier, n_random: int = 256, seed: int = 0):
+    """Support vectors (real training embeddings) plus random unit vectors."""
+    rng = np.random.default_rng(seed)
+    dim = classifier.n_features_in_
+
+    random = rng.standard_normal((n_random, dim))
+    random /= np.linalg.norm(random, axis=1, keepdims=True)
+
+    support_vectors = getattr(classifier, "support_vectors_", None)
+    if support_vectors is None:
+        return random
+    return np.vstack([np.asarray(support_vectors, dtype=np.float64), random])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile a joblib classifier into a NumPy head")
+    parser.add_argument("source", help="Fitted classifier (.joblib)")
+    parser.add_argument("output", help="Compiled head (.npz)")
+    parser.add_argument("--check", action="store_true", help="Run parity and latency checks after export")
+    parser.add_argument("--coupling", choices=COUPLING_METHODS, default="solve")
+    parser.add_argument("--atol", type=float, default=None,
+                        help="Max probability difference (default: 5e-3 for solve, 1e-6 for libsvm)")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    classifier = joblib.load(args.source)
+    export_head(classifier, args.output)
+    print(f"✓ Exported {type(classifier).__name__} → {args.output}")
+
+    if not args.check:
+        return 0
+
+    head = CompiledHead.load(args.output, coupling=args.coupling)
+    X = _probe_inputs(classifier)
+
+    atol = args.atol
+    if atol is None:
+        atol = 5e-3 if args.coupling == "solve" else 1e-6
+
+    parity = check_parity(classifier, head, X, atol=atol)
+    print(f"Parity: {parity}")
+
+    for batch_size, timing in compare_latency(classifier, head, X).items():
+        print(f"Latency (batch={batch_size}): {timing}")
+
+    return 0 if parity["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
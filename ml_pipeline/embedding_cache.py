@@ -0,0 +1,146 @@
+# ml_pipeline/embedding_cache.py
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+
+# -------------------- CONFIG --------------------
+CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "32"))
+CACHE_FLOAT16 = os.getenv("EMBEDDING_CACHE_FP16", "0") == "1"
+
+# Rough per-entry bookkeeping cost (OrderedDict node, key object, array header)
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of sentence embeddings keyed on preprocessed query text.
+
+    Entries are evicted least-recently-used first whenever the entry count
+    or the approximate byte size goes over its cap. The cache is bound to
+    a single semantic model and is cleared as soon as a different model
+    object is seen (or `clear()` is called on reload).
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 32 * 1024 * 1024, use_float16: bool = False):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.dtype = np.float16 if use_float16 else np.float32
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._model_ref = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    # -------------------- LOOKUP --------------------
+    def get_many(self, semantic_model, texts) -> list:
+        """
+        Returns a list aligned with `texts`: a float32 vector for every hit
+        and None for every miss.
+        """
+        if not self.enabled:
+            return [None] * len(texts)
+
+        results = []
+        with self._lock:
+            self._bind(semantic_model)
+
+            for text in texts:
+                entry = self._entries.get(text)
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+
+                self._entries.move_to_end(text)
+                self.hits += 1
+                results.append(entry.astype(np.float32, copy=False))
+
+        return results
+
+    def put(self, semantic_model, text: str, vector):
+        if not self.enabled:
+            return
+
+        stored = np.array(vector, dtype=self.dtype, copy=True)
+        stored.flags.writeable = False
+        size = stored.nbytes + len(text) + _ENTRY_OVERHEAD_BYTES
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._bind(semantic_model)
+
+            previous = self._entries.pop(text, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes + len(text) + _ENTRY_OVERHEAD_BYTES
+
+            self._entries[text] = stored
+            self._bytes += size
+            self._evict()
+
+    # -------------------- MAINTENANCE --------------------
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._model_ref = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "dtype": np.dtype(self.dtype).name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            text, vector = self._entries.popitem(last=False)
+            self._bytes -= vector.nbytes + len(text) + _ENTRY_OVERHEAD_BYTES
+            self.evictions += 1
+
+    def _bind(self, semantic_model):
+        """Clears the cache when called with a model other than the bound one."""
+        if self._model_ref is not None and self._model_ref() is semantic_model:
+            return
+
+        self._entries.clear()
+        self._bytes = 0
+
+        try:
+            self._model_ref = weakref.ref(semantic_model)
+        except TypeError:
+            self._model_ref = lambda: semantic_model
+
+
+# Global cache shared by every entry point in the process
+embedding_cache = EmbeddingCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=int(CACHE_MAX_MB * 1024 * 1024),
+    use_float16=CACHE_FLOAT16
+)
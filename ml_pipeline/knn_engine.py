@@ -0,0 +1,261 @@
+# ml_pipeline/knn_engine.py
+#
+# Nearest-centroid / kNN intent classifier over a prebuilt embedding index.
+#
+#   python -m ml_pipeline.knn_engine build examples.jsonl model/intent_index.npy --mode centroid
+#   python -m ml_pipeline.knn_engine build --from-classifier model/svc_classifier.joblib model/intent_index.npy
+
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+
+INDEX_MODES = ("centroid", "knn")
+
+# Rows and their labels, published together: predict_proba reads the
+# snapshot once, so add_examples() can never pair new rows with old labels
+_Index = namedtuple("_Index", ["embeddings", "labels", "classes", "row_class"])
+
+
+def _make_index(embeddings, labels) -> _Index:
+    classes = np.array(sorted(set(labels)), dtype=object)
+    class_index = {label: idx for idx, label in enumerate(classes)}
+    row_class = np.array([class_index[label] for label in labels], dtype=np.intp)
+    return _Index(embeddings, labels, classes, row_class)
+
+
+def _meta_path(index_path: str) -> str:
+    return os.path.splitext(index_path)[0] + ".json"
+
+
+class EmbeddingIndexClassifier:
+    """
+    Classifies unit-normalized embeddings against a matrix of labelled rows
+    (example embeddings in "knn" mode, per-intent centroids in "centroid"
+    mode) with one matmul plus top-k.
+
+    The top-k cosine similarities are softmaxed with `temperature` and summed
+    per intent, which gives a probability-like confidence with the same
+    (intent, confidence) contract as the sklearn classifiers.
+    """
+
+    def __init__(self, embeddings, labels, mode: str = "centroid", top_k: int = 5, temperature: float = 0.05):
+        if mode not in INDEX_MODES:
+            raise ValueError(f"mode must be one of {INDEX_MODES}")
+        if len(embeddings) != len(labels):
+            raise ValueError("embeddings and labels must have the same length")
+
+        self.mode = mode
+        self.top_k = top_k
+        self.temperature = temperature
+
+        self._index = _make_index(embeddings, list(labels))
+        # Serializes add_examples() calls; readers never take it
+        self._update_lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        return self._index.embeddings
+
+    @property
+    def labels(self) -> list:
+        return self._index.labels
+
+    @property
+    def classes_(self):
+        return self._index.classes
+
+    # -------------------- PERSISTENCE --------------------
+    @classmethod
+    def load(cls, index_path: str, mmap: bool = True, **overrides) -> "EmbeddingIndexClassifier":
+        """
+        Loads `<name>.npy` (memory-mapped by default) and its `<name>.json`
+        metadata (labels, mode, top_k, temperature).
+        """
+        with open(_meta_path(index_path), "r") as f:
+            meta = json.load(f)
+
+        embeddings = np.load(index_path, mmap_mode="r" if mmap else None)
+
+        params = {
+            "mode": meta.get("mode", "centroid"),
+            "top_k": meta.get("top_k", 5),
+            "temperature": meta.get("temperature", 0.05),
+        }
+        params.update(overrides)
+        return cls(embeddings, meta["labels"], **params)
+
+    def save(self, index_path: str):
+        index = self._index
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        np.save(index_path, np.asarray(index.embeddings, dtype=np.float32))
+
+        with open(_meta_path(index_path), "w") as f:
+            json.dump({
+                "mode": self.mode,
+                "top_k": self.top_k,
+                "temperature": self.temperature,
+                "labels": index.labels,
+            }, f)
+
+    # -------------------- UPDATES --------------------
+    def add_examples(self, intent: str, embeddings):
+        """
+        Adds labelled embeddings for an existing or brand-new intent.
+        In centroid mode the intent's centroid is recomputed from the new
+        embeddings (existing intents keep their previous centroid blended in).
+        """
+        embeddings = _l2_normalize(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+
+        with self._update_lock:
+            current = self._index
+
+            if self.mode == "centroid":
+                rows = [i for i, label in enumerate(current.labels) if label == intent]
+                if rows:
+                    blended = np.vstack([np.asarray(current.embeddings[rows]), embeddings])
+                else:
+                    blended = embeddings
+                centroid = _l2_normalize(blended.mean(axis=0, keepdims=True))
+
+                keep = [i for i, label in enumerate(current.labels) if label != intent]
+                matrix = np.vstack([np.asarray(current.embeddings[keep]), centroid])
+                labels = [current.labels[i] for i in keep] + [intent]
+            else:
+                matrix = np.vstack([np.asarray(current.embeddings), embeddings])
+                labels = current.labels + [intent] * len(embeddings)
+
+            # One reference swap; in-flight predictions finish on the old index
+            self._index = _make_index(matrix, labels)
+
+    # -------------------- INFERENCE --------------------
+    def predict(self, X):
+        return self.predict_with_confidence(X)[0]
+
+    def predict_proba(self, X):
+        return self._predict_proba(self._index, X)
+
+    def _predict_proba(self, index: _Index, X):
+        X = np.asarray(X, dtype=np.float32)
+        scores = X @ index.embeddings.T
+
+        k = min(self.top_k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+
+        weights = np.exp((top_scores - top_scores.max(axis=1, keepdims=True)) / self.temperature)
+        weights /= weights.sum(axis=1, keepdims=True)
+
+        proba = np.zeros((len(X), len(index.classes)), dtype=np.float64)
+        rows = np.repeat(np.arange(len(X)), k)
+        np.add.at(proba, (rows, index.row_class[top].ravel()), weights.ravel())
+        return proba
+
+    def predict_with_confidence(self, X):
+        # Probabilities and class names from the same snapshot
+        index = self._index
+        proba = self._predict_proba(index, X)
+        label_idx = proba.argmax(axis=1)
+        return index.classes[label_idx], proba[np.arange(len(proba)), label_idx]
+
+
+def _l2_normalize(x):
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.clip(norms, 1e-12, None)
+
+
+# -------------------- BUILD --------------------
+def build_index(embeddings, labels, mode: str = "centroid", **params) -> EmbeddingIndexClassifier:
+    """
+    Builds an index from labelled embeddings. In centroid mode every intent
+    is reduced to the normalized mean of its examples.
+    """
+    embeddings = _l2_normalize(np.asarray(embeddings, dtype=np.float32))
+    labels = list(labels)
+
+    if mode == "centroid":
+        intents = sorted(set(labels))
+        label_array = np.array(labels, dtype=object)
+        centroids = np.vstack([
+            embeddings[label_array == intent].mean(axis=0) for intent in intents
+        ])
+        return EmbeddingIndexClassifier(_l2_normalize(centroids), intents, mode=mode, **params)
+
+    return EmbeddingIndexClassifier(embeddings, labels, mode=mode, **params)
+
+
+def build_index_from_texts(examples, semantic_model, preprocess_fn, mode: str = "centroid", **params):
+    """
+    Args:
+        examples: iterable of (text, intent) pairs
+    """
+    from ml_pipeline.ml_engine import encode_texts
+
+    examples = list(examples)
+    texts = [preprocess_fn(text) for text, _ in examples]
+    labels = [intent for _, intent in examples]
+    return build_index(encode_texts(semantic_model, texts), labels, mode=mode, **params)
+
+
+def build_index_from_classifier(classifier, mode: str = "centroid", **params):
+    """
+    Bootstraps an index from a fitted SVC's support vectors, which are
+    labelled training embeddings.
+    """
+    counts = np.asarray(classifier.n_support_)
+    labels = np.repeat(np.asarray(classifier.classes_, dtype=object), counts)
+    return build_index(classifier.support_vectors_, labels.tolist(), mode=mode, **params)
+
+
+def _read_examples(path):
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                yield record["text"], record["intent"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an embedding index for the kNN / centroid engine")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = sub.add_parser("build")
+    build_cmd.add_argument("examples", nargs="?", help='JSONL with {"text": ..., "intent": ...} per line')
+    build_cmd.add_argument("output", help="Index path (.npy); metadata goes next to it as .json")
+    build_cmd.add_argument("--from-classifier", help="Use a fitted SVC's support vectors as examples")
+    build_cmd.add_argument("--mode", choices=INDEX_MODES, default="centroid")
+    build_cmd.add_argument("--top-k", type=int, default=5)
+    build_cmd.add_argument("--temperature", type=float, default=0.05)
+
+    args = parser.parse_args(argv)
+    params = {"top_k": args.top_k, "temperature": args.temperature}
+
+    if args.from_classifier:
+        import joblib
+        index = build_index_from_classifier(joblib.load(args.from_classifier), mode=args.mode, **params)
+    elif args.examples:
+        from ml_pipeline.model_loader import load_semantic_model
+        from utils.preprocess import preprocess_text
+        index = build_index_from_texts(
+            _read_examples(args.examples),
+            load_semantic_model(),
+            preprocess_text,
+            mode=args.mode,
+            **params
+        )
+    else:
+        parser.error("either an examples file or --from-classifier is required")
+
+    index.save(args.output)
+    print(f"✓ Built {args.mode} index: {len(index.labels)} rows, {len(index.classes_)} intents → {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,72 @@
+import numpy as np
+
+from ml_pipeline.embedding_cache import embedding_cache
+from utils.query_context import preprocessed
+
+
 def ml_predict(query, classifier, semantic_model, preprocess_fn):
-    processed = preprocess_fn(query)
+    return ml_predict_batch([query], classifier, semantic_model, preprocess_fn)[0]
+
+
+def ml_predict_batch(queries, classifier, semantic_model, preprocess_fn):
+    """
+    Classifies several queries with one encoder forward pass and one
+    classifier call on the stacked embedding matrix.
+
+    Returns:
+        list: (intent, confidence) tuples, in the same order as `queries`
+    """
+    processed = [preprocessed(query, preprocess_fn) for query in queries]
+
+    embeddings = encode_texts(semantic_model, processed)
+    return classify_embeddings(classifier, embeddings)
+
+
+def classify_embeddings(classifier, embeddings):
+    """
+    Returns:
+        list: (intent, confidence) tuples, one per embedding row
+    """
+    if hasattr(classifier, "predict_with_confidence"):
+        # Compiled heads produce both from a single pass
+        intents, confidences = classifier.predict_with_confidence(embeddings)
+    else:
+        intents = classifier.predict(embeddings)
+
+        if hasattr(classifier, "predict_proba"):
+            confidences = classifier.predict_proba(embeddings).max(axis=1)
+        else:
+            confidences = [None] * len(embeddings)
+
+    return list(zip(intents, confidences))
+
+
+def encode_texts(semantic_model, texts):
+    """
+    Encodes preprocessed texts into normalized embeddings.
+    Cached embeddings are reused; only the misses go through the encoder.
+
+    Returns:
+        np.ndarray: (len(texts), dim) float32 matrix
+    """
+    vectors = embedding_cache.get_many(semantic_model, texts)
 
-    embedding = semantic_model.encode(
-        [processed],
-        normalize_embeddings=True,
-        convert_to_numpy=True
-    )
+    missing = {}
+    for idx, vector in enumerate(vectors):
+        if vector is None:
+            missing.setdefault(texts[idx], []).append(idx)
 
-    intent = classifier.predict(embedding)[0]
+    if missing:
+        missing_texts = list(missing)
+        fresh = semantic_model.encode(
+            missing_texts,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
 
-    confidence = (
-        classifier.predict_proba(embedding).max()
-        if hasattr(classifier, "predict_proba")
-        else None
-    )
+        for text, vector in zip(missing_texts, fresh):
+            embedding_cache.put(semantic_model, text, vector)
+            for idx in missing[text]:
+                vectors[idx] = vector
 
-    return intent, confidence
+    return np.vstack(vectors).astype(np.float32, copy=False)
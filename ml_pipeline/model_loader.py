@@ -0,0 +1,71 @@
+# ml_pipeline/model_loader.py
+
+import os
+
+from ml_pipeline.embedding_cache import embedding_cache
+
+
+DEFAULT_SEMANTIC_MODEL_PATH = "semantic_model/"
+DEFAULT_CLASSIFIER_PATH = os.getenv("INTENT_CLASSIFIER_PATH", "model/svc_classifier.joblib")
+
+# Memory-map joblib arrays copy-on-write so forked workers share the pages
+# (libsvm needs writable buffers, but never writes to them)
+CLASSIFIER_MMAP = os.getenv("INTENT_CLASSIFIER_MMAP", "0") == "1"
+
+# "torch" → SentenceTransformer, "onnx" → ml_pipeline.onnx_encoder
+SEMANTIC_BACKEND = os.getenv("SEMANTIC_BACKEND", "torch")
+SEMANTIC_ONNX_PATH = os.getenv("SEMANTIC_ONNX_PATH", "semantic_model/onnx/model_int8.onnx")
+
+
+def load_semantic_model(path: str = DEFAULT_SEMANTIC_MODEL_PATH, backend: str | None = None, clear_cache: bool = True):
+    """
+    Loads the sentence encoder and drops every embedding cached for the
+    previous model.
+
+    Args:
+        path: sentence-transformers model directory
+        backend: "torch" or "onnx" (defaults to SEMANTIC_BACKEND)
+        clear_cache: False for side models (e.g. shadow candidates) that
+            must not invalidate the serving model's cache
+    """
+    backend = backend or SEMANTIC_BACKEND
+
+    if backend == "onnx":
+        from ml_pipeline.onnx_encoder import OnnxSemanticEncoder
+        model = OnnxSemanticEncoder(path, SEMANTIC_ONNX_PATH)
+    elif backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(path)
+    else:
+        raise ValueError(f"Unknown semantic backend: {backend}")
+
+    if clear_cache:
+        embedding_cache.clear()
+    return model
+
+
+def load_classifier(path: str = DEFAULT_CLASSIFIER_PATH, mmap: bool | None = None):
+    """
+    Loads the intent classifier.
+
+    - `.npz`    → compiled NumPy head (see ml_pipeline/compiled_head.py)
+    - `.npy`    → centroid / kNN embedding index (see ml_pipeline/knn_engine.py)
+    - `.json`   → cheap → expensive cascade spec (see ml_pipeline/cascade.py)
+    - otherwise → joblib-pickled sklearn estimator
+    """
+    if path.endswith(".npz"):
+        from ml_pipeline.compiled_head import CompiledHead
+        return CompiledHead.load(path)
+
+    if path.endswith(".npy"):
+        from ml_pipeline.knn_engine import EmbeddingIndexClassifier
+        return EmbeddingIndexClassifier.load(path)
+
+    if path.endswith(".json"):
+        from ml_pipeline.cascade import CascadeClassifier
+        return CascadeClassifier.load(path)
+
+    import joblib
+
+    mmap = CLASSIFIER_MMAP if mmap is None else mmap
+    return joblib.load(path, mmap_mode="c" if mmap else None)
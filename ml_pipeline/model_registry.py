@@ -0,0 +1,357 @@
+# ml_pipeline/model_registry.py
+#
+# Process-wide registry for the encoder, classifier, response resolver and
+# the rule / session / flow singletons. Every resource is built on first
+# access (thread-safe, once), so importing pipeline modules stays cheap and
+# only the entry points that actually serve traffic pay for model loading.
+
+import importlib
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from ml_pipeline.model_loader import (
+    DEFAULT_SEMANTIC_MODEL_PATH,
+    DEFAULT_CLASSIFIER_PATH,
+    SEMANTIC_BACKEND,
+)
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_RESPONSES_PATH = "responses/intent_responses.yml"
+SESSION_TIMEOUT = 600
+
+# Entry points call warmup() at startup unless MODEL_WARMUP=0
+WARMUP_ON_START = os.getenv("MODEL_WARMUP", "1") == "1"
+
+WARMUP_QUERIES = [
+    "hello",
+    "what is your pricing",
+    "i want to book a demo for my team",
+]
+
+_BACKEND_MODULES = {
+    "torch": "sentence_transformers",
+    "onnx": "onnxruntime",
+}
+
+
+# Immutable snapshot of the serving models. Requests read it once and keep
+# using the same pair even if a swap happens mid-request.
+ModelBundle = namedtuple(
+    "ModelBundle",
+    ["semantic_model", "classifier", "version", "semantic_model_path", "classifier_path", "backend"]
+)
+
+
+def _timed_import(module_name: str) -> float:
+    """Imports a module and returns how long it took (ms, 0 when cached)."""
+    started = time.perf_counter()
+    importlib.import_module(module_name)
+    return (time.perf_counter() - started) * 1000.0
+
+
+class ModelRegistry:
+    """
+    Lazily builds and caches shared resources.
+
+    Each resource has its own lock, so a request that only needs the rule
+    engine is not blocked behind a multi-second encoder load.
+    """
+
+    def __init__(
+        self,
+        semantic_model_path: str = DEFAULT_SEMANTIC_MODEL_PATH,
+        classifier_path: str = DEFAULT_CLASSIFIER_PATH,
+        responses_path: str = DEFAULT_RESPONSES_PATH,
+        backend: str | None = None
+    ):
+        self.semantic_model_path = semantic_model_path
+        self.classifier_path = classifier_path
+        self.responses_path = responses_path
+        self.backend = backend or SEMANTIC_BACKEND
+
+        self._resources = {}
+        self._timings = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    # -------------------- CORE --------------------
+    def _lock_for(self, name: str):
+        with self._locks_guard:
+            lock = self._locks.get(name)
+            if lock is None:
+                lock = self._locks[name] = threading.Lock()
+            return lock
+
+    def _get(self, name: str, factory, import_name: str | None = None):
+        # Fast path: no locking once the resource exists
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+
+        with self._lock_for(name):
+            resource = self._resources.get(name)
+            if resource is not None:
+                return resource
+
+            resource = self._timed(name, factory, import_name)
+            self._resources[name] = resource
+            return resource
+
+    def _timed(self, name: str, factory, import_name: str | None = None):
+        import_ms = _timed_import(import_name) if import_name else 0.0
+
+        started = time.perf_counter()
+        resource = factory()
+        load_ms = (time.perf_counter() - started) * 1000.0
+
+        self._timings[name] = {"import_ms": round(import_ms, 1), "load_ms": round(load_ms, 1)}
+        logger.info(f"✓ Loaded {name} (import {import_ms:.0f} ms, load {load_ms:.0f} ms)")
+        return resource
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._resources
+
+    def timings(self) -> dict:
+        return dict(self._timings)
+
+    def reset(self, *names):
+        """Drops cached resources (all of them when no name is given)."""
+        for name in names or list(self._resources):
+            with self._lock_for(name):
+                self._resources.pop(name, None)
+                self._timings.pop(name, None)
+
+    # -------------------- MODELS --------------------
+    @property
+    def models(self) -> ModelBundle:
+        """Current encoder + classifier snapshot (read once per request)."""
+        return self._get("models", self._initial_bundle)
+
+    @property
+    def semantic_model(self):
+        return self.models.semantic_model
+
+    @property
+    def classifier(self):
+        return self.models.classifier
+
+    def _initial_bundle(self) -> ModelBundle:
+        semantic_model = self.load_semantic_model(self.semantic_model_path, self.backend)
+        classifier = self.load_classifier(self.classifier_path)
+        return ModelBundle(semantic_model, classifier, 1, self.semantic_model_path, self.classifier_path, self.backend)
+
+    def load_semantic_model(self, path: str, backend: str, clear_cache: bool = True, name: str = "semantic_model"):
+        from ml_pipeline.model_loader import load_semantic_model
+
+        return self._timed(
+            name,
+            lambda: load_semantic_model(path, backend=backend, clear_cache=clear_cache),
+            import_name=_BACKEND_MODULES.get(backend)
+        )
+
+    def load_classifier(self, path: str, name: str = "classifier"):
+        from ml_pipeline.model_loader import load_classifier
+
+        import_name = None if path.endswith((".npz", ".npy", ".json")) else "sklearn.svm"
+        return self._timed(name, lambda: load_classifier(path), import_name=import_name)
+
+    def swap_models(
+        self,
+        classifier_path: str | None = None,
+        semantic_model_path: str | None = None,
+        backend: str | None = None
+    ) -> ModelBundle:
+        """
+        Loads new models next to the serving ones, checks they work together
+        and atomically publishes them as a new bundle. Requests already holding
+        the previous bundle finish on it; nothing is blocked while loading.
+
+        Args:
+            classifier_path: new classifier (keeps the current one if None)
+            semantic_model_path: new encoder directory (keeps the current one if None)
+            backend: encoder backend for semantic_model_path
+
+        Returns:
+            ModelBundle: The bundle now serving traffic
+
+        Raises:
+            ValueError: If the new pair fails the smoke check (nothing is swapped)
+        """
+        # One swap at a time; readers never take this lock
+        with self._lock_for("swap"):
+            current = self.models
+
+            new_encoder = semantic_model_path is not None or (backend is not None and backend != current.backend)
+            semantic_model_path = semantic_model_path or current.semantic_model_path
+            backend = backend or current.backend
+
+            if new_encoder:
+                # The embedding cache re-binds itself once the new encoder serves
+                semantic_model = self.load_semantic_model(semantic_model_path, backend, clear_cache=False)
+            else:
+                semantic_model = current.semantic_model
+
+            if classifier_path is not None:
+                classifier = self.load_classifier(classifier_path)
+            else:
+                classifier, classifier_path = current.classifier, current.classifier_path
+
+            check_models(semantic_model, classifier)
+
+            bundle = ModelBundle(
+                semantic_model, classifier, current.version + 1,
+                semantic_model_path, classifier_path, backend
+            )
+            self._resources["models"] = bundle
+
+            from ml_pipeline.result_cache import result_cache
+            result_cache.clear()
+            self.semantic_model_path, self.classifier_path, self.backend = semantic_model_path, classifier_path, backend
+
+            logger.info(
+                f"✓ Swapped models → v{bundle.version} "
+                f"(encoder={semantic_model_path} [{backend}], classifier={classifier_path})"
+            )
+            return bundle
+
+    def describe(self) -> dict:
+        if not self.is_loaded("models"):
+            return {"loaded": False}
+
+        bundle = self.models
+        return {
+            "loaded": True,
+            "version": bundle.version,
+            "semantic_model_path": bundle.semantic_model_path,
+            "backend": bundle.backend,
+            "classifier_path": bundle.classifier_path,
+            "classifier_type": type(bundle.classifier).__name__,
+        }
+
+    # -------------------- RESOURCES --------------------
+
+    @property
+    def response_resolver(self):
+        from ml_pipeline.response_resolver import ResponseResolver
+        return self._get("response_resolver", lambda: ResponseResolver(self.responses_path))
+
+    @property
+    def rule_pipeline(self):
+        from rule_engine.rule_pipeline import RulePipeline, DEFAULT_RULE_FILES
+        return self._get("rule_pipeline", lambda: RulePipeline(rule_files=DEFAULT_RULE_FILES))
+
+    @property
+    def rule_watcher(self):
+        from rule_engine.rule_watcher import RuleWatcher, RULES_WATCH_INTERVAL
+        return self._get("rule_watcher", lambda: RuleWatcher(self.rule_pipeline, RULES_WATCH_INTERVAL))
+
+    @property
+    def session_manager(self):
+        from session.session_manager import (
+            SessionManager,
+            SESSION_MAX_COUNT,
+            SESSION_MAX_BYTES,
+            SESSION_SWEEP_INTERVAL,
+        )
+        from session.session_store import build_session_store, SESSION_STORE_FLUSH_MS
+        from session.session_journal import SessionJournal, SESSION_JOURNAL_DIR
+
+        def build():
+            manager = SessionManager(
+                session_timeout=SESSION_TIMEOUT,
+                max_sessions=SESSION_MAX_COUNT,
+                max_bytes=SESSION_MAX_BYTES,
+                sweep_interval=SESSION_SWEEP_INTERVAL,
+                store=build_session_store(),
+                flush_interval=SESSION_STORE_FLUSH_MS / 1000.0,
+                journal=SessionJournal(SESSION_JOURNAL_DIR) if SESSION_JOURNAL_DIR else None
+            )
+            # Restores the flows that were in progress before a restart
+            manager.recover()
+            return manager
+
+        return self._get("session_manager", build)
+
+    @property
+    def flow_handler(self):
+        from flow_pipeline.flow_handler import FlowHandler
+        return self._get("flow_handler", lambda: FlowHandler(self.session_manager))
+
+    # -------------------- WARMUP --------------------
+    def warmup(self, queries=None) -> dict:
+        """
+        Loads every resource and runs dummy inferences through the rule engine,
+        encoder and classifier, so the first real request does not pay for
+        lazy initialization inside the libraries.
+
+        Returns:
+            dict: Per-resource import/load timings plus warmup time (ms)
+        """
+        from ml_pipeline.ml_engine import ml_predict_batch
+        from ml_pipeline.embedding_cache import embedding_cache
+        from ml_pipeline.result_cache import result_cache, RESULT_CACHE_WARM_LOG, RESULT_CACHE_WARM_TOP
+        from flow_pipeline.flow_registry import flow_registry
+        from utils.preprocess import preprocess_text
+
+        queries = queries or WARMUP_QUERIES
+        started = time.perf_counter()
+
+        self.response_resolver
+        self.flow_handler
+        flow_registry.get_all_available_flows()
+
+        for query in queries:
+            self.rule_pipeline.run(query)
+
+        models = self.models
+        ml_predict_batch(queries, models.classifier, models.semantic_model, preprocess_text)
+        # Keep the dummy queries out of the cache stats
+        embedding_cache.clear()
+
+        if RESULT_CACHE_WARM_LOG and os.path.exists(RESULT_CACHE_WARM_LOG):
+            warmed = result_cache.warm_from_log(
+                RESULT_CACHE_WARM_LOG,
+                self.rule_pipeline,
+                models.classifier,
+                models.semantic_model,
+                preprocess_text,
+                top_n=RESULT_CACHE_WARM_TOP
+            )
+            logger.info(f"✓ Result cache warmed with {warmed} queries from {RESULT_CACHE_WARM_LOG}")
+
+        warmup_ms = (time.perf_counter() - started) * 1000.0
+        logger.info(f"✓ Warmup done in {warmup_ms:.0f} ms")
+
+        report = self.timings()
+        report["warmup_ms"] = round(warmup_ms, 1)
+        return report
+
+
+def check_models(semantic_model, classifier, probe: str = "what is your pricing"):
+    """
+    Smoke-checks an encoder/classifier pair before it serves traffic.
+
+    Raises:
+        ValueError: On a dimension mismatch or a failing prediction
+    """
+    from ml_pipeline.ml_engine import classify_embeddings
+
+    embedding = semantic_model.encode([probe], normalize_embeddings=True, convert_to_numpy=True)
+
+    expected = getattr(classifier, "n_features_in_", None)
+    if expected is not None and embedding.shape[1] != expected:
+        raise ValueError(f"Encoder produces {embedding.shape[1]}-dim vectors, classifier expects {expected}")
+
+    try:
+        classify_embeddings(classifier, embedding)
+    except Exception as e:
+        raise ValueError(f"Classifier failed on probe query: {e}") from e
+
+
+# Initialize global registry
+model_registry = ModelRegistry()
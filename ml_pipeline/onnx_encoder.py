@@ -0,0 +1,335 @@
+# ml_pipeline/onnx_encoder.py
+#
+# ONNX Runtime backend for the sentence encoder in semantic_model/.
+#
+#   python -m ml_pipeline.onnx_encoder export            # ONNX + dynamic int8
+#   python -m ml_pipeline.onnx_encoder check             # parity vs PyTorch
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+
+DEFAULT_MODEL_DIR = "semantic_model/"
+DEFAULT_ONNX_PATH = os.path.join(DEFAULT_MODEL_DIR, "onnx", "model_int8.onnx")
+
+
+def _read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class OnnxSemanticEncoder:
+    """
+    Drop-in replacement for SentenceTransformer.encode backed by an
+    exported (optionally int8-quantized) ONNX graph.
+
+    Tokenization uses the model's own tokenizer.json; max sequence length,
+    pooling mode and normalization are read from the same config files
+    sentence-transformers uses, so both backends produce the same vectors
+    up to quantization error.
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_MODEL_DIR, onnx_path: str = DEFAULT_ONNX_PATH, num_threads: int | None = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = model_dir
+        self.onnx_path = onnx_path
+
+        st_config = _read_json(os.path.join(model_dir, "sentence_bert_config.json"))
+        self.max_seq_length = st_config.get("max_seq_length", 256)
+        self.do_lower_case = st_config.get("do_lower_case", False)
+
+        modules = _read_json(os.path.join(model_dir, "modules.json"))
+        module_types = {m["type"].rsplit(".", 1)[-1]: m for m in modules}
+
+        pooling_dir = module_types.get("Pooling", {}).get("path", "1_Pooling")
+        pooling = _read_json(os.path.join(model_dir, pooling_dir, "config.json"))
+        self.dimension = pooling["word_embedding_dimension"]
+        self.pooling_mode = _pooling_mode(pooling)
+        self.normalize = "Normalize" in module_types
+
+        special_tokens = _read_json(os.path.join(model_dir, "special_tokens_map.json"))
+        pad_token = special_tokens.get("pad_token", "[PAD]")
+        if isinstance(pad_token, dict):
+            pad_token = pad_token["content"]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(
+            pad_id=self.tokenizer.token_to_id(pad_token),
+            pad_token=pad_token
+        )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(
+            onnx_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(
+        self,
+        sentences,
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        **kwargs
+    ):
+        """
+        Same call shape as SentenceTransformer.encode for the arguments this
+        repo uses. Always returns NumPy arrays.
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        chunks = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            if self.do_lower_case:
+                batch = [s.lower() for s in batch]
+            chunks.append(self._encode_batch(batch))
+
+        if chunks:
+            embeddings = np.vstack(chunks)
+        else:
+            embeddings = np.zeros((0, self.dimension), dtype=np.float32)
+
+        if normalize_embeddings and not self.normalize:
+            embeddings = _l2_normalize(embeddings)
+
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feed["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feed)[0]
+        pooled = _pool(token_embeddings, attention_mask, self.pooling_mode)
+
+        if self.normalize:
+            pooled = _l2_normalize(pooled)
+        return pooled.astype(np.float32, copy=False)
+
+
+# -------------------- POOLING --------------------
+def _pooling_mode(config: dict) -> str:
+    for mode in ("cls_token", "max_tokens", "mean_sqrt_len_tokens", "mean_tokens"):
+        if config.get(f"pooling_mode_{mode}"):
+            return mode
+    raise ValueError(f"Unsupported pooling config: {config}")
+
+
+def _pool(token_embeddings, attention_mask, mode: str):
+    if mode == "cls_token":
+        return token_embeddings[:, 0]
+
+    mask = attention_mask[..., None].astype(token_embeddings.dtype)
+
+    if mode == "max_tokens":
+        masked = np.where(mask > 0, token_embeddings, -1e9)
+        return masked.max(axis=1)
+
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+
+    if mode == "mean_sqrt_len_tokens":
+        return summed / np.sqrt(counts)
+    return summed / counts
+
+
+def _l2_normalize(x):
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.clip(norms, 1e-12, None)
+
+
+# -------------------- EXPORT --------------------
+def export_onnx(model_dir: str = DEFAULT_MODEL_DIR, output_path: str = DEFAULT_ONNX_PATH, quantize: bool = True, opset: int = 14) -> str:
+    """
+    Exports the transformer of `model_dir` to ONNX (token embeddings output,
+    dynamic batch and sequence axes) and applies dynamic int8 quantization.
+
+    Returns:
+        str: Path of the graph to load with OnnxSemanticEncoder
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    fp32_path = output_path.replace(".onnx", "_fp32.onnx") if quantize else output_path
+
+    model = AutoModel.from_pretrained(model_dir)
+    model.eval()
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    sample = tokenizer(["export sample sentence"], return_tensors="pt")
+
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            fp32_path,
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+
+    if not quantize:
+        return fp32_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(fp32_path, output_path, weight_type=QuantType.QInt8)
+    return output_path
+
+
+# -------------------- PARITY --------------------
+def check_parity(reference_model, onnx_model, queries, classifier=None, preprocess_fn=None) -> dict:
+    """
+    Compares ONNX embeddings against the PyTorch SentenceTransformer.
+
+    Reports the cosine similarity between both embeddings of every query
+    and, when a classifier is given, how often both backends lead to the
+    same predicted intent.
+    """
+    if preprocess_fn is not None:
+        queries = [preprocess_fn(q) for q in queries]
+
+    started = time.perf_counter()
+    reference = reference_model.encode(queries, normalize_embeddings=True, convert_to_numpy=True)
+    reference_ms = (time.perf_counter() - started) * 1000.0
+
+    started = time.perf_counter()
+    candidate = onnx_model.encode(queries, normalize_embeddings=True, convert_to_numpy=True)
+    candidate_ms = (time.perf_counter() - started) * 1000.0
+
+    cosine = np.einsum("ij,ij->i", _l2_normalize(reference), _l2_normalize(candidate))
+
+    report = {
+        "queries": len(queries),
+        "cosine_mean": float(cosine.mean()),
+        "cosine_min": float(cosine.min()),
+        "cosine_p01": float(np.percentile(cosine, 1)),
+        "torch_ms_per_query": round(reference_ms / len(queries), 3),
+        "onnx_ms_per_query": round(candidate_ms / len(queries), 3),
+    }
+
+    if classifier is not None:
+        agreement = classifier.predict(reference) == classifier.predict(candidate)
+        report["intent_agreement"] = float(np.mean(agreement))
+
+    return report
+
+
+def _load_queries(path):
+    queries = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                line = record.get("query") or record.get("text") or record.get("title") or ""
+            if line:
+                queries.append(line)
+    return queries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ONNX Runtime backend for the semantic encoder")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export", help="Export + quantize the encoder")
+    export_cmd.add_argument("--model-dir", default=DEFAULT_MODEL_DIR)
+    export_cmd.add_argument("--output", default=DEFAULT_ONNX_PATH)
+    export_cmd.add_argument("--no-quantize", action="store_true")
+
+    check_cmd = sub.add_parser("check", help="Parity check against the PyTorch backend")
+    check_cmd.add_argument("--model-dir", default=DEFAULT_MODEL_DIR)
+    check_cmd.add_argument("--onnx", default=DEFAULT_ONNX_PATH)
+    check_cmd.add_argument("--queries", help="Text or JSONL file with one query per line")
+    check_cmd.add_argument("--classifier", default="model/svc_classifier.joblib")
+    check_cmd.add_argument("--min-cosine", type=float, default=0.99)
+    check_cmd.add_argument("--min-agreement", type=float, default=0.98)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        path = export_onnx(args.model_dir, args.output, quantize=not args.no_quantize)
+        print(f"✓ Exported encoder → {path}")
+        return 0
+
+    from sentence_transformers import SentenceTransformer
+    from ml_pipeline.model_loader import load_classifier
+    from utils.preprocess import preprocess_text
+
+    queries = _load_queries(args.queries) if args.queries else _SAMPLE_QUERIES
+    report = check_parity(
+        SentenceTransformer(args.model_dir),
+        OnnxSemanticEncoder(args.model_dir, args.onnx),
+        queries,
+        classifier=load_classifier(args.classifier),
+        preprocess_fn=preprocess_text
+    )
+    print(f"Parity: {report}")
+
+    passed = (
+        report["cosine_min"] >= args.min_cosine
+        and report.get("intent_agreement", 1.0) >= args.min_agreement
+    )
+    return 0 if passed else 1
+
+
+_SAMPLE_QUERIES = [
+    "what is your pricing",
+    "how much does it cost for a team of 20",
+    "i want to book a demo",
+    "can i talk to sales",
+    "do you offer a free trial",
+    "are there any internships available",
+    "how do i apply for a job",
+    "what is the interview process",
+    "where is your office located",
+    "what are your business hours",
+    "is my data secure and gdpr compliant",
+    "does it integrate with salesforce",
+    "can the platform scale to a million users",
+    "what is your uptime sla",
+    "i need help with a technical issue",
+    "do you have case studies for healthcare",
+    "we want to partner with you",
+    "i got my offer letter what next",
+    "what is the status of my application",
+    "your product is great, some feedback for you",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,14 @@
+import random
 import time
 
-from rule_engine.rule_pipeline import RulePipeline
 from placeholders.llm_engine import llm_placeholder
-from ml_pipeline.ml_engine import ml_predict
+from ml_pipeline.batch_scheduler import batch_scheduler
+from ml_pipeline.model_registry import model_registry
+from ml_pipeline.shadow import shadow_scorer
+from ml_pipeline.result_cache import result_cache, CachedResult, cache_key, fingerprint
 from ml_pipeline.rope import rope_response
-from session.session_manager import SessionManager
-from flow_pipeline.flow_handler import FlowHandler
 from flow_pipeline.flow_registry import flow_registry
+from utils.query_context import QueryContext
 
 
 # -------------------- THRESHOLDS --------------------
@@ -16,26 +18,35 @@ FLOW_COOLDOWN_SECONDS = 180
 
 
 # -------------------- INITIALIZATION --------------------
-rule_pipeline = RulePipeline(
-    rule_files=[
-        "rules/system_rules.yml",
-        "rules/safety_rules.yml",
-        "rules/static_info_rules.yml",
-        "rules/navigation_rules.yml",
-        "rules/single_token_business_rules.yml",
-    ]
-)
+# rule_pipeline, session_manager and flow_handler are built on first use by
+# the model registry; module attribute access is kept for existing callers.
+_REGISTRY_ATTRIBUTES = ("rule_pipeline", "session_manager", "flow_handler")
 
-session_manager = SessionManager(session_timeout=600)
-flow_handler = FlowHandler(session_manager)
+
+def __getattr__(name):
+    if name in _REGISTRY_ATTRIBUTES:
+        return getattr(model_registry, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # -------------------- HELPER --------------------
 def log_turn(session_id, user_text, bot_text, source):
+    session_manager = model_registry.session_manager
     session_manager.add_message(session_id, "user", user_text)
     session_manager.add_message(session_id, "bot", bot_text, source)
 
 
+def format_history(page: dict) -> str:
+    """Renders one history page as reply text (one message per line)."""
+    if not page["messages"]:
+        return "No messages yet."
+
+    lines = [f"[{str(msg['role']).upper()}] {msg['text']} ({msg['source']})" for msg in page["messages"]]
+    if page["has_more"] or page["dropped"]:
+        lines.insert(0, f"(last {len(lines)} messages; older ones at /api/history/<session_id>)")
+    return "\n".join(lines)
+
+
 # -------------------- MAIN PIPELINE --------------------
 def chatbot_pipeline(
     query,
@@ -45,66 +56,81 @@ def chatbot_pipeline(
     response_resolver,
     session_id: str
 ):
+    session_manager = model_registry.session_manager
+    flow_handler = model_registry.flow_handler
+    rule_pipeline = model_registry.rule_pipeline
+
+    # Normalized once; rule, ML and cache layers share it
+    context = QueryContext.of(query, preprocess_fn)
+    query = context.raw
+
     session = session_manager.get_or_create_session(session_id)
 
     # -------------------- HISTORY --------------------
-    if query.strip().lower() == "/history":
+    if context.normalized == "/history":
+        # One bounded page as text; full history via /api/history
         return rope_response(
-            text=session_manager.get_history(session_id),
+            text=format_history(session_manager.get_history_page(session_id)),
             intent="history",
             confidence=1.0,
             source="SYSTEM"
         )
 
-    # -------------------- PENDING FLOW CONSENT --------------------
-    if session.get("pending_flow"):
-        normalized = query.lower().strip()
-
-        if normalized in ["yes", "yeah", "yep", "sure", "ok", "okay"]:
-            flow_intent = session["pending_flow"]
-
-            flow_start = flow_handler.start_flow(flow_intent, session_id)
-            session["pending_flow"] = None  # defensive clear
-
-            log_turn(session_id, query, flow_start["reply"], "FLOW")
-
-            return rope_response(
-                text=flow_start["reply"],
-                intent=flow_intent,
-                confidence=1.0,
-                source="FLOW"
-            )
-
-        if normalized in ["no", "nope", "nah"]:
-            session["pending_flow"] = None
-            msg = "No problem 😊 Let me know how else I can help."
+    # Consent is read and cleared under the session's lock, so two
+    # concurrent requests of one user cannot both start the flow
+    with session_manager.session(session_id) as session:
+        # -------------------- PENDING FLOW CONSENT --------------------
+        if session.get("pending_flow"):
+            normalized = context.normalized
+
+            if normalized in ["yes", "yeah", "yep", "sure", "ok", "okay"]:
+                flow_intent = session["pending_flow"]
+
+                flow_start = flow_handler.start_flow(flow_intent, session_id)
+                session["pending_flow"] = None  # defensive clear
+
+                log_turn(session_id, query, flow_start["reply"], "FLOW")
+
+                return rope_response(
+                    text=flow_start["reply"],
+                    intent=flow_intent,
+                    confidence=1.0,
+                    source="FLOW"
+                )
+
+            if normalized in ["no", "nope", "nah"]:
+                session["pending_flow"] = None
+                msg = "No problem 😊 Let me know how else I can help."
+                log_turn(session_id, query, msg, "SYSTEM")
+
+                return rope_response(
+                    text=msg,
+                    intent="flow_declined",
+                    confidence=1.0,
+                    source="SYSTEM"
+                )
+
+            msg = "Please reply with yes or no 😊"
             log_turn(session_id, query, msg, "SYSTEM")
 
             return rope_response(
                 text=msg,
-                intent="flow_declined",
+                intent="flow_consent_pending",
                 confidence=1.0,
                 source="SYSTEM"
             )
 
-        msg = "Please reply with yes or no 😊"
-        log_turn(session_id, query, msg, "SYSTEM")
-
-        return rope_response(
-            text=msg,
-            intent="flow_consent_pending",
-            confidence=1.0,
-            source="SYSTEM"
-        )
-
     # -------------------- ACTIVE FLOW --------------------
+    # handle_response is one locked turn itself; post-flow actions (email)
+    # run after it releases the lock
     if session.get("active_flow"):
         flow_resp = flow_handler.handle_response(session_id, query)
         reply = flow_resp.get("reply", "")
 
         # record completion timestamp to prevent re-trigger loop
         if flow_resp.get("completed"):
-            session["flow_completed_at"] = time.time()
+            with session_manager.session(session_id) as session:
+                session["flow_completed_at"] = time.time()
 
         log_turn(session_id, query, reply, "FLOW")
 
@@ -115,55 +141,86 @@ def chatbot_pipeline(
             source="FLOW"
         )
 
+    # -------------------- RESULT CACHE --------------------
+    # No flow is active or pending from here on, so the rule / ML outcome
+    # depends only on the query, the rules and the models
+    key = cache_key(context)
+    current = fingerprint(rule_pipeline, classifier, semantic_model, preprocess_fn)
+    cached = result_cache.get(key, current)
+
     # -------------------- RULE ENGINE --------------------
-    rule = rule_pipeline.run(query)
-    if rule.get("matched") and not rule.get("allow_ml_fallback", True):
-        log_turn(session_id, query, rule["response"], "RULE")
+    if cached is None:
+        rule = rule_pipeline.run(context)
+        if rule.get("matched") and not rule.get("allow_ml_fallback", True):
+            cached = result_cache.put(key, current, CachedResult.from_rule(rule))
+
+    if cached is not None and cached.source == "RULE":
+        response_text = random.choice(cached.messages)
+        log_turn(session_id, query, response_text, "RULE")
 
         return rope_response(
-            text=rule["response"],
-            intent=rule["intent"],
-            confidence=rule["confidence"],
+            text=response_text,
+            intent=cached.intent,
+            confidence=cached.confidence,
             source="RULE"
         )
 
     # -------------------- ML INTENT --------------------
-    predicted_intent, confidence = ml_predict(
-        query,
-        classifier,
-        semantic_model,
-        preprocess_fn
-    )
+    if cached is not None:
+        predicted_intent, confidence = cached.intent, cached.confidence
+    else:
+        predicted_intent, confidence = batch_scheduler.predict(
+            context,
+            classifier,
+            semantic_model,
+            preprocess_fn
+        )
+        result_cache.put(key, current, CachedResult.from_ml(predicted_intent, confidence))
+
+    # Cache hits are sampled too, so the shadow sample follows live traffic
+    if shadow_scorer.active:
+        shadow_scorer.submit(
+            context,
+            classifier,
+            semantic_model,
+            preprocess_fn,
+            predicted_intent,
+            confidence
+        )
     session_manager.update_intent(session_id, predicted_intent)
 
-    # -------------------- FLOW COOLDOWN CHECK --------------------
-    cooldown_ok = True
-    if session.get("flow_completed_at"):
-        cooldown_ok = (
-            time.time() - session["flow_completed_at"]
-        ) > FLOW_COOLDOWN_SECONDS
-
-    # -------------------- FLOW CONSENT GATE --------------------
-    if (
-        confidence >= FLOW_TRIGGER_THRESHOLD
-        and cooldown_ok
-        and flow_registry.get_flow_for_intent(predicted_intent)
-        and session.get("last_completed_flow") != predicted_intent
-    ):
-        consent_msg = (
-            "To help you with this, I’ll need to collect a few details. "
-            "Are you okay sharing them? (yes/no)"
-        )
+    with session_manager.session(session_id) as session:
+        # -------------------- FLOW COOLDOWN CHECK --------------------
+        cooldown_ok = True
+        if session.get("flow_completed_at"):
+            cooldown_ok = (
+                time.time() - session["flow_completed_at"]
+            ) > FLOW_COOLDOWN_SECONDS
+
+        # -------------------- FLOW CONSENT GATE --------------------
+        # A concurrent request may have opened a flow while this one was classified
+        if (
+            confidence >= FLOW_TRIGGER_THRESHOLD
+            and cooldown_ok
+            and flow_registry.get_flow_for_intent(predicted_intent)
+            and session.get("last_completed_flow") != predicted_intent
+            and not session.get("pending_flow")
+            and not session.get("active_flow")
+        ):
+            consent_msg = (
+                "To help you with this, I’ll need to collect a few details. "
+                "Are you okay sharing them? (yes/no)"
+            )
 
-        session["pending_flow"] = predicted_intent
-        log_turn(session_id, query, consent_msg, "SYSTEM")
+            session["pending_flow"] = predicted_intent
+            log_turn(session_id, query, consent_msg, "SYSTEM")
 
-        return rope_response(
-            text=consent_msg,
-            intent="flow_consent",
-            confidence=confidence,
-            source="SYSTEM"
-        )
+            return rope_response(
+                text=consent_msg,
+                intent="flow_consent",
+                confidence=confidence,
+                source="SYSTEM"
+            )
 
     # -------------------- NORMAL ML RESPONSE --------------------
     if confidence >= CONFIDENCE_THRESHOLD:
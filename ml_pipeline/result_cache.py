@@ -0,0 +1,212 @@
+# ml_pipeline/result_cache.py
+#
+# TTL + LRU cache of stateless classification results (rule match, or ML
+# intent + confidence) keyed on the lowercased query. Only used when no flow
+# is active or pending; the random response choice and session logging still
+# run on every hit.
+
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from utils.query_context import lowered
+
+
+# -------------------- CONFIG --------------------
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "5000"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "600"))
+# Optional JSONL traffic log whose most frequent queries are pre-classified at startup
+RESULT_CACHE_WARM_LOG = os.getenv("RESULT_CACHE_WARM_LOG")
+RESULT_CACHE_WARM_TOP = int(os.getenv("RESULT_CACHE_WARM_TOP", "1000"))
+
+
+class CachedResult:
+    """Stateless outcome of the rule engine + ML step for one query."""
+
+    __slots__ = ("source", "intent", "confidence", "messages")
+
+    def __init__(self, source: str, intent, confidence, messages=None):
+        self.source = source
+        self.intent = intent
+        self.confidence = confidence
+        self.messages = messages
+
+    @classmethod
+    def from_rule(cls, rule: dict) -> "CachedResult":
+        return cls("RULE", rule["intent"], rule["confidence"], tuple(rule["messages"]))
+
+    @classmethod
+    def from_ml(cls, intent, confidence) -> "CachedResult":
+        return cls("ML", intent, confidence)
+
+
+def cache_key(query) -> str:
+    # Rules match on query.lower() and ML preprocessing lowercases too
+    return lowered(query)
+
+
+def fingerprint(rule_pipeline, classifier, semantic_model, preprocess_fn) -> tuple:
+    """Identity of everything a cached result depends on."""
+    return (
+        id(rule_pipeline),
+        getattr(rule_pipeline, "version", 0),
+        id(classifier),
+        id(semantic_model),
+        id(preprocess_fn),
+    )
+
+
+class ResultCache:
+    """
+    Bounded LRU with a per-entry TTL.
+
+    Entries are only valid for the fingerprint they were computed with; as
+    soon as a different fingerprint is seen (rules or models reloaded) the
+    cache is emptied.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+
+        self._entries = OrderedDict()
+        self._fingerprint = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    # -------------------- LOOKUP --------------------
+    def get(self, key: str, fingerprint: tuple):
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            self._bind(fingerprint)
+
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            expires_at, result = item
+            if expires_at <= now:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, fingerprint: tuple, result: CachedResult) -> CachedResult:
+        if not self.enabled:
+            return result
+
+        with self._lock:
+            self._bind(fingerprint)
+
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return result
+
+    # -------------------- MAINTENANCE --------------------
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._fingerprint = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _bind(self, fingerprint: tuple):
+        if fingerprint == self._fingerprint:
+            return
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._fingerprint = fingerprint
+
+    # -------------------- WARMUP --------------------
+    def warm_from_log(
+        self,
+        path: str,
+        rule_pipeline,
+        classifier,
+        semantic_model,
+        preprocess_fn,
+        top_n: int = 1000,
+        field: str = "query"
+    ) -> int:
+        """
+        Pre-classifies the `top_n` most frequent queries of a JSONL traffic
+        log (rules first, then one batched ML call for the rest).
+
+        Returns:
+            int: Number of cached queries
+        """
+        from ml_pipeline.ml_engine import ml_predict_batch
+
+        counts = Counter()
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                query = record.get(field) if isinstance(record, dict) else None
+                if isinstance(query, str) and query.strip():
+                    counts[cache_key(query.strip())] += 1
+
+        queries = [query for query, _ in counts.most_common(min(top_n, self.max_entries))]
+        current = fingerprint(rule_pipeline, classifier, semantic_model, preprocess_fn)
+
+        ml_queries = []
+        for query in queries:
+            rule = rule_pipeline.run(query)
+            if rule.get("matched") and not rule.get("allow_ml_fallback", True):
+                self.put(query, current, CachedResult.from_rule(rule))
+            else:
+                ml_queries.append(query)
+
+        if ml_queries:
+            results = ml_predict_batch(ml_queries, classifier, semantic_model, preprocess_fn)
+            for query, (intent, confidence) in zip(ml_queries, results):
+                self.put(query, current, CachedResult.from_ml(intent, confidence))
+
+        return len(queries)
+
+
+# Global result cache shared by every entry point in the process
+result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE, ttl_seconds=RESULT_CACHE_TTL)
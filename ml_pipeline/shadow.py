@@ -0,0 +1,216 @@
+# ml_pipeline/shadow.py
+#
+# Shadow scoring: a sampled fraction of live ML traffic is re-classified by
+# a candidate model on a background thread, off the request path, and the
+# agreement rate, confidence and latency deltas against the serving model
+# are recorded. Every served ML prediction is eligible, result-cache hits
+# included, so repeated queries weigh as much as they do in live traffic.
+# Both sides are timed on that thread, on the same input: the classifiers
+# alone when the candidate reuses the serving encoder, uncached encode +
+# classify when it brings its own.
+
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter, deque
+
+from utils.query_context import preprocessed
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- CONFIG --------------------
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - started) * 1000.0, result
+
+
+def _encode_and_classify(semantic_model, classifier, text):
+    # Straight to the encoder: the embedding cache would favour whichever side it serves
+    from ml_pipeline.ml_engine import classify_embeddings
+    embeddings = semantic_model.encode([text], normalize_embeddings=True, convert_to_numpy=True)
+    return classify_embeddings(classifier, embeddings)
+
+
+class ShadowScorer:
+    """
+    Scores sampled queries with a candidate classifier (and optionally a
+    candidate encoder) and compares the result with what the serving model
+    answered.
+
+    `submit()` is called on the request path and only does a random draw and
+    a non-blocking queue put; when the queue is full the sample is dropped
+    rather than slowing the request down.
+    """
+
+    def __init__(self, sample_rate: float = 0.1, queue_size: int = 1000, stats_window: int = 5000):
+        self.sample_rate = sample_rate
+        self.stats_window = stats_window
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._candidate = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.sampled = 0
+        self.scored = 0
+        self.dropped = 0
+        self.errors = 0
+        self.agreed = 0
+        self._latency_deltas = deque(maxlen=self.stats_window)
+        self._confidence_deltas = deque(maxlen=self.stats_window)
+        self._primary_latency = deque(maxlen=self.stats_window)
+        self._candidate_latency = deque(maxlen=self.stats_window)
+        self._disagreements = Counter()
+
+    # -------------------- CONTROL --------------------
+    @property
+    def active(self) -> bool:
+        return self._candidate is not None
+
+    def set_candidate(self, classifier, semantic_model=None, name: str = "candidate", sample_rate: float | None = None):
+        """
+        Starts shadowing with a new candidate (statistics are reset).
+
+        Args:
+            classifier: candidate classifier
+            semantic_model: candidate encoder, or None to reuse the serving encoder
+                (its cached embeddings are then shared with the request path)
+            name: label reported in stats()
+        """
+        with self._lock:
+            self._candidate = {"classifier": classifier, "semantic_model": semantic_model, "name": name}
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            self._reset_stats()
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+                self._thread.start()
+
+        logger.info(f"✓ Shadow scoring enabled: {name} at {self.sample_rate:.0%} of traffic")
+
+    def clear_candidate(self):
+        with self._lock:
+            self._candidate = None
+        logger.info("Shadow scoring disabled")
+
+    # -------------------- REQUEST PATH --------------------
+    def submit(self, query, serving_classifier, serving_semantic_model, preprocess_fn, intent, confidence):
+        """
+        Offers one served ML prediction (fresh or from the result cache) for
+        shadow scoring; never blocks.
+        """
+        candidate = self._candidate
+        if candidate is None or random.random() >= self.sample_rate:
+            return
+
+        self.sampled += 1
+        try:
+            self._queue.put_nowait(
+                (candidate, query, serving_classifier, serving_semantic_model, preprocess_fn, intent, confidence)
+            )
+        except queue.Full:
+            self.dropped += 1
+
+    # -------------------- WORKER --------------------
+    def _run(self):
+        from ml_pipeline.ml_engine import encode_texts, classify_embeddings
+
+        while True:
+            candidate, query, serving_classifier, serving_model, preprocess_fn, intent, confidence = self._queue.get()
+
+            # Candidate was replaced or cleared since the sample was taken
+            if candidate is not self._candidate:
+                continue
+
+            try:
+                text = preprocessed(query, preprocess_fn)
+
+                semantic_model = candidate["semantic_model"]
+                if semantic_model is None or semantic_model is serving_model:
+                    # Same embeddings for both: only the classifiers are compared
+                    embeddings = encode_texts(serving_model, [text])
+                    primary_ms, _ = _timed(classify_embeddings, serving_classifier, embeddings)
+                    candidate_ms, results = _timed(classify_embeddings, candidate["classifier"], embeddings)
+                else:
+                    # A different encoder must not touch the serving cache
+                    primary_ms, _ = _timed(_encode_and_classify, serving_model, serving_classifier, text)
+                    candidate_ms, results = _timed(_encode_and_classify, semantic_model, candidate["classifier"], text)
+
+                shadow_intent, shadow_confidence = results[0]
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Shadow scoring failed: {e}")
+                continue
+
+            with self._lock:
+                if candidate is not self._candidate:
+                    continue
+
+                self.scored += 1
+                if str(shadow_intent) == str(intent):
+                    self.agreed += 1
+                else:
+                    self._disagreements[(str(intent), str(shadow_intent))] += 1
+
+                self._primary_latency.append(primary_ms)
+                self._candidate_latency.append(candidate_ms)
+                self._latency_deltas.append(candidate_ms - primary_ms)
+                if confidence is not None and shadow_confidence is not None:
+                    self._confidence_deltas.append(float(shadow_confidence) - float(confidence))
+
+    # -------------------- STATS --------------------
+    def stats(self, top_disagreements: int = 10) -> dict:
+        with self._lock:
+            candidate = self._candidate
+            primary = sorted(self._primary_latency)
+            shadow = sorted(self._candidate_latency)
+            deltas = sorted(self._latency_deltas)
+            confidence_deltas = sorted(self._confidence_deltas)
+
+            return {
+                "active": candidate is not None,
+                "candidate": candidate["name"] if candidate else None,
+                "sample_rate": self.sample_rate,
+                "sampled": self.sampled,
+                "scored": self.scored,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "queue_depth": self._queue.qsize(),
+                "agreement_rate": round(self.agreed / self.scored, 4) if self.scored else None,
+                # What the latencies cover, for both sides alike
+                "timed": "encode+classify" if candidate and candidate["semantic_model"] is not None else "classify",
+                "primary_p50_ms": round(_percentile(primary, 50), 3),
+                "candidate_p50_ms": round(_percentile(shadow, 50), 3),
+                "delta_p50_ms": round(_percentile(deltas, 50), 3),
+                "delta_p95_ms": round(_percentile(deltas, 95), 3),
+                # Candidate minus served confidence
+                "confidence_delta_p50": round(_percentile(confidence_deltas, 50), 4) if confidence_deltas else None,
+                "top_disagreements": [
+                    {"serving": serving, "candidate": cand, "count": count}
+                    for (serving, cand), count in self._disagreements.most_common(top_disagreements)
+                ],
+            }
+
+
+# Global shadow scorer (inactive until a candidate is set)
+shadow_scorer = ShadowScorer(sample_rate=SHADOW_SAMPLE_RATE, queue_size=SHADOW_QUEUE_SIZE)
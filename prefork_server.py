@@ -0,0 +1,268 @@
+# prefork_server.py - Pre-fork serving entry point with copy-on-write model sharing
+#
+#   python prefork_server.py --workers 4 --port 5000
+#   python prefork_server.py --workers 4 --no-share     # every worker loads its own models
+#
+# The master loads and warms the encoder, classifier and rule engine once,
+# freezes the GC generations and then forks the workers. All workers accept
+# on the socket bound by the master and read the model weights from pages
+# shared copy-on-write with it. Joblib arrays are memory-mapped (mmap_mode="c",
+# INTENT_CLASSIFIER_MMAP=1), so they are backed by the page cache, not by
+# private memory.
+#
+# Send SIGUSR1 to the master to print per-worker memory usage.
+# With SESSION_JOURNAL_DIR set every worker journals to its own subdirectory.
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("prefork")
+
+
+# -------------------- MEMORY REPORT --------------------
+def memory_usage(pid: int) -> dict:
+    """
+    Reads RSS / PSS / private and shared memory (kB) of a process from
+    /proc/<pid>/smaps_rollup. PSS splits shared pages across the processes
+    mapping them, so the sum of PSS over workers is their real footprint.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return {}
+
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def report_memory(master_pid: int, worker_pids: list, baseline_kb: int | None):
+    rows = [("master", master_pid)] + [(f"worker-{i}", pid) for i, pid in enumerate(worker_pids)]
+
+    logger.info(f"{'process':10} {'pid':>7} {'rss MB':>9} {'pss MB':>9} {'shared MB':>10} {'private MB':>11}")
+    total_pss = 0
+    for name, pid in rows:
+        usage = memory_usage(pid)
+        if not usage:
+            continue
+        total_pss += usage["pss_kb"]
+        logger.info(
+            f"{name:10} {pid:>7} {usage['rss_kb'] / 1024:>9.1f} {usage['pss_kb'] / 1024:>9.1f} "
+            f"{usage['shared_kb'] / 1024:>10.1f} {usage['private_kb'] / 1024:>11.1f}"
+        )
+
+    logger.info(f"Total PSS (master + {len(worker_pids)} workers): {total_pss / 1024:.1f} MB")
+    if baseline_kb:
+        unshared = baseline_kb * len(worker_pids)
+        logger.info(
+            f"Estimated without sharing ({len(worker_pids)} × {baseline_kb / 1024:.1f} MB loaded RSS): "
+            f"{unshared / 1024:.1f} MB"
+        )
+
+
+# -------------------- APP LOADING --------------------
+def load_app():
+    """Imports app.py (which loads the models) and returns the Flask app."""
+    import app as app_module
+    return app_module
+
+
+def warmup():
+    """Runs inferences through every model so lazy init happens before fork."""
+    from ml_pipeline.model_registry import model_registry
+    model_registry.warmup()
+
+
+def _limit_torch_threads(threads: int):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def own_session_layer(name: str):
+    """
+    Drops the session layer the master built during warmup, so a forked
+    worker builds its own on first use, journaling into a subdirectory of
+    SESSION_JOURNAL_DIR of its own: workers sharing one directory would
+    overwrite each other's snapshots and delete each other's segments.
+    """
+    import session.session_journal as session_journal
+    from ml_pipeline.model_registry import model_registry
+    if session_journal.SESSION_JOURNAL_DIR:
+        session_journal.SESSION_JOURNAL_DIR = os.path.join(session_journal.SESSION_JOURNAL_DIR, name)
+    model_registry.reset("session_manager", "flow_handler")
+
+
+def close_session_layer():
+    """Writes pending session changes (store batch, journal queue) before a worker exits."""
+    from ml_pipeline.model_registry import model_registry
+    if model_registry.is_loaded("session_manager"):
+        model_registry.session_manager.close()
+
+
+def stop_on_sigterm(server):
+    """
+    SIGTERM ends serve_forever() instead of the process, so the worker's
+    cleanup runs. shutdown() waits for the serving loop and must be called
+    from another thread; sent before the loop starts, it makes it return at once.
+    """
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+
+
+class _LazyApp:
+    """WSGI callable that resolves app.py inside the worker (no-share mode)."""
+
+    def __init__(self):
+        self._app = None
+
+    def __call__(self, environ, start_response):
+        if self._app is None:
+            self._app = load_app().app
+        return self._app(environ, start_response)
+
+
+# -------------------- WORKERS --------------------
+def _worker_main(worker: int, server, share: bool, threads: int):
+    stop_on_sigterm(server)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+
+    _limit_torch_threads(threads)
+
+    if share:
+        # Objects frozen in the master stay out of the collector's reach;
+        # new objects created while serving are collected as usual.
+        gc.enable()
+    else:
+        load_app()
+
+    own_session_layer(f"worker-{worker}")
+
+    from ml_pipeline.batch_scheduler import batch_scheduler, BATCHING_ENABLED
+    if BATCHING_ENABLED:
+        # Threads do not survive fork
+        batch_scheduler.start()
+
+    from rule_engine.rule_watcher import RULES_WATCH_ENABLED
+    if RULES_WATCH_ENABLED:
+        # Each worker reloads its own copy of the rules
+        from ml_pipeline.model_registry import model_registry
+        model_registry.rule_watcher.start()
+
+    try:
+        server.serve_forever()
+    finally:
+        try:
+            close_session_layer()
+        finally:
+            os._exit(0)
+
+
+def _spawn(worker: int, server, share: bool, threads: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        _worker_main(worker, server, share, threads)
+    return pid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-fork server with copy-on-write model sharing")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="torch intra-op threads in each worker")
+    parser.add_argument("--no-share", action="store_true", help="Load models in every worker (current setup, for comparison)")
+    parser.add_argument("--report-after", type=float, default=15.0, help="Seconds before the first memory report (0 = off)")
+    args = parser.parse_args(argv)
+
+    from werkzeug.serving import make_server
+
+    share = not args.no_share
+    master_pid = os.getpid()
+    baseline_kb = None
+
+    if share:
+        os.environ.setdefault("INTENT_CLASSIFIER_MMAP", "1")
+        # app.py would warm up on import; do it explicitly below instead
+        os.environ.setdefault("MODEL_WARMUP", "0")
+
+        # No collections while the long-lived model objects are built, so
+        # they are laid out densely and never rewritten by the GC afterwards
+        gc.disable()
+        before_kb = memory_usage(master_pid).get("rss_kb", 0)
+
+        started = time.perf_counter()
+        _limit_torch_threads(1)
+        app_module = load_app()
+        warmup()
+        logger.info(f"✓ Models loaded and warmed in master ({time.perf_counter() - started:.1f}s)")
+
+        baseline_kb = memory_usage(master_pid).get("rss_kb", 0) - before_kb
+        gc.freeze()
+        wsgi_app = app_module.app
+    else:
+        wsgi_app = _LazyApp()
+
+    server = make_server(args.host, args.port, wsgi_app, threaded=True)
+    logger.info(f"✓ Listening on {args.host}:{args.port} with {args.workers} workers (share={share})")
+
+    # pid -> worker index; a restarted worker keeps its index (and journal directory)
+    workers = {}
+    for worker in range(args.workers):
+        workers[_spawn(worker, server, share, args.threads_per_worker)] = worker
+
+    stopping = False
+
+    def shutdown(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGUSR1, lambda *_: report_memory(master_pid, list(workers), baseline_kb))
+
+    if args.report_after > 0:
+        signal.signal(signal.SIGALRM, lambda *_: report_memory(master_pid, list(workers), baseline_kb))
+        signal.setitimer(signal.ITIMER_REAL, args.report_after)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except InterruptedError:
+            continue
+        except ChildProcessError:
+            break
+
+        worker = workers.pop(pid, None)
+        if not stopping and worker is not None:
+            logger.warning(f"Worker {pid} exited with status {status}, restarting")
+            workers[_spawn(worker, server, share, args.threads_per_worker)] = worker
+
+    server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# rule_engine/keyword_scanner.py
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordScanner:
+    """
+    Aho-Corasick automaton over labelled keywords.
+
+    Every keyword is added with a label; scan() walks the text once and
+    returns the labels of all keywords found. Keywords added with
+    whole_word=True only count when not surrounded by word characters
+    (so "no" does not hit inside "know"); the others match as plain
+    substrings, like `keyword in text`.
+
+    Matching is case-sensitive: callers scan lowercased text.
+    """
+
+    def __init__(self):
+        self._keywords = []
+        self._built = False
+
+    def add(self, keyword: str, label, whole_word: bool = True):
+        if not keyword:
+            raise ValueError("Empty keyword")
+        self._keywords.append((keyword, label, whole_word))
+        self._built = False
+        return self
+
+    def build(self):
+        goto = [{}]
+        output = [[]]
+
+        for keyword, label, whole_word in self._keywords:
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    output.append([])
+                state = nxt
+            output[state].append((len(keyword), label, whole_word))
+
+        # Breadth-first failure links; outputs of the fallback state are inherited
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, nxt in goto[state].items():
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[nxt] = goto[fallback].get(ch, 0)
+                output[nxt] = output[nxt] + output[fail[nxt]]
+                queue.append(nxt)
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+        self._built = True
+        return self
+
+    def scan(self, text: str) -> set:
+        """
+        Returns:
+            set: labels of every keyword found in `text`
+        """
+        if not self._built:
+            self.build()
+
+        goto, fail, output = self._goto, self._fail, self._output
+        hits = set()
+        state = 0
+        end = len(text)
+
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            for length, label, whole_word in output[state]:
+                if whole_word:
+                    start = i - length + 1
+                    if start > 0 and _is_word_char(text[start - 1]):
+                        continue
+                    if i + 1 < end and _is_word_char(text[i + 1]):
+                        continue
+                hits.add(label)
+
+        return hits
@@ -1,85 +1,155 @@
 # rule_engine/query_analyzer.py
 
 import re
+from functools import lru_cache
 
-def should_skip_rules(query: str, max_tokens: int = 12) -> bool:
+from rule_engine.keyword_scanner import KeywordScanner
+from utils.query_context import QueryContext, lowered
+
+
+# Keyword features reported by analyze_query_characteristics (substring match,
+# except for WHOLE_WORD_KEYWORDS)
+FEATURE_KEYWORDS = {
+    "is_affirmation": ['yes', 'yeah', 'sure', 'ok', 'okay', 'agree', 'confirmed', 'affirmative'],
+    "is_negation": ['no', 'nope', 'not', 'deny', 'denied', 'negative', 'declined'],
+    "has_pricing_keyword": ['price', 'pricing', 'cost', 'expense'],
+    "has_demo_keyword": ['demo', 'demonstration', 'walkthrough', 'example'],
+    "has_support_keyword": ['help', 'support', 'assist', 'problem', 'issue'],
+    "has_contact_keyword": ['contact', 'reach', 'call', 'email', 'phone'],
+    "has_trial_keyword": ['trial', 'try', 'test', 'free'],
+}
+
+# Short answer words that also occur inside ordinary words ("no" in "know"
+# and "phone", "ok" in "book", "yes" in "eyes"); only these need word
+# boundaries. Topic keywords keep matching inflections ("prices", "demos").
+WHOLE_WORD_KEYWORDS = {'yes', 'yeah', 'sure', 'ok', 'okay', 'no', 'nope', 'not'}
+
+NEGATIVE_KEYWORD = "negative_keyword"
+
+# Longest query the rule engine sees; anything longer goes straight to ML.
+# The regex profiler caps its adversarial inputs at the same limits.
+RULE_MAX_TOKENS = 12
+RULE_MAX_CHARS = 200
+
+
+def build_keyword_scanner(negative_keywords=()) -> KeywordScanner:
+    """
+    One automaton for every feature keyword plus the rules' negative keywords.
+
+    Feature hits are reported by flag name; a negative keyword hit is
+    reported as (NEGATIVE_KEYWORD, keyword). Negative keywords keep their
+    rule-file semantics (plain substring of the lowercased query).
+    """
+    scanner = KeywordScanner()
+    for flag, keywords in FEATURE_KEYWORDS.items():
+        for keyword in keywords:
+            scanner.add(keyword, flag, whole_word=keyword in WHOLE_WORD_KEYWORDS)
+    for keyword in set(negative_keywords):
+        scanner.add(keyword, (NEGATIVE_KEYWORD, keyword), whole_word=False)
+    return scanner.build()
+
+
+_SCANNER = build_keyword_scanner()
+
+
+def scan_query(query: str, scanner: KeywordScanner = None) -> dict:
+    """
+    Scans the lowercased query (raw string or QueryContext) once.
+
+    Returns:
+        dict: "features" (set of FEATURE_KEYWORDS flags found) and
+              "negative_keywords" (set of negative keywords found)
+    """
+    features = set()
+    negatives = set()
+    for hit in (scanner or _SCANNER).scan(lowered(query)):
+        if isinstance(hit, tuple):
+            negatives.add(hit[1])
+        else:
+            features.add(hit)
+    return {"features": features, "negative_keywords": negatives}
+
+def should_skip_rules(query, max_tokens: int = RULE_MAX_TOKENS, max_chars: int = RULE_MAX_CHARS) -> bool:
     """
     Decide whether to skip rule engine and go directly to ML.
     Rules are valuable for short & ambiguous queries.
     
     Skips rules for:
     - Empty input
-    - Very long queries (> max_tokens)
+    - Very long queries (> max_tokens or > max_chars)
     - Conversational/narrative input
     
     Args:
-        query: User input query
+        query: User input query (raw string or QueryContext)
         max_tokens: Maximum token threshold for rule engine
+        max_chars: Maximum length (characters) for rule engine
     
     Returns:
         bool: True if should skip rules, False otherwise
     """
     
-    tokens = query.strip().lower().split()
+    context = QueryContext.of(query)
     
     # Empty input → skip
-    if not tokens:
+    if not context.tokens:
         return True
     
     # Very long queries → skip rules (they're likely natural conversations)
-    if len(tokens) > max_tokens:
+    if context.token_count > max_tokens or len(context.normalized) > max_chars:
         return True
     
     # Otherwise ALWAYS allow rules for short queries
     return False
 
 
-def analyze_query_characteristics(query: str) -> dict:
+def analyze_query_characteristics(query) -> dict:
     """
     Analyzes query characteristics for routing decisions.
     
     Args:
-        query: User input query
+        query: User input query (raw string or QueryContext)
     
     Returns:
         dict: Analysis results including length, intent signals, etc.
     """
-    tokens = query.strip().lower().split()
+    context = QueryContext.of(query)
+    query = context.raw
+    features = scan_query(context)["features"]
     
     analysis = {
         "original_query": query,
-        "token_count": len(tokens),
+        "token_count": context.token_count,
         "char_count": len(query),
         "is_question": query.strip().endswith('?'),
         "is_command": query.strip().startswith(('help', 'show', 'get', 'list', 'find')),
-        "is_affirmation": _is_affirmation(query),
-        "is_negation": _is_negation(query),
-        "has_pricing_keyword": _has_keyword(query, ['price', 'pricing', 'cost', 'expense']),
-        "has_demo_keyword": _has_keyword(query, ['demo', 'demonstration', 'walkthrough', 'example']),
-        "has_support_keyword": _has_keyword(query, ['help', 'support', 'assist', 'problem', 'issue']),
-        "has_contact_keyword": _has_keyword(query, ['contact', 'reach', 'call', 'email', 'phone']),
-        "has_trial_keyword": _has_keyword(query, ['trial', 'try', 'test', 'free']),
     }
+    for flag in FEATURE_KEYWORDS:
+        analysis[flag] = flag in features
     
     return analysis
 
 
 def _is_affirmation(query: str) -> bool:
     """Checks if query is an affirmation."""
-    affirmations = ['yes', 'yeah', 'sure', 'ok', 'okay', 'agree', 'confirmed', 'affirmative']
-    return any(aff in query.lower() for aff in affirmations)
+    return "is_affirmation" in scan_query(query)["features"]
 
 
 def _is_negation(query: str) -> bool:
     """Checks if query is a negation."""
-    negations = ['no', 'nope', 'not', 'deny', 'denied', 'negative', 'declined']
-    return any(neg in query.lower() for neg in negations)
+    return "is_negation" in scan_query(query)["features"]
+
+
+@lru_cache(maxsize=64)
+def _keyword_scanner(keywords: tuple) -> KeywordScanner:
+    scanner = KeywordScanner()
+    for keyword in keywords:
+        scanner.add(keyword, True, whole_word=keyword in WHOLE_WORD_KEYWORDS)
+    return scanner.build()
 
 
 def _has_keyword(query: str, keywords: list) -> bool:
     """Checks if query contains any of the given keywords."""
-    query_lower = query.lower()
-    return any(keyword in query_lower for keyword in keywords)
+    return bool(_keyword_scanner(tuple(keywords)).scan(lowered(query)))
 
 
 def get_query_intent_category(analysis: dict) -> str:
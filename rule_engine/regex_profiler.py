@@ -0,0 +1,248 @@
+# rule_engine/regex_profiler.py
+#
+# Load-time safety check for rule regexes. Every pattern is timed against
+# growing adversarial inputs (pumped repetitions of the characters and
+# words it contains, followed by a character that forces a failed match)
+# and, optionally, against recorded queries. Inputs never exceed the longest
+# query should_skip_rules lets through, since rules never see longer ones.
+#
+# A pattern that blows the time budget at that length is unsafe, so the
+# loader can quarantine or reject it before it serves traffic. Super-linear
+# growth alone is timing-sensitive: it makes a pattern unsafe only when every
+# one of GROWTH_RUNS independent probes confirms it, and is otherwise
+# reported as a warning.
+
+import json
+import logging
+import math
+import os
+import re
+import time
+
+from rule_engine.query_analyzer import RULE_MAX_CHARS, should_skip_rules
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- CONFIG --------------------
+# "quarantine" drops flagged patterns, "reject" fails the load, "off" skips profiling
+REGEX_SAFETY_MODE = os.getenv("RULES_REGEX_SAFETY", "quarantine")
+REGEX_BUDGET_MS = float(os.getenv("RULES_REGEX_BUDGET_MS", "10"))
+# Optional JSONL traffic log whose queries are also timed
+REGEX_PROFILE_CORPUS = os.getenv("RULES_REGEX_CORPUS")
+
+# Doubling the input must not cost more than this factor (2 = linear)
+GROWTH_LIMIT = 3.0
+# Below this the doubling ratio is timer noise
+GROWTH_FLOOR_MS = 0.2
+# Probes that must all see super-linear growth before a pattern is unsafe
+GROWTH_RUNS = 3
+
+_FAIL_SUFFIXES = ("!", "")
+
+
+def _pump_units(pattern: str) -> list:
+    """Repeatable units an attacker would try: the pattern's own characters and words."""
+    letters = sorted({ch for ch in pattern.lower() if ch.isalnum()})
+    words = sorted(set(re.findall(r"[a-z0-9]{2,}", pattern.lower())), key=len, reverse=True)
+
+    units = ["a", " ", "a ", "0"]
+    units += letters[:2]
+    units += [w + " " for w in words[:2]]
+
+    seen = set()
+    return [u for u in units if not (u in seen or seen.add(u))]
+
+
+def _time_search(regex, text: str, repeat: int = 1) -> float:
+    """Fastest of `repeat` searches (ms); the minimum filters scheduler noise."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        regex.search(text)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0
+
+
+def _growth(regex, previous_text: str, text: str) -> float:
+    """Cost factor per doubling of the input, from noise-filtered timings."""
+    before = _time_search(regex, previous_text, repeat=5)
+    after = _time_search(regex, text, repeat=5)
+    if before <= 0:
+        return 1.0
+    return (after / before) ** (1.0 / math.log2(len(text) / len(previous_text)))
+
+
+def _max_repeats(unit: str, suffix: str) -> int:
+    """Largest n for which the rule path still accepts `unit * n + suffix`."""
+    n = (RULE_MAX_CHARS - len(suffix)) // len(unit)
+    while n > 0 and should_skip_rules(unit * n + suffix):
+        n -= 1
+    return n
+
+
+def _probe(regex, unit: str, suffix: str, budget_ms: float) -> dict:
+    """
+    Grows `unit * n + suffix` up to the longest query the rule path accepts,
+    or until the budget is hit. Steps double while a search is still in the
+    microseconds and slow down afterwards, so an exponential pattern is
+    caught before it hangs.
+    """
+    limit = _max_repeats(unit, suffix)
+    n = min(4, limit)
+    previous = None
+    worst = {"input_length": 0, "ms": 0.0}
+
+    while n > 0:
+        text = unit * n + suffix
+        elapsed = _time_search(regex, text, repeat=3)
+
+        if elapsed > worst["ms"]:
+            worst = {"input_length": len(text), "ms": elapsed}
+
+        if elapsed > budget_ms:
+            worst["reason"] = "budget"
+            break
+
+        if previous is not None and elapsed > GROWTH_FLOOR_MS:
+            growth = _growth(regex, previous, text)
+            if growth > GROWTH_LIMIT:
+                worst.update(input_length=len(text), ms=elapsed, growth=round(growth, 2), reason="superlinear")
+                break
+
+        if n == limit:
+            break
+        previous = text
+        n = min(limit, n * 2 if elapsed < budget_ms / 1000.0 else n + max(2, n // 8))
+
+    worst["input"] = (unit, suffix)
+    return worst
+
+
+def profile_pattern(regex, corpus=(), budget_ms: float = REGEX_BUDGET_MS) -> dict:
+    """
+    Times one compiled pattern against adversarial and recorded inputs.
+
+    Returns:
+        dict: pattern, safe, reason, warning, worst adversarial case, corpus max (ms)
+    """
+    report = {"pattern": regex.pattern, "safe": True, "reason": None, "warning": None}
+
+    worst = None
+    for unit in _pump_units(regex.pattern):
+        for suffix in _FAIL_SUFFIXES:
+            result = _probe(regex, unit, suffix, budget_ms)
+            if worst is None or result["ms"] > worst["ms"] or "reason" in result:
+                worst = result
+            if "reason" in result:
+                break
+        if "reason" in worst:
+            break
+
+    if worst and worst.get("reason") == "superlinear":
+        # Re-probe the same input; one slow timing on a busy machine is not a verdict
+        unit, suffix = worst["input"]
+        reruns = [_probe(regex, unit, suffix, budget_ms) for _ in range(GROWTH_RUNS - 1)]
+        if all("reason" in run for run in reruns):
+            worst = max([worst] + reruns, key=lambda run: run["ms"])
+            worst["reason"] = "budget" if any(run["reason"] == "budget" for run in reruns) else "superlinear"
+        else:
+            worst["confirmed"] = f"{1 + sum('reason' in run for run in reruns)}/{GROWTH_RUNS}"
+            report["warning"] = worst.pop("reason")
+
+    report["adversarial"] = worst
+    if worst and "reason" in worst:
+        report["safe"] = False
+        report["reason"] = worst["reason"]
+
+    if corpus:
+        timings = [_time_search(regex, text) for text in corpus]
+        report["corpus_max_ms"] = max(timings)
+        report["corpus_mean_ms"] = sum(timings) / len(timings)
+        if report["safe"] and report["corpus_max_ms"] > budget_ms:
+            report["safe"] = False
+            report["reason"] = "corpus_budget"
+
+    return report
+
+
+# Profiles are keyed on (pattern, flags) so a reload only re-times new patterns
+_profile_cache = {}
+
+
+def profile_rules(rules, corpus=(), budget_ms: float = REGEX_BUDGET_MS) -> list:
+    """
+    Profiles every pattern of every rule. Recorded queries the rule path
+    would skip are left out of the corpus.
+
+    Returns:
+        list: reports of the unsafe patterns and of the ones with a warning,
+            each with the rule's intent
+    """
+    corpus = [text.lower() for text in corpus if not should_skip_rules(text)]
+    flagged = []
+
+    for rule in rules:
+        for regex in rule.get("_compiled_regex", []):
+            key = (regex.pattern, regex.flags, budget_ms, len(corpus))
+            report = _profile_cache.get(key)
+            if report is None:
+                report = _profile_cache[key] = profile_pattern(regex, corpus, budget_ms)
+            if not report["safe"] or report["warning"]:
+                flagged.append(dict(report, intent=rule.get("intent")))
+
+    return flagged
+
+
+def quarantine_patterns(rules, unsafe) -> list:
+    """
+    Removes the unsafe patterns from their rules; rules left without any
+    pattern are dropped.
+
+    Returns:
+        list: the remaining rules
+    """
+    from rule_engine.rule_loader import prepare_rule
+
+    flagged = {(report["intent"], report["pattern"]) for report in unsafe}
+    kept = []
+
+    for rule in rules:
+        intent = rule.get("intent")
+        removed = [r for r in rule["_compiled_regex"] if (intent, r.pattern) in flagged]
+        if not removed:
+            kept.append(rule)
+            continue
+
+        for regex in removed:
+            logger.warning(f"⚠️ Quarantined regex in rule '{intent}': {regex.pattern!r}")
+
+        patterns = [p for p in rule["match"]["regex"] if (intent, p) not in flagged]
+        rule["match"] = dict(rule["match"], regex=patterns)
+        if patterns:
+            prepare_rule(rule)
+            kept.append(rule)
+        else:
+            logger.warning(f"⚠️ Rule '{intent}' dropped: no safe patterns left")
+
+    return kept
+
+
+def load_corpus(path: str | None, field: str = "query", limit: int = 2000) -> list:
+    """Queries from a JSONL traffic log (empty when unset or missing)."""
+    if not path or not os.path.exists(path):
+        return []
+
+    corpus = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            text = record.get(field) if isinstance(record, dict) else None
+            if isinstance(text, str) and text.strip():
+                corpus.append(text)
+            if len(corpus) >= limit:
+                break
+    return corpus
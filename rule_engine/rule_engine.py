@@ -1,15 +1,168 @@
 # rule_engine/rule_engine.py
 
 import random
-from rule_engine.rule_matcher import rule_matches
+import threading
+import time
+from rule_engine.rule_loader import prepare_rule
+from rule_engine.rule_matcher import rule_matches, CombinedMatcher
+from rule_engine.query_analyzer import build_keyword_scanner, scan_query
+from utils.query_context import QueryContext
 
 class RuleEngine:
     def __init__(self, rules):
         self.rules = rules
 
-    def process(self, query: str) -> dict:
+        # Runtime counters per rule id (see rule_stats)
+        self._stats_lock = threading.Lock()
+        self._evaluations = [0] * len(rules)
+        self._hits = [0] * len(rules)
+        self._match_ns = [0] * len(rules)
+
+        # Exact-match index: literal query -> ids of rules it satisfies
+        self.exact_index = {}
+        self._anchored = {}
+        self._residual = {}
+        buckets = {}
+
+        # Ids are positions in `rules` (the priority-sorted list)
+        for rule_id, rule in enumerate(rules):
+            if "_exact_literals" not in rule:
+                prepare_rule(rule)
+
+            max_tokens = rule.get("max_tokens")
+            for literal in rule["_exact_literals"]:
+                if max_tokens is None or len(literal.split()) <= max_tokens:
+                    self.exact_index.setdefault(literal, []).append(rule_id)
+
+            anchored = [r for r in rule["_compiled_regex"] if r not in rule["_residual_regex"]]
+            if anchored:
+                self._anchored[rule_id] = anchored
+
+            if rule["_residual_regex"]:
+                self._residual[rule_id] = rule["_residual_regex"]
+                buckets.setdefault(max_tokens, {})[rule_id] = rule["_residual_regex"]
+
+        # Feature keywords + every rule's negative keywords in one automaton
+        self.keywords = build_keyword_scanner(
+            neg for rule in rules for neg in rule.get("negative_keywords", [])
+        )
+
+        # Remaining rules partitioned by max_tokens, most permissive first
+        self.buckets = [
+            (max_tokens, CombinedMatcher(patterns))
+            for max_tokens, patterns in sorted(
+                buckets.items(), key=lambda item: float("inf") if item[0] is None else item[0], reverse=True
+            )
+        ]
+
+    def process(self, query) -> dict:
+        """
+        Exact-match rules are answered by a dict lookup; the others are
+        scanned only in the max_tokens buckets the query fits, one combined
+        matcher per bucket. Candidates are verified in priority order, then
+        the negative keyword guard is applied to those rules only, from one
+        keyword automaton scan.
+
+        Args:
+            query: raw string or QueryContext
+        """
+        context = QueryContext.of(query)
+        text = context.lower
+        token_count = context.token_count
+
+        exact = self._exact_matches(text, token_count)
+        candidates = set(exact)
+        for max_tokens, matcher in self.buckets:
+            if max_tokens is not None and token_count > max_tokens:
+                break
+            candidates |= matcher.candidates(text)
+
         matched_rules = []
-        token_count = len(query.strip().split())  # ✅ ADD THIS
+        negative_hits = None
+        evaluated = []
+        for rule_id in sorted(candidates):
+            if rule_id in exact:
+                evaluated.append((rule_id, True, 0))
+            else:
+                started = time.perf_counter_ns()
+                hit = any(r.search(text) for r in self._residual[rule_id])
+                evaluated.append((rule_id, hit, time.perf_counter_ns() - started))
+                if not hit:
+                    continue
+
+            rule = self.rules[rule_id]
+            negatives = rule.get("negative_keywords")
+            if negatives:
+                # Single keyword scan, only once a candidate needs it
+                if negative_hits is None:
+                    negative_hits = scan_query(context, self.keywords)["negative_keywords"]
+                if negative_hits.intersection(negatives):
+                    continue
+
+            matched_rules.append(rule)
+
+            # Conflict guard (fail fast)
+            if len(matched_rules) > 1:
+                break
+
+        self._record(evaluated)
+        return self._result(matched_rules)
+
+    def _record(self, evaluated):
+        with self._stats_lock:
+            for rule_id, hit, elapsed_ns in evaluated:
+                self._evaluations[rule_id] += 1
+                self._hits[rule_id] += hit
+                self._match_ns[rule_id] += elapsed_ns
+
+    def rule_stats(self, top: int | None = None) -> list:
+        """
+        Per-rule runtime counters, most expensive first. Exact-index hits
+        count as evaluations with zero regex time.
+
+        Returns:
+            list: dicts with intent, priority, evaluations, hits, total_ms, mean_us
+        """
+        with self._stats_lock:
+            counters = list(zip(self._evaluations, self._hits, self._match_ns))
+
+        stats = [
+            {
+                "intent": rule["intent"],
+                "priority": rule.get("priority", 100),
+                "evaluations": evaluations,
+                "hits": hits,
+                "total_ms": round(match_ns / 1e6, 3),
+                "mean_us": round(match_ns / evaluations / 1e3, 3) if evaluations else 0.0,
+            }
+            for rule, (evaluations, hits, match_ns) in zip(self.rules, counters)
+        ]
+        stats.sort(key=lambda s: (s["total_ms"], s["evaluations"]), reverse=True)
+        return stats[:top] if top else stats
+
+    def _exact_matches(self, text: str, token_count: int) -> set:
+        # Case folding beyond ASCII (e.g. KELVIN SIGN ~ k) is not covered by lower()
+        if not text.isascii():
+            return {
+                rule_id for rule_id, regexes in self._anchored.items()
+                if self._fits(rule_id, token_count) and any(r.search(text) for r in regexes)
+            }
+
+        ids = set(self.exact_index.get(text, ()))
+        # "$" also matches right before a trailing newline
+        if text.endswith("\n"):
+            ids.update(self.exact_index.get(text[:-1], ()))
+        return ids
+
+    def _fits(self, rule_id: int, token_count: int) -> bool:
+        max_tokens = self.rules[rule_id].get("max_tokens")
+        return max_tokens is None or token_count <= max_tokens
+
+    def process_linear(self, query) -> dict:
+        """Reference implementation: every rule checked one by one."""
+        context = QueryContext.of(query)
+        matched_rules = []
+        token_count = context.token_count  # ✅ ADD THIS
 
         for rule in self.rules:
             # ✅ ENFORCE max_tokens IF PRESENT
@@ -17,13 +170,16 @@ class RuleEngine:
             if max_tokens is not None and token_count > max_tokens:
                 continue
 
-            if rule_matches(rule, query):
+            if rule_matches(rule, context):
                 matched_rules.append(rule)
 
             # Conflict guard (fail fast)
             if len(matched_rules) > 1:
                 break
 
+        return self._result(matched_rules)
+
+    def _result(self, matched_rules: list) -> dict:
         # ❌ No rule matched
         if not matched_rules:
             return self._fail("NO_RULE_MATCH")
@@ -40,6 +196,7 @@ class RuleEngine:
             "intent": rule["intent"],
             "confidence": rule.get("confidence", 1.0),
             "response": response_text,
+            "messages": rule["response"]["messages"],
             "allow_ml_fallback": rule.get("allow_ml_fallback", True),
             "reason": "RULE_MATCH"
         }
@@ -53,3 +210,27 @@ class RuleEngine:
             "allow_ml_fallback": True,
             "reason": reason
         }
+
+
+def check_parity(engine: RuleEngine, queries) -> dict:
+    """
+    Differential check of RuleEngine.process against the linear scan.
+
+    Returns:
+        dict: queries checked, mismatching queries (first 20), passed
+    """
+    mismatches = []
+    checked = 0
+    for query in queries:
+        checked += 1
+        fast = engine.process(query)
+        linear = engine.process_linear(query)
+        if (fast["matched"], fast["intent"], fast["reason"]) != (linear["matched"], linear["intent"], linear["reason"]):
+            mismatches.append(query)
+
+    return {
+        "queries": checked,
+        "mismatches": len(mismatches),
+        "examples": mismatches[:20],
+        "passed": not mismatches,
+    }
@@ -3,6 +3,38 @@
 import yaml
 import re
 
+from rule_engine.rule_matcher import anchored_literals
+
+
+def prepare_rule(rule: dict) -> dict:
+    """
+    Compiles the rule's regex patterns once and splits off the fully anchored
+    literal ones ("^(pricing|price)$") for the engine's exact-match index.
+
+    Adds:
+        _compiled_regex: every pattern, compiled
+        _exact_literals: strings matched by the anchored literal patterns
+        _residual_regex: compiled patterns that still need a regex scan
+    """
+    compiled = []
+    exact = set()
+    residual = []
+    for pattern in rule.get("match", {}).get("regex", []):
+        regex = re.compile(pattern, re.IGNORECASE)
+        compiled.append(regex)
+
+        literals = anchored_literals(regex)
+        if literals is None:
+            residual.append(regex)
+        else:
+            exact |= literals
+
+    rule["_compiled_regex"] = compiled
+    rule["_exact_literals"] = exact
+    rule["_residual_regex"] = residual
+    return rule
+
+
 def load_rules(yaml_paths):
     """
     yaml_paths: list of rule yaml file paths
@@ -12,15 +44,51 @@ def load_rules(yaml_paths):
     for path in yaml_paths:
         with open(path, "r") as f:
             data = yaml.safe_load(f) or []
+            if not isinstance(data, list) or not all(isinstance(rule, dict) for rule in data):
+                raise ValueError(f"{path}: expected a list of rules")
             rules.extend(data)
 
     # Compile regex patterns once
     for rule in rules:
-        compiled = []
-        for pattern in rule.get("match", {}).get("regex", []):
-            compiled.append(re.compile(pattern, re.IGNORECASE))
-        rule["_compiled_regex"] = compiled
+        prepare_rule(rule)
 
     # Sort by priority (lower = higher priority)
     rules.sort(key=lambda r: r.get("priority", 100))
     return rules
+
+
+def validate_rules(rules):
+    """
+    Validates loaded rules before they serve traffic.
+
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    if not rules:
+        return False, "No rules loaded"
+
+    for i, rule in enumerate(rules):
+        name = rule.get("intent")
+        if not isinstance(name, str) or not name:
+            return False, f"Rule {i} missing 'intent' field"
+
+        if not isinstance(rule.get("priority", 100), (int, float)):
+            return False, f"Rule '{name}': 'priority' must be a number"
+
+        max_tokens = rule.get("max_tokens")
+        if max_tokens is not None and not isinstance(max_tokens, int):
+            return False, f"Rule '{name}': 'max_tokens' must be an integer"
+
+        patterns = rule.get("match", {}).get("regex")
+        if not isinstance(patterns, list) or not patterns:
+            return False, f"Rule '{name}': 'match.regex' must be a non-empty list"
+
+        negatives = rule.get("negative_keywords", [])
+        if not isinstance(negatives, list) or not all(isinstance(n, str) and n for n in negatives):
+            return False, f"Rule '{name}': 'negative_keywords' must be a list of strings"
+
+        messages = rule.get("response", {}).get("messages")
+        if not isinstance(messages, list) or not messages:
+            return False, f"Rule '{name}': 'response.messages' must be a non-empty list"
+
+    return True, None
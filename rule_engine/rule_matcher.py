@@ -1,8 +1,13 @@
 # rule_engine/rule_matcher.py
 
-def rule_matches(rule: dict, query: str) -> bool:
-    text = query.lower()
-    tokens = text.split()
+import re
+
+from utils.query_context import QueryContext
+
+
+def rule_matches(rule: dict, query) -> bool:
+    context = QueryContext.of(query)
+    text = context.lower
 
     # 1️⃣ Negative keyword guard
     for neg in rule.get("negative_keywords", []):
@@ -11,7 +16,7 @@ def rule_matches(rule: dict, query: str) -> bool:
 
     # 2️⃣ Token length guard (rule-specific)
     max_tokens = rule.get("max_tokens")
-    if max_tokens and len(tokens) > max_tokens:
+    if max_tokens and context.token_count > max_tokens:
         return False
 
     # 3️⃣ Regex matching (STRICT)
@@ -20,3 +25,189 @@ def rule_matches(rule: dict, query: str) -> bool:
             return True
 
     return False
+
+
+# -------------------- COMBINED MATCHER --------------------
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)}
+
+
+def _required_literals(parsed):
+    """
+    Returns a set of lowercase strings of which at least one occurs in any
+    text the pattern matches, or None when no such set can be derived.
+    """
+    factors = []
+    run = []
+
+    def close_run():
+        if run:
+            factors.append({"".join(run)})
+            run.clear()
+
+    for op, av in parsed:
+        # Non-ASCII literals may case-fold to ASCII under IGNORECASE
+        if op is sre_parse.LITERAL and av < 128:
+            run.append(chr(av).lower())
+            continue
+
+        close_run()
+        if op is sre_parse.SUBPATTERN:
+            factor = _required_literals(av[-1])
+        elif op is sre_parse.BRANCH:
+            branches = [_required_literals(branch) for branch in av[1]]
+            factor = None if any(b is None for b in branches) else set().union(*branches)
+        elif op in _REPEATS and av[0] >= 1:
+            factor = _required_literals(av[2])
+        elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+            factor = _required_literals(av)
+        else:
+            factor = None
+
+        if factor:
+            factors.append(factor)
+
+    close_run()
+    # The factor whose shortest literal is longest filters best
+    factors = [f for f in factors if min(map(len, f)) > 0]
+    if not factors:
+        return None
+    return max(factors, key=lambda f: min(map(len, f)))
+
+
+_MAX_EXPANSION = 256
+
+
+def _literal_strings(parsed):
+    """Every string the (sub)pattern matches, if it is a finite set of ASCII literals."""
+    strings = {""}
+    for op, av in parsed:
+        if op is sre_parse.LITERAL and av < 128:
+            options = {chr(av).lower()}
+        elif op is sre_parse.IN and all(o is sre_parse.LITERAL and a < 128 for o, a in av):
+            options = {chr(a).lower() for _, a in av}
+        elif op is sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            options = _literal_strings(av[-1])
+        elif op is sre_parse.BRANCH:
+            branches = [_literal_strings(branch) for branch in av[1]]
+            options = None if any(b is None for b in branches) else set().union(*branches)
+        else:
+            options = None
+
+        if options is None or len(strings) * len(options) > _MAX_EXPANSION:
+            return None
+        strings = {head + tail for head in strings for tail in options}
+    return strings
+
+
+def anchored_literals(regex):
+    """
+    Returns the strings a fully anchored literal pattern such as
+    "^(pricing|price|cost)$" matches (lowercased), or None for any other
+    pattern. Such patterns can be answered with a dict lookup instead.
+    """
+    if regex.flags & (re.MULTILINE | re.VERBOSE):
+        return None
+
+    parsed = list(sre_parse.parse(regex.pattern, regex.flags))
+    if len(parsed) < 3 or parsed[0] != (sre_parse.AT, sre_parse.AT_BEGINNING) \
+            or parsed[-1] != (sre_parse.AT, sre_parse.AT_END):
+        return None
+
+    return _literal_strings(parsed[1:-1])
+
+
+def _trie_regex(literals) -> str:
+    """Alternation of `literals` shaped as a trie, longest match first."""
+    trie = {}
+    for literal in literals:
+        node = trie
+        for ch in literal:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def emit(node):
+        terminal = "" in node
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            return "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+
+class CombinedMatcher:
+    """
+    Finds every rule whose regex matches a query with one scan of the text.
+
+    At load time each pattern is reduced to a set of literals, at least one
+    of which must appear in any matching text ("^(demo|demos)$" -> {"demo"}).
+    All literals are merged into a single trie-shaped regex wrapped in a
+    lookahead, so one finditer() reports the longest literal starting at
+    every position. Literals that are prefixes of a hit are found through
+    the trie path, which gives the exact set of literals present.
+
+    Only rules owning one of those literals (plus rules with a pattern no
+    literal could be derived from) are verified with their own compiled
+    regexes, in priority order.
+    """
+
+    def __init__(self, patterns: dict):
+        """
+        Args:
+            patterns: rule id -> list of compiled regexes (ids in priority order)
+        """
+        self._regexes = patterns
+        self._always = set()
+        rules_by_literal = {}
+
+        for rule_id, regexes in patterns.items():
+            for regex in regexes:
+                literals = _required_literals(sre_parse.parse(regex.pattern, regex.flags))
+                if literals is None:
+                    self._always.add(rule_id)
+                    continue
+                for literal in literals:
+                    rules_by_literal.setdefault(literal, set()).add(rule_id)
+
+        # A hit on "pricing" also means "pric" and "price"... are present
+        self._rules_by_hit = {}
+        for literal in rules_by_literal:
+            ids = set()
+            for end in range(1, len(literal) + 1):
+                ids |= rules_by_literal.get(literal[:end], set())
+            self._rules_by_hit[literal] = ids
+
+        self._scanner = None
+        if rules_by_literal:
+            self._scanner = re.compile("(?=(" + _trie_regex(rules_by_literal) + "))", re.DOTALL)
+
+    def candidates(self, text: str) -> set:
+        """Ids of rules that may match `text` (lowercased)."""
+        if self._scanner is None:
+            return set(self._always)
+
+        # Case folding beyond ASCII (e.g. KELVIN SIGN ~ k) is not covered by lower()
+        if not text.isascii():
+            return set(self._regexes)
+
+        found = set(self._always)
+        for hit in set(self._scanner.findall(text)):
+            found |= self._rules_by_hit[hit]
+        return found
+
+    def match(self, text: str):
+        """
+        Yields:
+            int: ids of rules with a matching pattern, ascending (priority order)
+        """
+        for rule_id in sorted(self.candidates(text)):
+            if any(regex.search(text) for regex in self._regexes[rule_id]):
+                yield rule_id
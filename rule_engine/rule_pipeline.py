@@ -1,21 +1,169 @@
 # rule_engine/rule_pipeline.py
 
-from rule_engine.rule_loader import load_rules
+import hashlib
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from rule_engine.rule_loader import load_rules, validate_rules
+from rule_engine.regex_profiler import (
+    REGEX_SAFETY_MODE,
+    REGEX_PROFILE_CORPUS,
+    profile_rules,
+    quarantine_patterns,
+    load_corpus,
+)
 from rule_engine.rule_engine import RuleEngine
 from rule_engine.query_analyzer import should_skip_rules
+from utils.query_context import QueryContext
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_RULE_FILES = [
+    "rules/system_rules.yml",
+    "rules/safety_rules.yml",
+    "rules/static_info_rules.yml",
+    "rules/navigation_rules.yml",
+    "rules/single_token_business_rules.yml",
+]
+
+
+# Immutable snapshot of the serving rules. run() reads it once, so a reload
+# mid-request cannot mix two rule sets.
+RuleSet = namedtuple("RuleSet", ["engine", "version", "checksum", "loaded_at", "quarantined", "regex_warnings"])
+
+
+def rules_checksum(rule_files) -> str:
+    """Content hash of the rule files (short sha256)."""
+    digest = hashlib.sha256()
+    for path in rule_files:
+        with open(path, "rb") as f:
+            digest.update(path.encode())
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
 
 
 class RulePipeline:
     def __init__(self, rule_files: list[str]):
-        rules = load_rules(rule_files)
-        self.engine = RuleEngine(rules)
+        self.rule_files = list(rule_files)
+        self.last_error = None
+        # Recorded queries the regex profiler times next to its adversarial inputs
+        self.profile_corpus = load_corpus(REGEX_PROFILE_CORPUS)
+        self._reload_lock = threading.Lock()
+
+        # Startup keeps failing loudly: there are no old rules to fall back to
+        self._active = self._build(version=1)
+
+    @property
+    def engine(self) -> RuleEngine:
+        return self._active.engine
+
+    @property
+    def version(self) -> int:
+        return self._active.version
+
+    def run(self, query) -> dict:
+        context = QueryContext.of(query)
 
-    def run(self, query: str) -> dict:
         # 🚀 Pre-rule gate (most important)
-        if should_skip_rules(query):
+        if should_skip_rules(context):
             return {
                 "matched": False,
                 "reason": "SKIPPED_RULE_ENGINE"
             }
 
-        return self.engine.process(query)
+        return self._active.engine.process(context)
+
+    # -------------------- RELOAD --------------------
+    def _build(self, version: int) -> RuleSet:
+        checksum = rules_checksum(self.rule_files)
+        rules = load_rules(self.rule_files)
+
+        valid, error = validate_rules(rules)
+        if not valid:
+            raise ValueError(error)
+
+        rules, quarantined, regex_warnings = self._screen(rules)
+        return RuleSet(RuleEngine(rules), version, checksum, time.time(), quarantined, regex_warnings)
+
+    def _screen(self, rules):
+        """
+        Profiles every regex; unsafe ones are quarantined or fail the load,
+        patterns with only a warning keep serving and are logged.
+        """
+        if REGEX_SAFETY_MODE == "off":
+            return rules, [], []
+
+        flagged = profile_rules(rules, self.profile_corpus)
+        unsafe = [r for r in flagged if not r["safe"]]
+
+        regex_warnings = [
+            {"intent": r["intent"], "pattern": r["pattern"], "warning": r["warning"], "adversarial": r["adversarial"]}
+            for r in flagged if r["safe"]
+        ]
+        for r in regex_warnings:
+            logger.warning(
+                f"⚠️ Regex in rule '{r['intent']}' looks {r['warning']} "
+                f"({r['adversarial'].get('confirmed')} probes), keeping it: {r['pattern']!r}"
+            )
+
+        if not unsafe:
+            return rules, [], regex_warnings
+
+        if REGEX_SAFETY_MODE == "reject":
+            report = unsafe[0]
+            raise ValueError(f"Rule '{report['intent']}': unsafe regex {report['pattern']!r} ({report['reason']})")
+
+        rules = quarantine_patterns(rules, unsafe)
+        if not rules:
+            raise ValueError("No rules left after regex quarantine")
+
+        quarantined = [
+            {"intent": r["intent"], "pattern": r["pattern"], "reason": r["reason"], "adversarial": r["adversarial"]}
+            for r in unsafe
+        ]
+        return rules, quarantined, regex_warnings
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Re-parses and recompiles the rule files next to the serving engine,
+        then publishes the new one with a single reference swap. Requests are
+        never blocked; on any error the old rules keep serving.
+
+        Args:
+            force: Rebuild even if the file contents did not change
+
+        Returns:
+            bool: True if a new rule set was swapped in
+        """
+        # One reload at a time; run() never takes this lock
+        with self._reload_lock:
+            current = self._active
+            try:
+                if not force and rules_checksum(self.rule_files) == current.checksum:
+                    return False
+                rule_set = self._build(current.version + 1)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.error(f"✗ Rule reload failed, keeping v{current.version}: {self.last_error}")
+                return False
+
+            self._active = rule_set
+            self.last_error = None
+            logger.info(f"✓ Rules reloaded → v{rule_set.version} ({len(rule_set.engine.rules)} rules, {rule_set.checksum})")
+            return True
+
+    def describe(self) -> dict:
+        rule_set = self._active
+        return {
+            "version": rule_set.version,
+            "checksum": rule_set.checksum,
+            "loaded_at": rule_set.loaded_at,
+            "rule_count": len(rule_set.engine.rules),
+            "rule_files": self.rule_files,
+            "quarantined": rule_set.quarantined,
+            "regex_warnings": rule_set.regex_warnings,
+            "last_error": self.last_error,
+        }
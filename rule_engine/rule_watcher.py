@@ -0,0 +1,92 @@
+# rule_engine/rule_watcher.py
+#
+# Background polling of the rule files: when one changes (mtime / size), the
+# pipeline re-parses, validates and atomically swaps in a new RuleEngine.
+# Polling keeps the watcher dependency-free and works on any filesystem.
+
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- CONFIG --------------------
+RULES_WATCH_ENABLED = os.getenv("RULES_WATCH", "0") == "1"
+RULES_WATCH_INTERVAL = float(os.getenv("RULES_WATCH_INTERVAL", "2"))
+
+
+def _file_state(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class RuleWatcher:
+    """
+    Polls a RulePipeline's rule files every `interval` seconds and calls
+    pipeline.reload() when any of them changed. Reloads run on the watcher
+    thread; request threads keep using the serving engine meanwhile.
+    """
+
+    def __init__(self, pipeline, interval: float = 2.0):
+        self.pipeline = pipeline
+        self.interval = interval
+
+        self._states = self._snapshot()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # -------------------- LIFECYCLE --------------------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name="rule-watcher",
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stop.set()
+            thread.join(timeout)
+            self._thread = None
+
+    # -------------------- POLLING --------------------
+    def _snapshot(self) -> dict:
+        return {path: _file_state(path) for path in self.pipeline.rule_files}
+
+    def check(self) -> bool:
+        """
+        Reloads if any rule file changed since the last check.
+
+        Returns:
+            bool: True if a new rule set was swapped in
+        """
+        states = self._snapshot()
+        if states == self._states:
+            return False
+
+        self._states = states
+        return self.pipeline.reload()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Rule watcher check failed")
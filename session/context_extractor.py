@@ -1,5 +1,7 @@
 import re
 
+from utils.query_context import lowered
+
 NAME_PATTERNS = [
     r"\bmy name is (\w+)\b",
     r"\bi am (\w+)\b",
@@ -9,8 +11,8 @@ NAME_PATTERNS = [
 EMAIL_PATTERN = r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+"
 
 
-def extract_context(text: str) -> dict:
-    text = text.lower()
+def extract_context(text) -> dict:
+    text = lowered(text)
     data = {}
 
     for pattern in NAME_PATTERNS:
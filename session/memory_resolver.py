@@ -1,7 +1,9 @@
 import re
 
-def resolve_memory_question(query: str, session: dict):
-    text = query.lower()
+from utils.query_context import lowered
+
+def resolve_memory_question(query, session: dict):
+    text = lowered(query)
     slots = session.get("slots", {})
 
     if re.search(r"\bwhat is my name\b", text):
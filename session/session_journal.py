@@ -0,0 +1,355 @@
+# session/session_journal.py
+#
+# Crash-safe persistence for the in-memory session store. Session changes
+# are appended to a JSONL journal and made durable by a background thread
+# that writes everything queued since its last pass and fsyncs once (group
+# commit), so a turn never waits for the disk. Periodically the journal is
+# compacted into a snapshot of every live session; on startup the store is
+# rebuilt from the last snapshot plus the journal segments written after it.
+#
+# Record types (one JSON array per line):
+#   ["f", id, {fields}]                           session fields: flow, step, slots, intent, ...
+#   ["m", id, seq, role, text, source, ts]        history append (#seq of the session)
+#   ["d", id]                                     session deleted / expired / evicted
+#
+# Field records are absolute and message records carry their sequence
+# number, so replaying a record that is already in the snapshot is a no-op.
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from session.session_state import Session
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- CONFIG --------------------
+# Journal directory; journaling is off when unset
+SESSION_JOURNAL_DIR = os.getenv("SESSION_JOURNAL_DIR")
+SESSION_JOURNAL_FSYNC_MS = float(os.getenv("SESSION_JOURNAL_FSYNC_MS", "10"))
+# A snapshot is taken after this many seconds or journal records, whichever comes first
+SESSION_SNAPSHOT_INTERVAL = float(os.getenv("SESSION_SNAPSHOT_INTERVAL", "300"))
+SESSION_SNAPSHOT_RECORDS = int(os.getenv("SESSION_SNAPSHOT_RECORDS", "500000"))
+
+SNAPSHOT_FILE = "sessions.snapshot"
+_SEGMENT_PATTERN = "journal-*.log"
+
+
+_dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+def _fsync_dir(directory: str):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SessionJournal:
+    """
+    Append-only session journal with group-commit fsync and compacted
+    snapshots. Attached to one SessionManager, which calls touch(),
+    record_message() and record_delete() as sessions change.
+
+    Files in `directory`:
+        journal-<n>.log     journal segments, replayed in order
+        sessions.snapshot   header {"segment": n, ...} then one session per
+                            line; segments before n are already folded in
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        fsync_interval: float = SESSION_JOURNAL_FSYNC_MS / 1000.0,
+        snapshot_interval: float = SESSION_SNAPSHOT_INTERVAL,
+        snapshot_records: int = SESSION_SNAPSHOT_RECORDS
+    ):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_records = snapshot_records
+        os.makedirs(directory, exist_ok=True)
+
+        self.manager = None
+        self._lock = threading.Lock()
+        # Re-entrant: snapshot() commits while holding it
+        self._commit_lock = threading.RLock()
+        self._records = []
+        self._touched = {}
+        # Hash of the last journaled fields per session, so unchanged sessions are skipped
+        self._field_hashes = {}
+
+        self._segment = None
+        self._file = None
+        self._thread = None
+        # Separate from the commit lock: request threads start the thread while holding a session lock
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pid = None
+
+        self.commits = 0
+        self.records_written = 0
+        self.bytes_written = 0
+        self.snapshots = 0
+        self._records_since_snapshot = 0
+        self._last_snapshot = time.time()
+
+    # -------------------- RECORDING --------------------
+    def attach(self, manager):
+        self.manager = manager
+
+    def touch(self, session_id: str, session: Session):
+        """Queues the session's fields; written at the next commit if they changed."""
+        with self._lock:
+            self._touched[session_id] = session
+        self._ensure_thread()
+
+    def record_message(self, session_id: str, session: Session, role: str, text: str, source, timestamp: float):
+        record = ("m", session_id, session.history_total, role, text, source, timestamp)
+        with self._lock:
+            self._records.append(record)
+            self._touched[session_id] = session
+        self._ensure_thread()
+
+    def record_delete(self, session_id: str):
+        with self._lock:
+            self._records.append(("d", session_id))
+            self._touched.pop(session_id, None)
+            self._field_hashes.pop(session_id, None)
+        self._ensure_thread()
+
+    # -------------------- COMMIT --------------------
+    def _open_segment(self, segment: int):
+        if self._file is not None:
+            self._file.close()
+        self._segment = segment
+        self._file = open(os.path.join(self.directory, f"journal-{segment:08d}.log"), "a", encoding="utf-8")
+        _fsync_dir(self.directory)
+
+    def _field_lines(self, touched: dict) -> list:
+        lines = []
+        for session_id, session in touched.items():
+            # Read under the session's lock so slots are not changing mid-copy
+            with self.manager.lock(session_id):
+                fields = _dumps(session.fields_state())
+            digest = hash(fields)
+            if self._field_hashes.get(session_id) == digest:
+                continue
+            self._field_hashes[session_id] = digest
+            lines.append(f'["f",{_dumps(session_id)},{fields}]\n')
+        return lines
+
+    def commit(self) -> int:
+        """
+        Writes everything queued and fsyncs once.
+
+        Returns:
+            int: number of records written
+        """
+        with self._commit_lock:
+            with self._lock:
+                records, self._records = self._records, []
+                touched, self._touched = self._touched, {}
+
+            # Messages and deletes first (in call order), then absolute field state
+            lines = [_dumps(record) + "\n" for record in records]
+            lines.extend(self._field_lines(touched))
+            if not lines:
+                return 0
+
+            if self._file is None:
+                self._open_segment(self._next_segment())
+
+            data = "".join(lines)
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+            self.commits += 1
+            self.records_written += len(lines)
+            self.bytes_written += len(data)
+            self._records_since_snapshot += len(lines)
+            return len(lines)
+
+    # -------------------- SNAPSHOTS --------------------
+    def snapshot(self) -> dict:
+        """
+        Compacts the journal: starts a new segment, writes every live
+        session to a new snapshot (temp file, fsync, atomic rename) and
+        removes the segments the snapshot covers.
+        """
+        started = time.perf_counter()
+        with self._commit_lock:
+            self.commit()
+            segment = self._next_segment() if self._segment is None else self._segment + 1
+            self._open_segment(segment)
+
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        tmp_path = path + ".tmp"
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(_dumps({"segment": segment, "created_at": time.time()}) + "\n")
+            for states in self.manager.iter_session_states():
+                f.write("".join(_dumps([session_id, state]) + "\n" for session_id, state in states))
+                count += len(states)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        _fsync_dir(self.directory)
+
+        for old in self._segments():
+            if old[0] < segment:
+                os.remove(old[1])
+
+        self.snapshots += 1
+        self._records_since_snapshot = 0
+        self._last_snapshot = time.time()
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        logger.info(f"✓ Session snapshot: {count} sessions in {elapsed_ms:.0f} ms")
+        return {"sessions": count, "segment": segment, "ms": elapsed_ms}
+
+    def _snapshot_due(self) -> bool:
+        return (
+            self._records_since_snapshot >= self.snapshot_records
+            or (self._records_since_snapshot and time.time() - self._last_snapshot >= self.snapshot_interval)
+        )
+
+    # -------------------- RECOVERY --------------------
+    def _segments(self) -> list:
+        segments = []
+        for path in glob.glob(os.path.join(self.directory, _SEGMENT_PATTERN)):
+            number = os.path.basename(path)[len("journal-"):-len(".log")]
+            if number.isdigit():
+                segments.append((int(number), path))
+        return sorted(segments)
+
+    def _next_segment(self) -> int:
+        segments = self._segments()
+        return segments[-1][0] + 1 if segments else 1
+
+    @staticmethod
+    def _read_lines(path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Torn write at the tail of a crashed segment
+                    logger.warning(f"⚠️ Skipping unreadable journal line in {path}")
+
+    def recover(self, history_size: int) -> tuple:
+        """
+        Rebuilds the sessions from the snapshot and the journal tail.
+
+        Returns:
+            tuple: (dict session_id -> Session, stats dict)
+        """
+        started = time.perf_counter()
+        sessions = {}
+        first_segment = 0
+        replayed = 0
+
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(path):
+            lines = self._read_lines(path)
+            header = next(lines, None) or {}
+            first_segment = header.get("segment", 0)
+            for session_id, state in lines:
+                sessions[session_id] = Session.from_state(state)
+
+        from_snapshot = len(sessions)
+        for number, segment_path in self._segments():
+            if number < first_segment:
+                continue
+            for record in self._read_lines(segment_path):
+                self._apply(sessions, record, history_size)
+                replayed += 1
+
+        stats = {
+            "sessions": len(sessions),
+            "from_snapshot": from_snapshot,
+            "replayed_records": replayed,
+            "ms": (time.perf_counter() - started) * 1000.0,
+        }
+        return sessions, stats
+
+    @staticmethod
+    def _apply(sessions: dict, record: list, history_size: int):
+        op, session_id = record[0], record[1]
+
+        if op == "d":
+            sessions.pop(session_id, None)
+            return
+
+        session = sessions.get(session_id)
+        if op == "f":
+            fields = record[2]
+            if session is None:
+                session = sessions[session_id] = Session(fields.get("created_at") or time.time())
+            session.apply_fields(fields)
+        elif op == "m":
+            _, _, seq, role, text, source, timestamp = record
+            if session is None:
+                session = sessions[session_id] = Session(timestamp)
+            # Already part of the snapshot (or replayed twice)
+            if seq <= session.history_total:
+                return
+            session.add_message(role, text, source, timestamp, history_size)
+            session.last_active = max(session.last_active, timestamp)
+
+    # -------------------- LIFECYCLE --------------------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def _ensure_thread(self):
+        if not self.running and not self._stop.is_set():
+            self.start()
+
+    def start(self):
+        with self._start_lock:
+            if self.running:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run,
+                name="session-journal",
+                daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                self.commit()
+                if self._snapshot_due():
+                    self.snapshot()
+            except Exception:
+                logger.exception("Session journal commit failed")
+
+    def close(self):
+        """Stops the commit thread and makes everything queued durable."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(1.0)
+        self.commit()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def describe(self) -> dict:
+        return {
+            "directory": self.directory,
+            "segment": self._segment,
+            "commits": self.commits,
+            "records_written": self.records_written,
+            "bytes_written": self.bytes_written,
+            "snapshots": self.snapshots,
+            "pending_records": len(self._records),
+        }
@@ -1,73 +1,664 @@
-# session/session_manager.py
-
-import time
-
-class SessionManager:
-    def __init__(self, session_timeout: int = 600):
-        self.session_timeout = session_timeout
-        self.sessions = {}
-
-    def get_or_create_session(self, session_id: str) -> dict:
-        session = self.sessions.get(session_id)
-
-        if not session:
-            session = {
-                "active_flow": None,
-                "pending_flow": None,
-                "last_completed_flow": None,   # ✅ KEY
-                "current_step": 0,
-                "slots": {},
-                "last_intent": None,
-                "history": [],
-                "created_at": time.time(),
-                "last_active": time.time()
-            }
-            self.sessions[session_id] = session
-            return session
-
-        if time.time() - session["last_active"] > self.session_timeout:
-            self.delete_session(session_id)
-            return self.get_or_create_session(session_id)
-
-        return session
-
-    def delete_session(self, session_id: str):
-        self.sessions.pop(session_id, None)
-
-    def update_intent(self, session_id: str, intent: str | None):
-        session = self.sessions.get(session_id)
-        if session:
-            session["last_intent"] = intent
-            session["last_active"] = time.time()
-
-    def add_message(self, session_id: str, role: str, text: str, source: str | None = None):
-        session = self.sessions.get(session_id)
-        if not session:
-            return
-
-        session["history"].append({
-            "role": role,
-            "text": text,
-            "source": source,
-            "timestamp": time.time()
-        })
-        session["last_active"] = time.time()
-
-    def get_history(self, session_id: str):
-        session = self.sessions.get(session_id)
-        return session["history"] if session else []
-
-    def get_session_snapshot(self, session_id: str):
-        session = self.sessions.get(session_id)
-        if not session:
-            return None
-
-        return {
-            "active_flow": session["active_flow"],
-            "pending_flow": session["pending_flow"],
-            "last_completed_flow": session["last_completed_flow"],
-            "current_step": session["current_step"],
-            "slots": session["slots"],
-            "last_intent": session["last_intent"],
-            "history_length": len(session["history"]),
-        }
+# session/session_manager.py
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from session.session_state import SESSION_HISTORY_SIZE, Session
+from session.session_store import MemorySessionStore, new_version
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- CONFIG --------------------
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "100000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024)))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "30"))
+SESSION_LOCK_STRIPES = int(os.getenv("SESSION_LOCK_STRIPES", "64"))
+# History paging (get_history_page) and export chunks (iter_history)
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", "200"))
+HISTORY_EXPORT_CHUNK = int(os.getenv("HISTORY_EXPORT_CHUNK", "100"))
+
+# Approximate footprint used for the byte budget (slotted Session / ring slot)
+_SESSION_BASE_BYTES = 500
+_MESSAGE_BASE_BYTES = 80
+
+_COUNTERS = ("evicted", "evicted_bytes", "expired_on_access", "expired_by_sweeper", "cache_hits", "store_loads")
+
+
+class _Stripe:
+    """
+    One lock and the sessions hashed to it. Everything a session operation
+    touches lives here, so operations on different stripes never share a lock.
+    """
+
+    __slots__ = ("lock", "sessions", "sizes", "bytes", "versions", "dirty", "flushing") + _COUNTERS
+
+    def __init__(self):
+        # Re-entrant: a turn holding the lock still calls the manager's methods
+        self.lock = threading.RLock()
+        # Last-access order: LRU eviction and expiry pop from the front
+        self.sessions = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+        # Write-behind state (shared stores only)
+        self.versions = {}
+        self.dirty = {}
+        self.flushing = {}
+        for counter in _COUNTERS:
+            setattr(self, counter, 0)
+
+
+class SessionManager:
+    """
+    In-memory session store bounded by session count and an approximate
+    byte budget.
+
+    Sessions are spread over `stripes` lock stripes by hash of the session
+    id. Each stripe keeps its sessions in last-access order (every access
+    that moves a session to the end also sets its last_active), so it
+    doubles as the time-ordered index: LRU eviction pops from the front,
+    and the sweeper expires idle sessions from the front until it meets one
+    that is still live, in O(expired). The count and byte limits are split
+    evenly across stripes.
+
+    Request handlers that read and then change a session do it inside
+    `with session_manager.session(session_id) as session:`, which holds the
+    session's stripe lock for the whole read-modify-write.
+
+    With a shared `store` (see session/session_store.py) the stripes are a
+    read cache: a cached session is reused while its version matches the
+    stored one, and changed sessions are written back in batches by a
+    background flusher after at most `flush_interval` seconds. Write-backs
+    are compare-and-set on the cached version; when another worker changed
+    the session first, the local copy is dropped and reloaded on next access.
+
+    With a `journal` (see session/session_journal.py) every change is also
+    appended to a crash-safe log, and recover() rebuilds the sessions from
+    it after a restart.
+    """
+
+    def __init__(
+        self,
+        session_timeout: int = 600,
+        max_sessions: int | None = None,
+        max_bytes: int | None = None,
+        sweep_interval: float | None = None,
+        history_size: int = SESSION_HISTORY_SIZE,
+        store=None,
+        flush_interval: float = 0.005,
+        stripes: int = SESSION_LOCK_STRIPES,
+        journal=None
+    ):
+        self.session_timeout = session_timeout
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.history_size = history_size
+        self.store = store or MemorySessionStore()
+        self.flush_interval = flush_interval
+        self.journal = journal
+        if journal is not None:
+            journal.attach(self)
+
+        self._stripes = [_Stripe() for _ in range(max(1, stripes))]
+        count = len(self._stripes)
+        self._stripe_max_sessions = None if max_sessions is None else max(1, -(-max_sessions // count))
+        self._stripe_max_bytes = None if max_bytes is None else max(1, -(-max_bytes // count))
+
+        self._sweeper = None
+        self._sweeper_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self._flusher = None
+        self._flush_lock = threading.Lock()
+        self._pending = threading.Event()
+        self._closing = False
+        if self.store.shared or journal is not None:
+            atexit.register(self.close)
+
+        self.sweeps = 0
+        self.flushed = 0
+        self.write_conflicts = 0
+
+    def _stripe(self, session_id: str) -> _Stripe:
+        return self._stripes[hash(session_id) % len(self._stripes)]
+
+    # -------------------- SESSIONS --------------------
+    def get_or_create_session(self, session_id: str) -> Session:
+        self._ensure_sweeper()
+
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            session = self._lookup(stripe, session_id)
+
+            if session and time.time() - session.last_active > self.session_timeout:
+                self._drop(stripe, session_id)
+                stripe.expired_on_access += 1
+                session = None
+
+            if not session:
+                # Not written back until it is first changed, so a worker
+                # that only looks at a session cannot race another worker's
+                # first write of it with an empty copy
+                session = Session(time.time())
+                stripe.sessions[session_id] = session
+                self._resize(stripe, session_id, _SESSION_BASE_BYTES)
+                self._enforce_limits(stripe)
+                return session
+
+            # An access: last_active and the stripe order move together, so
+            # the sweeper can stop at the first live session. Reads are not
+            # written back: changes go through session(), save(),
+            # update_intent() or add_message()
+            session.last_active = time.time()
+            stripe.sessions.move_to_end(session_id)
+            return session
+
+    @contextmanager
+    def session(self, session_id: str):
+        """
+        Read-modify-write turn on one session:
+
+            with session_manager.session(session_id) as session:
+                session["current_step"] += 1
+
+        Holds the session's stripe lock until the block exits, so concurrent
+        requests for the same session apply their changes one after the
+        other. Keep slow work (model calls, email, webhooks) outside the block.
+        """
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            session = self.get_or_create_session(session_id)
+            try:
+                yield session
+            finally:
+                self._mark_dirty(stripe, session_id, session)
+
+    def lock(self, session_id: str):
+        """The (re-entrant) lock guarding `session_id`."""
+        return self._stripe(session_id).lock
+
+    def delete_session(self, session_id: str):
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            self._drop(stripe, session_id)
+
+    def save(self, session_id: str):
+        """
+        Schedules a write-back of a session changed in place
+        (session["current_step"] += 1, session["slots"][k] = v, ...).
+        No-op for the in-memory store.
+        """
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            session = stripe.sessions.get(session_id)
+            if session:
+                self._mark_dirty(stripe, session_id, session)
+
+    def update_intent(self, session_id: str, intent: str | None):
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            session = self._lookup(stripe, session_id)
+            if session:
+                session.last_intent = intent
+                session.last_active = time.time()
+                stripe.sessions.move_to_end(session_id)
+                self._mark_dirty(stripe, session_id, session)
+
+    def add_message(self, session_id: str, role: str, text: str, source: str | None = None):
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            session = self._lookup(stripe, session_id)
+            if not session:
+                return
+
+            # Nudged past the previous message's timestamp, if needed, to stay a unique cursor
+            now = session.add_message(role, text, source, time.time(), self.history_size)
+            session.last_active = now
+            if self.journal is not None:
+                self.journal.record_message(session_id, session, role, text, source, now)
+            stripe.sessions.move_to_end(session_id)
+
+            self._resize(stripe, session_id, self._session_bytes(session))
+            self._mark_dirty(stripe, session_id, session)
+            self._enforce_limits(stripe)
+
+    def get_history(self, session_id: str) -> list:
+        """
+        Message dicts ({"role", "text", "source", "timestamp"}), oldest
+        first; at most `history_size` of them.
+        """
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            session = self._lookup(stripe, session_id)
+            return session.history_list() if session else []
+
+    def get_history_page(self, session_id: str, limit: int = HISTORY_PAGE_SIZE, before: float | None = None) -> dict:
+        """
+        Cursor-paged history, newest page first. Only the page is copied.
+        Pass the returned `next_before` as `before` for the next older page.
+
+        Returns:
+            dict: {"messages" (oldest first), "has_more", "next_before",
+                   "dropped" (messages that fell out of the ring buffer)}
+        """
+        limit = max(1, min(limit, HISTORY_PAGE_MAX))
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            session = self._lookup(stripe, session_id)
+            if not session or session.history is None:
+                return {"messages": [], "has_more": False, "next_before": None, "dropped": 0}
+            messages, has_more = session.history.before(before, limit)
+            dropped = session.history.overflow
+
+        return {
+            "messages": messages,
+            "has_more": has_more,
+            "next_before": messages[0]["timestamp"] if has_more else None,
+            "dropped": dropped,
+        }
+
+    def iter_history(self, session_id: str, chunk: int = HISTORY_EXPORT_CHUNK):
+        """
+        Yields the session's messages oldest first, as of the call. Copies
+        `chunk` messages at a time under the stripe lock and yields them
+        outside it, so a slow consumer never holds the lock. Messages that
+        fall out of the ring buffer while iterating are skipped.
+        """
+        stripe = self._stripe(session_id)
+        after = None
+        until = None
+
+        while True:
+            with stripe.lock:
+                session = self._lookup(stripe, session_id)
+                if not session or session.history is None:
+                    return
+                history = session.history
+                if until is None:
+                    if not len(history):
+                        return
+                    until = history.timestamp(len(history) - 1)
+                messages = history.after(after, chunk, until)
+
+            if not messages:
+                return
+            yield from messages
+            after = messages[-1]["timestamp"]
+
+    def get_session_snapshot(self, session_id: str):
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            session = self._lookup(stripe, session_id)
+            if not session:
+                return None
+
+            return {
+                "active_flow": session.active_flow,
+                "pending_flow": session.pending_flow,
+                "last_completed_flow": session.last_completed_flow,
+                "current_step": session.current_step,
+                "slots": dict(session.slots),
+                "last_intent": session.last_intent,
+                "history_length": session.history_length,
+                "history_dropped": session.history_overflow,
+            }
+
+    # -------------------- STORE --------------------
+    def _lookup(self, stripe: _Stripe, session_id: str):
+        """
+        Cached session, revalidated against a shared store; loads it from
+        the store on a miss or when another worker changed it.
+        """
+        session = stripe.sessions.get(session_id)
+        if not self.store.shared:
+            return session
+
+        if session is None:
+            # Evicted before its write-back: the pending copy is the newest
+            session = stripe.dirty.get(session_id) or stripe.flushing.get(session_id)
+            if session is not None:
+                stripe.sessions[session_id] = session
+                self._resize(stripe, session_id, self._session_bytes(session))
+                self._enforce_limits(stripe)
+                return session
+
+        if session is not None:
+            # Local changes not yet written are newer than the store
+            if session_id in stripe.dirty or session_id in stripe.flushing:
+                return session
+            # Both None: created here and not written yet, nor by anyone else
+            version = self.store.version(session_id)
+            if version == stripe.versions.get(session_id):
+                stripe.cache_hits += 1
+                return session
+            self._remove(stripe, session_id)
+
+        loaded = self.store.load(session_id)
+        if loaded is None:
+            return None
+
+        version, session = loaded
+        stripe.sessions[session_id] = session
+        stripe.versions[session_id] = version
+        self._resize(stripe, session_id, self._session_bytes(session))
+        stripe.store_loads += 1
+        self._enforce_limits(stripe)
+        return session
+
+    def _mark_dirty(self, stripe: _Stripe, session_id: str, session: Session):
+        if self.journal is not None:
+            self.journal.touch(session_id, session)
+        if not self.store.shared:
+            return
+        stripe.dirty[session_id] = session
+        self._ensure_flusher()
+        self._pending.set()
+
+    def _drop(self, stripe: _Stripe, session_id: str):
+        self._remove(stripe, session_id)
+        stripe.dirty.pop(session_id, None)
+        self.store.delete(session_id)
+        if self.journal is not None:
+            self.journal.record_delete(session_id)
+
+    def flush(self) -> int:
+        """
+        Writes all changed sessions to the store in one batch.
+
+        Returns:
+            int: number of sessions written
+        """
+        if not self.store.shared:
+            return 0
+
+        with self._flush_lock:
+            batches = []
+            rows = []
+            # Stripe by stripe, so a flush never holds more than one lock
+            for stripe in self._stripes:
+                with stripe.lock:
+                    if not stripe.dirty:
+                        continue
+                    batch, stripe.dirty = stripe.dirty, {}
+                    stripe.flushing = batch
+                    versions = {session_id: new_version() for session_id in batch}
+                    # Compare-and-set on the version this copy was loaded / last written with
+                    rows.extend(
+                        (session_id, stripe.versions.get(session_id), versions[session_id],
+                         session.last_active, session.to_state())
+                        for session_id, session in batch.items()
+                    )
+                batches.append((stripe, batch, versions))
+
+            if not rows:
+                return 0
+
+            try:
+                conflicts = set(self.store.save_many(rows))
+            except Exception:
+                for stripe, batch, _ in batches:
+                    with stripe.lock:
+                        for session_id, session in batch.items():
+                            stripe.dirty.setdefault(session_id, session)
+                        stripe.flushing = {}
+                raise
+
+            for stripe, batch, versions in batches:
+                with stripe.lock:
+                    for session_id, version in versions.items():
+                        if stripe.sessions.get(session_id) is not batch[session_id]:
+                            # Evicted or replaced while flushing
+                            if session_id not in stripe.sessions:
+                                stripe.versions.pop(session_id, None)
+                        elif session_id in conflicts:
+                            # Another worker changed or deleted it first: reload instead of overwriting
+                            self._remove(stripe, session_id)
+                            stripe.dirty.pop(session_id, None)
+                        else:
+                            stripe.versions[session_id] = version
+                    stripe.flushing = {}
+
+            if conflicts:
+                self.write_conflicts += len(conflicts)
+                logger.warning(f"⚠️ {len(conflicts)} session writes lost to a concurrent update, reloading")
+            written = len(rows) - len(conflicts)
+            self.flushed += written
+            return written
+
+    @property
+    def flusher_running(self) -> bool:
+        return self._flusher is not None and self._flusher.is_alive()
+
+    def _ensure_flusher(self):
+        # Started on first write, so it also comes back in forked workers
+        if self.flusher_running or self._closing:
+            return
+        with self._sweeper_lock:
+            if self.flusher_running:
+                return
+            self._flusher = threading.Thread(
+                target=self._run_flusher,
+                name="session-flusher",
+                daemon=True
+            )
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while not self._closing:
+            self._pending.wait()
+            # Collect the writes of concurrent turns into one transaction
+            time.sleep(self.flush_interval)
+            self._pending.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Session store flush failed")
+
+    def close(self):
+        """Stops the flusher and writes any pending changes."""
+        self._closing = True
+        self._pending.set()
+        thread = self._flusher
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(1.0)
+        self.flush()
+        if self.journal is not None:
+            self.journal.close()
+
+    # -------------------- JOURNAL --------------------
+    def iter_session_states(self):
+        """Yields, stripe by stripe, lists of (session_id, state) pairs (for snapshots)."""
+        for stripe in self._stripes:
+            with stripe.lock:
+                states = [(session_id, session.to_state()) for session_id, session in stripe.sessions.items()]
+            if states:
+                yield states
+
+    def recover(self) -> dict:
+        """
+        Loads the sessions saved in the journal (snapshot + tail), skipping
+        those that expired while the process was down.
+
+        Returns:
+            dict: recovered / expired session counts and recovery time (ms)
+        """
+        if self.journal is None:
+            return {"sessions": 0}
+
+        sessions, stats = self.journal.recover(self.history_size)
+        cutoff = time.time() - self.session_timeout
+        live = sorted(
+            ((session_id, session) for session_id, session in sessions.items() if session.last_active > cutoff),
+            key=lambda item: item[1].last_active
+        )
+
+        for session_id, session in live:
+            stripe = self._stripe(session_id)
+            with stripe.lock:
+                stripe.sessions[session_id] = session
+                self._resize(stripe, session_id, self._session_bytes(session))
+                self._enforce_limits(stripe)
+
+        stats["expired"] = len(sessions) - len(live)
+        stats["sessions"] = len(live)
+        logger.info(
+            f"✓ Recovered {stats['sessions']} sessions ({stats['from_snapshot']} from snapshot, "
+            f"{stats['replayed_records']} journal records, {stats['expired']} expired) in {stats['ms']:.0f} ms"
+        )
+        return stats
+
+    # -------------------- BOUNDS --------------------
+    @staticmethod
+    def _session_bytes(session: Session) -> int:
+        history = session.history
+        if history is None:
+            return _SESSION_BASE_BYTES
+        return _SESSION_BASE_BYTES + len(history) * _MESSAGE_BASE_BYTES + history.text_bytes
+
+    @staticmethod
+    def _remove(stripe: _Stripe, session_id: str):
+        stripe.sessions.pop(session_id, None)
+        stripe.versions.pop(session_id, None)
+        stripe.bytes -= stripe.sizes.pop(session_id, 0)
+
+    @staticmethod
+    def _resize(stripe: _Stripe, session_id: str, size: int):
+        stripe.bytes += size - stripe.sizes.get(session_id, 0)
+        stripe.sizes[session_id] = size
+
+    def _enforce_limits(self, stripe: _Stripe):
+        max_sessions, max_bytes = self._stripe_max_sessions, self._stripe_max_bytes
+
+        # The most recently used session (last) is never evicted
+        while len(stripe.sessions) > 1 and (
+            (max_sessions is not None and len(stripe.sessions) > max_sessions)
+            or (max_bytes is not None and stripe.bytes > max_bytes)
+        ):
+            # Evicted sessions with pending changes are still written back
+            # (compare-and-set on the version they were loaded with)
+            session_id, _ = stripe.sessions.popitem(last=False)
+            if session_id not in stripe.dirty and session_id not in stripe.flushing:
+                stripe.versions.pop(session_id, None)
+            size = stripe.sizes.pop(session_id, 0)
+            stripe.bytes -= size
+            stripe.evicted += 1
+            stripe.evicted_bytes += size
+            # With a shared store only the local cache copy goes away
+            if self.journal is not None and not self.store.shared:
+                self.journal.record_delete(session_id)
+
+    def expire_idle(self, now: float | None = None) -> int:
+        """
+        Removes sessions idle for longer than the timeout, oldest first,
+        stopping at the first live one of each stripe.
+
+        Returns:
+            int: number of sessions expired
+        """
+        cutoff = (now or time.time()) - self.session_timeout
+        expired = 0
+
+        for stripe in self._stripes:
+            with stripe.lock:
+                count = 0
+                while stripe.sessions:
+                    session_id, session = next(iter(stripe.sessions.items()))
+                    if session.last_active > cutoff:
+                        break
+                    self._remove(stripe, session_id)
+                    stripe.dirty.pop(session_id, None)
+                    # A shared store expires its own rows (store.expire below)
+                    if self.journal is not None and not self.store.shared:
+                        self.journal.record_delete(session_id)
+                    count += 1
+                stripe.expired_by_sweeper += count
+            expired += count
+
+        self.sweeps += 1
+        if self.store.shared:
+            self.store.expire(cutoff)
+        return expired
+
+    # -------------------- SWEEPER --------------------
+    @property
+    def sweeper_running(self) -> bool:
+        return self._sweeper is not None and self._sweeper.is_alive()
+
+    def _ensure_sweeper(self):
+        # Started on first use, so it also comes back in forked workers
+        if self.sweep_interval and not self.sweeper_running:
+            self.start_sweeper()
+
+    def start_sweeper(self):
+        with self._sweeper_lock:
+            if self.sweeper_running:
+                return
+            self._stop.clear()
+            self._sweeper = threading.Thread(
+                target=self._run_sweeper,
+                name="session-sweeper",
+                daemon=True
+            )
+            self._sweeper.start()
+
+    def stop_sweeper(self, timeout: float | None = None):
+        with self._sweeper_lock:
+            thread = self._sweeper
+            if thread is None:
+                return
+            self._stop.set()
+            thread.join(timeout)
+            self._sweeper = None
+
+    def _run_sweeper(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.expire_idle()
+            except Exception:
+                logger.exception("Session sweep failed")
+
+    # -------------------- STATS --------------------
+    def _total(self, counter: str) -> int:
+        return sum(getattr(stripe, counter) for stripe in self._stripes)
+
+    @property
+    def evicted_count(self) -> int:
+        return self._total("evicted")
+
+    @property
+    def expired_on_access(self) -> int:
+        return self._total("expired_on_access")
+
+    @property
+    def expired_by_sweeper(self) -> int:
+        return self._total("expired_by_sweeper")
+
+    def stats(self) -> dict:
+        # Summed without locking: a stats read must not stall request threads
+        return {
+            "sessions": sum(len(stripe.sessions) for stripe in self._stripes),
+            "approx_bytes": self._total("bytes"),
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "lock_stripes": len(self._stripes),
+            "evicted": self.evicted_count,
+            "evicted_bytes": self._total("evicted_bytes"),
+            "expired_on_access": self.expired_on_access,
+            "expired_by_sweeper": self.expired_by_sweeper,
+            "sweeps": self.sweeps,
+            "sweeper_running": self.sweeper_running,
+            "store": self.store.describe(),
+            "cache_hits": self._total("cache_hits"),
+            "store_loads": self._total("store_loads"),
+            "pending_writes": sum(len(stripe.dirty) for stripe in self._stripes),
+            "flushed": self.flushed,
+            "write_conflicts": self.write_conflicts,
+            "journal": self.journal.describe() if self.journal is not None else None,
+        }
@@ -0,0 +1,305 @@
+# session/session_state.py
+#
+# Compact in-memory session representation. A Session is a __slots__ object
+# that still behaves like the old session dict (session["slots"],
+# session.get("active_flow"), ...), and its history is a fixed-capacity ring
+# buffer with array-backed timestamps and interned role/source codes.
+
+import os
+import sys
+from array import array
+
+
+SESSION_HISTORY_SIZE = int(os.getenv("SESSION_HISTORY_SIZE", "50"))
+
+# Minimum gap between the timestamps of consecutive messages of a session
+_TIMESTAMP_STEP = 1e-6
+
+
+# -------------------- LABELS --------------------
+# Roles and sources come from a tiny vocabulary ("user", "bot", "RULE", ...);
+# each is stored as a one-byte code. Code 0 is None.
+_LABELS = [None, "user", "bot", "RULE", "ML", "LLM", "FLOW", "SYSTEM", "MEMORY"]
+_LABEL_CODES = {label: code for code, label in enumerate(_LABELS)}
+
+
+def label_code(label) -> int:
+    code = _LABEL_CODES.get(label)
+    if code is None:
+        if len(_LABELS) >= 256:
+            raise ValueError(f"Too many distinct roles/sources, cannot intern {label!r}")
+        code = len(_LABELS)
+        _LABELS.append(sys.intern(label) if isinstance(label, str) else label)
+        _LABEL_CODES[label] = code
+    return code
+
+
+def label_of(code: int):
+    return _LABELS[code]
+
+
+# -------------------- HISTORY --------------------
+class MessageHistory:
+    """
+    Fixed-capacity ring buffer of chat messages. Once full, each append
+    overwrites the oldest message and bumps `overflow`.
+
+    Iteration and indexing yield message dicts
+    ({"role", "text", "source", "timestamp"}), oldest first.
+
+    Timestamps are strictly increasing (an append that would repeat or go
+    back in time is moved just past the previous message), so a timestamp
+    is an exact paging cursor.
+    """
+
+    __slots__ = ("capacity", "overflow", "text_bytes", "_texts", "_roles", "_sources", "_timestamps", "_start", "_size")
+
+    def __init__(self, capacity: int = SESSION_HISTORY_SIZE):
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        self.capacity = capacity
+        self.overflow = 0
+        self.text_bytes = 0
+        # Grown up to capacity, then reused in place
+        self._texts = []
+        self._roles = array("B")
+        self._sources = array("B")
+        self._timestamps = array("d")
+        self._start = 0
+        self._size = 0
+
+    def append(self, role: str, text: str, source, timestamp: float) -> float:
+        """Returns the timestamp stored for the message."""
+        role_code, source_code = label_code(role), label_code(source)
+        self.text_bytes += len(text or "")
+        if self._size:
+            timestamp = max(timestamp, self.timestamp(self._size - 1) + _TIMESTAMP_STEP)
+
+        if self._size < self.capacity:
+            self._texts.append(text)
+            self._roles.append(role_code)
+            self._sources.append(source_code)
+            self._timestamps.append(timestamp)
+            self._size += 1
+            return timestamp
+
+        idx = self._start
+        self.text_bytes -= len(self._texts[idx] or "")
+        self._texts[idx] = text
+        self._roles[idx] = role_code
+        self._sources[idx] = source_code
+        self._timestamps[idx] = timestamp
+        self._start = (idx + 1) % self.capacity
+        self.overflow += 1
+        return timestamp
+
+    def _slot(self, i: int) -> int:
+        return (self._start + i) % self.capacity
+
+    def message(self, i: int) -> dict:
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("history index out of range")
+        idx = self._slot(i)
+        return {
+            "role": _LABELS[self._roles[idx]],
+            "text": self._texts[idx],
+            "source": _LABELS[self._sources[idx]],
+            "timestamp": self._timestamps[idx],
+        }
+
+    def timestamp(self, i: int) -> float:
+        return self._timestamps[self._slot(i)]
+
+    def _bisect(self, timestamp: float, after: bool) -> int:
+        """Index of the first message newer than (after) / not older than `timestamp`."""
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            ts = self.timestamp(mid)
+            if ts < timestamp or (after and ts == timestamp):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def before(self, timestamp: float | None, limit: int) -> tuple:
+        """
+        Up to `limit` newest messages older than `timestamp` (all retained
+        messages when None), oldest first.
+
+        Returns:
+            tuple: (message dicts, True if older messages remain)
+        """
+        end = self._size if timestamp is None else self._bisect(timestamp, after=False)
+        start = max(0, end - limit)
+        return [self.message(i) for i in range(start, end)], start > 0
+
+    def after(self, timestamp: float | None, limit: int, until: float | None = None) -> list:
+        """Up to `limit` oldest messages newer than `timestamp` and not newer than `until`."""
+        start = 0 if timestamp is None else self._bisect(timestamp, after=True)
+        end = min(self._size, start + limit)
+        if until is not None:
+            end = min(end, self._bisect(until, after=True))
+        return [self.message(i) for i in range(start, end)]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.message(j) for j in range(*i.indices(self._size))]
+        return self.message(i)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self.message(i)
+
+    def to_list(self) -> list:
+        return list(self)
+
+    def to_state(self) -> dict:
+        rows = []
+        for i in range(self._size):
+            idx = self._slot(i)
+            rows.append([
+                _LABELS[self._roles[idx]],
+                self._texts[idx],
+                _LABELS[self._sources[idx]],
+                self._timestamps[idx],
+            ])
+        return {"capacity": self.capacity, "overflow": self.overflow, "messages": rows}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "MessageHistory":
+        history = cls(state["capacity"])
+        for role, text, source, timestamp in state["messages"]:
+            history.append(role, text, source, timestamp)
+        history.overflow = state["overflow"]
+        return history
+
+
+# -------------------- SESSION --------------------
+class Session:
+    """
+    One user's conversation state. Fields are slots; the mapping methods
+    keep the dict-style access used across the pipeline. Keys that are not
+    fields go to a lazily created `extra` dict.
+    """
+
+    FIELDS = (
+        "active_flow", "pending_flow", "last_completed_flow", "current_step", "slots",
+        "last_intent", "history", "created_at", "last_active", "flow_completed_at",
+    )
+
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, now: float):
+        self.active_flow = None
+        self.pending_flow = None
+        self.last_completed_flow = None
+        self.current_step = 0
+        self.slots = {}
+        self.last_intent = None
+        # Allocated on the first message
+        self.history = None
+        self.created_at = now
+        self.last_active = now
+        self.flow_completed_at = None
+        self.extra = None
+
+    # -------------------- HISTORY --------------------
+    def add_message(self, role: str, text: str, source, timestamp: float, capacity: int = SESSION_HISTORY_SIZE) -> float:
+        if self.history is None:
+            self.history = MessageHistory(capacity)
+        return self.history.append(role, text, source, timestamp)
+
+    def history_list(self) -> list:
+        return self.history.to_list() if self.history is not None else []
+
+    @property
+    def history_length(self) -> int:
+        return len(self.history) if self.history is not None else 0
+
+    @property
+    def history_overflow(self) -> int:
+        return self.history.overflow if self.history is not None else 0
+
+    @property
+    def history_total(self) -> int:
+        """Messages ever appended, including those dropped from the ring."""
+        return self.history.overflow + len(self.history) if self.history is not None else 0
+
+    # -------------------- MAPPING API --------------------
+    def __getitem__(self, key):
+        if key == "history":
+            # A copy, read-only so that session["history"].append(...) fails
+            # instead of silently losing the message
+            return tuple(self.history_list())
+        if key in self.__slots__ and key != "extra":
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "history":
+            raise KeyError("history is append-only, use SessionManager.add_message")
+        if key in self.__slots__ and key != "extra":
+            setattr(self, key, value)
+            return
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def __contains__(self, key):
+        return key in self.FIELDS or (self.extra is not None and key in self.extra)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        # Dict semantics: a field explicitly set to None is present
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    # -------------------- SERIALIZATION --------------------
+    def fields_state(self) -> dict:
+        """Every field except the history, JSON-serializable."""
+        state = {key: getattr(self, key) for key in self.FIELDS if key != "history"}
+        state["slots"] = dict(self.slots or {})
+        if self.extra:
+            state["extra"] = dict(self.extra)
+        return state
+
+    def to_state(self) -> dict:
+        """Plain, JSON-serializable form, used by the session stores and the journal."""
+        state = self.fields_state()
+        state["history"] = self.history.to_state() if self.history is not None else None
+        return state
+
+    def apply_fields(self, state: dict):
+        for key in self.FIELDS:
+            if key != "history" and key in state:
+                setattr(self, key, state[key])
+        self.extra = state.get("extra") or None
+
+    @classmethod
+    def from_state(cls, state: dict) -> "Session":
+        session = cls(state["created_at"])
+        session.apply_fields(state)
+        if state.get("history"):
+            session.history = MessageHistory.from_state(state["history"])
+        return session
+
+    def keys(self):
+        return list(self.FIELDS) + list(self.extra or ())
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self.keys()}
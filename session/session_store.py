@@ -0,0 +1,209 @@
+# session/session_store.py
+#
+# Backends behind SessionManager. The default keeps sessions only in the
+# manager's process-local dict; the SQLite backend (WAL mode) lets several
+# worker processes share one session table, so a user's flow state survives
+# being served by a different worker.
+#
+# Every stored row carries a random version token. A worker keeps loaded
+# sessions in its local dict as a read cache and revalidates them with a
+# one-column primary-key probe; writes are batched by the manager
+# (write-behind) and land in one transaction. Writes are compare-and-set on
+# the version the worker loaded, so a stale copy never overwrites a newer one.
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+
+from session.session_state import Session
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- CONFIG --------------------
+# "memory" (process-local, default) or "sqlite" (shared between workers)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "session/sessions.db")
+# Write-behind delay: dirty sessions are written at most this late
+SESSION_STORE_FLUSH_MS = float(os.getenv("SESSION_STORE_FLUSH_MS", "5"))
+
+
+def new_version() -> int:
+    return random.getrandbits(62)
+
+
+class MemorySessionStore:
+    """
+    Process-local backend: the manager's dict is the only copy, so there is
+    nothing to load, probe or write. Sessions are lost on restart and are
+    not visible to other worker processes.
+    """
+
+    shared = False
+
+    def load(self, session_id: str):
+        return None
+
+    def version(self, session_id: str):
+        return None
+
+    def save_many(self, rows: list) -> list:
+        return []
+
+    def delete(self, session_id: str):
+        pass
+
+    def expire(self, cutoff: float) -> int:
+        return 0
+
+    def close(self):
+        pass
+
+    def describe(self) -> dict:
+        return {"backend": "memory", "shared": False}
+
+
+class SQLiteSessionStore:
+    """
+    Session table in a local SQLite database (WAL, synchronous=NORMAL), safe
+    to share between the worker processes of one host.
+
+    Connections are per thread and per process (re-opened after fork).
+    Rows are (session_id, version, last_active, state JSON).
+    """
+
+    shared = True
+
+    def __init__(self, path: str = SESSION_STORE_PATH, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+
+        self.loads = 0
+        self.probes = 0
+        self.writes = 0
+        self.conflicts = 0
+        self.batches = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " version INTEGER NOT NULL,"
+            " last_active REAL NOT NULL,"
+            " state TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_active ON sessions (last_active)")
+
+    def _conn(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    # -------------------- READS --------------------
+    def load(self, session_id: str):
+        """
+        Returns:
+            tuple: (version, Session), or None if the session is not stored
+        """
+        row = self._conn().execute(
+            "SELECT version, state FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        self.loads += 1
+        if row is None:
+            return None
+        return row[0], Session.from_state(json.loads(row[1]))
+
+    def version(self, session_id: str):
+        row = self._conn().execute(
+            "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        self.probes += 1
+        return row[0] if row else None
+
+    # -------------------- WRITES --------------------
+    def save_many(self, rows: list) -> list:
+        """
+        Writes (session_id, expected_version, version, last_active, state)
+        rows in one transaction. A row is only written if the stored version
+        is still `expected_version` (None: only if the session is not stored
+        yet); otherwise another worker changed or deleted it first.
+
+        Returns:
+            list: session ids whose write was rejected
+        """
+        if not rows:
+            return []
+        conflicts = []
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for session_id, expected, version, last_active, state in rows:
+                state = json.dumps(state, separators=(",", ":"))
+                if expected is None:
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO sessions VALUES (?, ?, ?, ?)",
+                        (session_id, version, last_active, state)
+                    )
+                else:
+                    cursor = conn.execute(
+                        "UPDATE sessions SET version = ?, last_active = ?, state = ?"
+                        " WHERE session_id = ? AND version = ?",
+                        (version, last_active, state, session_id, expected)
+                    )
+                if cursor.rowcount != 1:
+                    conflicts.append(session_id)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.writes += len(rows) - len(conflicts)
+        self.conflicts += len(conflicts)
+        self.batches += 1
+        return conflicts
+
+    def delete(self, session_id: str):
+        self._conn().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def expire(self, cutoff: float) -> int:
+        cursor = self._conn().execute("DELETE FROM sessions WHERE last_active <= ?", (cutoff,))
+        return cursor.rowcount
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+            self._local.pid = None
+
+    def describe(self) -> dict:
+        return {
+            "backend": "sqlite",
+            "shared": True,
+            "path": self.path,
+            "loads": self.loads,
+            "probes": self.probes,
+            "writes": self.writes,
+            "conflicts": self.conflicts,
+            "batches": self.batches,
+        }
+
+
+def build_session_store(kind: str = SESSION_STORE, path: str = SESSION_STORE_PATH):
+    if kind == "memory":
+        return MemorySessionStore()
+    if kind == "sqlite":
+        store = SQLiteSessionStore(path)
+        logger.info(f"✓ Session store: SQLite (WAL) at {path}")
+        return store
+    raise ValueError(f"Unknown session store {kind!r} (expected 'memory' or 'sqlite')")
@@ -0,0 +1,438 @@
+# sharded_server.py - Session-affinity sharded serving across cores
+#
+#   python sharded_server.py --workers 4 --port 5000
+#   python sharded_server.py --workers 4 --port 5000 --shard-base-port 5100
+#
+# N worker processes each own the sessions with crc32(session_id) % N == i
+# and keep them in their own in-process SessionManager, so no session state
+# is shared between processes and no request waits on another worker. A
+# thin front dispatcher accepts the client connections on --port, reads the
+# session id of /api/chat and /api/flow/* requests and forwards each one over
+# a keep-alive local connection to the owning worker:
+#
+#   /api/chat                   body "user_id" or "session_id" (a new id is assigned and injected if missing)
+#   /api/flow/respond           body "session_id"
+#   /api/flow/cancel/<id>       path
+#   /api/flow/session/<id>      path
+#   /api/history/<id>[/export]  path
+#   /api/admin/* (POST/DELETE)  every worker (model swaps, rule reloads)
+#   anything else               round-robin
+#   /api/shards                 answered by the dispatcher: shard addresses and routed counts
+#
+# As in prefork_server.py the master loads and warms the models once, freezes
+# the GC and forks the workers, which read the weights from pages shared
+# copy-on-write. Workers and the dispatcher are restarted if they exit.
+# With SESSION_JOURNAL_DIR set every shard journals to its own subdirectory.
+
+import argparse
+import gc
+import http.client
+import itertools
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from prefork_server import (
+    load_app,
+    memory_usage,
+    report_memory,
+    warmup,
+    own_session_layer,
+    close_session_layer,
+    stop_on_sigterm,
+    _limit_torch_threads,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("sharded")
+
+
+# -------------------- ROUTING --------------------
+_SESSION_PATH_PREFIXES = ("/api/flow/cancel/", "/api/flow/session/", "/api/history/")
+
+# Safe to send again when the worker may already have processed them
+_IDEMPOTENT = ("GET", "HEAD")
+
+# Not forwarded: they describe a single connection
+_HOP_BY_HOP = {"connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade", "te", "trailer"}
+
+
+def shard_for(session_id: str, shards: int) -> int:
+    """Stable across processes and restarts (unlike hash())."""
+    return zlib.crc32(session_id.encode("utf-8")) % shards
+
+
+def route_session(method: str, path: str, body: bytes):
+    """
+    Finds the session a request belongs to.
+
+    Returns:
+        tuple: (session_id or None, body to forward)
+    """
+    path = path.split("?", 1)[0]
+
+    for prefix in _SESSION_PATH_PREFIXES:
+        if path.startswith(prefix):
+            return path[len(prefix):].split("/", 1)[0] or None, body
+
+    if method != "POST" or path not in ("/api/chat", "/api/flow/respond"):
+        return None, body
+
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        return None, body
+    if not isinstance(data, dict):
+        return None, body
+
+    if path == "/api/flow/respond":
+        session_id = data.get("session_id")
+        return (str(session_id) if session_id else None), body
+
+    session_id = data.get("user_id") or data.get("session_id")
+    if session_id:
+        return str(session_id), body
+
+    # app.py would pick a random id in whichever worker got the request;
+    # choose it here so the conversation keeps landing on the same shard
+    data["session_id"] = session_id = str(uuid.uuid4())
+    return session_id, json.dumps(data).encode("utf-8")
+
+
+# -------------------- DISPATCHER --------------------
+class ShardDispatcher:
+    """
+    Forwards requests to the shard workers over per-thread keep-alive
+    connections.
+    """
+
+    def __init__(self, addresses: list, connect_timeout: float = 5.0, timeout: float = 60.0):
+        self.addresses = addresses
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self._local = threading.local()
+        self._round_robin = itertools.count()
+
+        self.routed = [0] * len(addresses)
+        self.unrouted = 0
+        self.errors = 0
+
+    def _connection(self, shard: int) -> http.client.HTTPConnection:
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get(shard)
+        if conn is None:
+            host, port = self.addresses[shard]
+            conn = connections[shard] = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        return conn
+
+    def _drop(self, shard: int):
+        conn = self._local.connections.pop(shard, None)
+        if conn is not None:
+            conn.close()
+
+    def forward(self, shard: int, method: str, path: str, headers: dict, body: bytes) -> tuple:
+        """
+        A request that failed before it was fully written is retried (the
+        worker cannot have acted on it); one that failed afterwards is
+        retried only if it is idempotent, since the worker may already have
+        processed it. Any failure throws the connection away.
+
+        Returns:
+            tuple: (status, headers list, body) of the worker's response; the
+            body is bytes, or the unread response when the worker streams it
+            (no Content-Length)
+        """
+        deadline = time.monotonic() + self.connect_timeout
+        retried = False
+
+        while True:
+            conn = self._connection(shard)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker starting or restarting
+                self._drop(shard)
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+                continue
+            except (BrokenPipeError, ConnectionResetError):
+                # Keep-alive connection closed by the worker before the request went out
+                self._drop(shard)
+                if retried:
+                    raise
+                retried = True
+                continue
+            except BaseException:
+                self._drop(shard)
+                raise
+
+            try:
+                response = conn.getresponse()
+                if response.getheader("Content-Length") is None and response.status not in (204, 304):
+                    # The stream owns this connection until it is read; the
+                    # next request on this thread opens a new one
+                    self._local.connections.pop(shard, None)
+                    return response.status, response.getheaders(), response
+                return response.status, response.getheaders(), response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError):
+                self._drop(shard)
+                if retried or method not in _IDEMPOTENT:
+                    raise
+                retried = True
+            except BaseException:
+                self._drop(shard)
+                raise
+
+    def dispatch(self, method: str, path: str, headers: dict, body: bytes) -> tuple:
+        session_id, body = route_session(method, path, body)
+        headers = {k: v for k, v in headers.items() if k.lower() not in _HOP_BY_HOP}
+        headers["Content-Length"] = str(len(body))
+
+        if session_id is not None:
+            shard = shard_for(session_id, len(self.addresses))
+            self.routed[shard] += 1
+            return self.forward(shard, method, path, headers, body)
+
+        self.unrouted += 1
+        if method not in ("GET", "HEAD") and path.startswith("/api/admin/"):
+            # Every worker holds its own models and rules
+            responses = [self.forward(shard, method, path, headers, body) for shard in range(len(self.addresses))]
+            failed = [r for r in responses if r[0] >= 400]
+            return failed[0] if failed else responses[0]
+
+        shard = next(self._round_robin) % len(self.addresses)
+        return self.forward(shard, method, path, headers, body)
+
+    def describe(self) -> dict:
+        return {
+            "shards": [
+                {"shard": i, "address": f"{host}:{port}", "routed": self.routed[i]}
+                for i, (host, port) in enumerate(self.addresses)
+            ],
+            "unrouted": self.unrouted,
+            "errors": self.errors,
+        }
+
+
+class _DispatchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this every
+    # response waits for the client's delayed ACK
+    disable_nagle_algorithm = True
+    dispatcher = None
+
+    def _reply(self, status: int, headers: list, body):
+        self.send_response(status)
+        for name, value in headers:
+            if name.lower() not in _HOP_BY_HOP and name.lower() != "content-length":
+                self.send_header(name, value)
+
+        if isinstance(body, bytes):
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+            return
+
+        # Streamed by the worker (history export): relay chunk by chunk
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            if self.command == "HEAD":
+                return
+            while True:
+                chunk = body.read1(64 * 1024)
+                if not chunk:
+                    break
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        finally:
+            body.close()
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        if self.path == "/api/shards":
+            data = json.dumps(self.dispatcher.describe()).encode("utf-8")
+            return self._reply(200, [("Content-Type", "application/json")], data)
+
+        try:
+            status, headers, data = self.dispatcher.dispatch(self.command, self.path, dict(self.headers), body)
+        except Exception as e:
+            self.dispatcher.errors += 1
+            logger.warning(f"⚠️ Forwarding {self.command} {self.path} failed: {e}")
+            data = json.dumps({"success": False, "error": "Shard unavailable"}).encode("utf-8")
+            return self._reply(503, [("Content-Type", "application/json")], data)
+
+        self._reply(status, headers, data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _dispatcher_main(host: str, port: int, addresses: list):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+
+    handler = type("DispatchHandler", (_DispatchHandler,), {"dispatcher": ShardDispatcher(addresses)})
+    server = ThreadingHTTPServer((host, port), handler)
+    stop_on_sigterm(server)
+    server.daemon_threads = True
+    logger.info(f"✓ Dispatcher listening on {host}:{port} for {len(addresses)} shards")
+    try:
+        server.serve_forever()
+    finally:
+        os._exit(0)
+
+
+# -------------------- SHARD WORKERS --------------------
+def _shard_main(shard: int, server, share: bool, threads: int):
+    stop_on_sigterm(server)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+
+    _limit_torch_threads(threads)
+
+    if share:
+        gc.enable()
+    else:
+        load_app()
+
+    # Sessions are per shard
+    own_session_layer(f"shard-{shard}")
+
+    from ml_pipeline.batch_scheduler import batch_scheduler, BATCHING_ENABLED
+    if BATCHING_ENABLED:
+        # Threads do not survive fork
+        batch_scheduler.start()
+
+    from rule_engine.rule_watcher import RULES_WATCH_ENABLED
+    if RULES_WATCH_ENABLED:
+        from ml_pipeline.model_registry import model_registry
+        model_registry.rule_watcher.start()
+
+    try:
+        server.serve_forever()
+    finally:
+        try:
+            close_session_layer()
+        finally:
+            os._exit(0)
+
+
+def _spawn(target, *args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        target(*args)
+    return pid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Session-affinity sharded server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-host", default="127.0.0.1")
+    parser.add_argument("--shard-base-port", type=int, default=None, help="first worker port (default: --port + 1)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="torch intra-op threads in each worker")
+    parser.add_argument("--no-share", action="store_true", help="Load models in every worker")
+    parser.add_argument("--report-after", type=float, default=15.0, help="Seconds before the first memory report (0 = off)")
+    args = parser.parse_args(argv)
+
+    from werkzeug.serving import make_server
+
+    share = not args.no_share
+    master_pid = os.getpid()
+    base_port = args.shard_base_port or args.port + 1
+    addresses = [(args.shard_host, base_port + i) for i in range(args.workers)]
+    baseline_kb = None
+
+    if share:
+        os.environ.setdefault("INTENT_CLASSIFIER_MMAP", "1")
+        os.environ.setdefault("MODEL_WARMUP", "0")
+
+        gc.disable()
+        before_kb = memory_usage(master_pid).get("rss_kb", 0)
+
+        started = time.perf_counter()
+        _limit_torch_threads(1)
+        app_module = load_app()
+        warmup()
+        logger.info(f"✓ Models loaded and warmed in master ({time.perf_counter() - started:.1f}s)")
+
+        baseline_kb = memory_usage(master_pid).get("rss_kb", 0) - before_kb
+        gc.freeze()
+        wsgi_app = app_module.app
+    else:
+        from prefork_server import _LazyApp
+        wsgi_app = _LazyApp()
+
+    # Bound before forking, so a restarted worker takes over its socket
+    servers = [make_server(host, port, wsgi_app, threaded=True) for host, port in addresses]
+
+    processes = {}
+    for shard, server in enumerate(servers):
+        processes[_spawn(_shard_main, shard, server, share, args.threads_per_worker)] = shard
+    processes[_spawn(_dispatcher_main, args.host, args.port, addresses)] = "dispatcher"
+    logger.info(f"✓ {args.workers} shard workers on ports {base_port}-{base_port + args.workers - 1} (share={share})")
+
+    stopping = False
+
+    def workers():
+        return [pid for pid, role in processes.items() if role != "dispatcher"]
+
+    def shutdown(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in list(processes):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGUSR1, lambda *_: report_memory(master_pid, workers(), baseline_kb))
+
+    if args.report_after > 0:
+        signal.signal(signal.SIGALRM, lambda *_: report_memory(master_pid, workers(), baseline_kb))
+        signal.setitimer(signal.ITIMER_REAL, args.report_after)
+
+    while processes:
+        try:
+            pid, status = os.wait()
+        except InterruptedError:
+            continue
+        except ChildProcessError:
+            break
+
+        role = processes.pop(pid, None)
+        if stopping or role is None:
+            continue
+
+        logger.warning(f"{'Dispatcher' if role == 'dispatcher' else f'Shard {role}'} ({pid}) exited with status {status}, restarting")
+        if role == "dispatcher":
+            processes[_spawn(_dispatcher_main, args.host, args.port, addresses)] = role
+        else:
+            processes[_spawn(_shard_main, role, servers[role], share, args.threads_per_worker)] = role
+
+    for server in servers:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# utils/query_context.py
+
+class QueryContext:
+    """
+    Immutable per-request view of a user query, normalized once.
+
+    Built at the entry point and passed through the rule, ML and session
+    layers in place of the raw string, so lowercasing, stripping, splitting
+    and preprocessing happen once per request instead of once per layer.
+
+    Attributes:
+        raw: the query as received
+        lower: raw.lower()
+        normalized: lower.strip()
+        tokens: lower.split(), as a tuple
+        token_count: len(tokens)
+        preprocessed: preprocess_fn(raw), computed on first access
+    """
+
+    __slots__ = ("raw", "lower", "normalized", "tokens", "token_count", "_preprocess_fn", "_preprocessed")
+
+    def __init__(self, raw: str, preprocess_fn=None):
+        init = object.__setattr__
+        lower = raw.lower()
+        tokens = tuple(lower.split())
+
+        init(self, "raw", raw)
+        init(self, "lower", lower)
+        init(self, "normalized", lower.strip())
+        init(self, "tokens", tokens)
+        init(self, "token_count", len(tokens))
+        init(self, "_preprocess_fn", preprocess_fn)
+        init(self, "_preprocessed", None)
+
+    @classmethod
+    def of(cls, query, preprocess_fn=None) -> "QueryContext":
+        """Returns `query` itself if it already is a context."""
+        if isinstance(query, cls):
+            return query
+        return cls(query, preprocess_fn)
+
+    @property
+    def preprocessed(self) -> str:
+        return self.preprocess(self._preprocess_fn)
+
+    def preprocess(self, preprocess_fn=None) -> str:
+        """
+        Preprocessed text; cached for the preprocess function the context
+        was built with, computed fresh for any other.
+        """
+        if preprocess_fn is None:
+            from utils.preprocess import preprocess_text
+            preprocess_fn = self._preprocess_fn or preprocess_text
+
+        if preprocess_fn is not self._preprocess_fn and self._preprocess_fn is not None:
+            return preprocess_fn(self.raw)
+
+        if self._preprocessed is None:
+            object.__setattr__(self, "_preprocess_fn", preprocess_fn)
+            object.__setattr__(self, "_preprocessed", preprocess_fn(self.raw))
+        return self._preprocessed
+
+    def __setattr__(self, name, value):
+        raise AttributeError("QueryContext is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("QueryContext is immutable")
+
+    def __reduce__(self):
+        return (QueryContext, (self.raw, self._preprocess_fn))
+
+    def __str__(self):
+        return self.raw
+
+    def __repr__(self):
+        return f"QueryContext({self.raw!r})"
+
+
+def lowered(query) -> str:
+    """query.lower() for a raw string or a QueryContext."""
+    if isinstance(query, QueryContext):
+        return query.lower
+    return query.lower()
+
+
+def preprocessed(query, preprocess_fn) -> str:
+    """preprocess_fn(query) for a raw string or a QueryContext."""
+    if isinstance(query, QueryContext):
+        return query.preprocess(preprocess_fn)
+    return preprocess_fn(query)
+
+
+def raw_text(query) -> str:
+    if isinstance(query, QueryContext):
+        return query.raw
+    return query